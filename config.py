@@ -7,11 +7,55 @@ MODEL_TEMPERATURE = 0.7           # Sampling temperature for LLM outputs
 MAX_TOKENS = 2048                 # Maximum tokens to generate per request
 TIMEOUT_SEC = 30                  # Timeout (in seconds) for LLM calls
 MAX_RETRIES = 3                   # Number of retry attempts on failure
+RETRY_BACKOFF_SEC = 1             # Delay (in seconds) between retry attempts
+
+# LLM backend selection
+LLM_BACKEND = "http"              # "http" (Ollama REST API) or "subprocess" (`ollama run` CLI)
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")  # Base URL of the Ollama server
+HTTP_POOL_SIZE = 10               # Max keep-alive connections shared by all agents (http backend)
+STREAM_RESPONSES = True           # Stream tokens and stop once the agent's JSON object is complete
+STRUCTURED_OUTPUT = True          # Ask Ollama to constrain output to the agent's JSON schema
+PARSE_RETRIES = 1                 # Re-calls allowed when a response can't be parsed even after repair
+
+# Backend pool: every Ollama server the client may route to. Optional
+# "model" overrides LLM_MODEL on that server (it should be equivalent).
+OLLAMA_BACKENDS = [
+    {"host": OLLAMA_HOST, "weight": 1},
+]
+BACKEND_ROUTING = "least_outstanding"  # "least_outstanding" or "latency"
+CIRCUIT_FAILURE_THRESHOLD = 3     # Consecutive failures before a backend is ejected
+CIRCUIT_RESET_SEC = 30            # Ejection time before a health check may readmit it
+HEALTH_CHECK_TIMEOUT_SEC = 2      # Timeout for the /api/version health probe
+
+# Per-agent model routing. Keys are agent class names; each route may override
+# "model", "max_tokens" and "timeout_sec", and a nested "depths" dict may
+# override them again for specific tree depths (0 = prompt filter, 1 = root).
+# Unlisted agents use LLM_MODEL / MAX_TOKENS / TIMEOUT_SEC. Empty by default;
+# tighter limits are worth setting only once measured on your models, e.g.:
+#     "PromptFilterAgent": {"max_tokens": 256, "timeout_sec": 15},
+#     "MetaAgent": {"model": "llama3.2:1b", "max_tokens": 512, "timeout_sec": 20},
+#     "ExplorerAgent": {"max_tokens": 1024},
+#     "SynthesizerAgent": {"timeout_sec": 60, "depths": {1: {"model": "llama3:70b"}}},
+AGENT_ROUTES = {}
 
 # Concurrency settings
-MAX_PARALLEL_TASKS = 5            # Maximum number of concurrent explorer agents
+MAX_PARALLEL_TASKS = 5            # Hard cap on concurrent LLM calls across the whole run
+AGENT_CONCURRENCY_LIMITS = {      # Per-agent sub-limits within MAX_PARALLEL_TASKS
+    "ExplorerAgent": 4,
+    "EvaluatorAgent": 2,
+    "SynthesizerAgent": 2,
+}
 MAX_RECURSION_DEPTH = 3
 
+# Adaptive concurrency (AIMD): MAX_PARALLEL_TASKS is the starting window
+ADAPTIVE_CONCURRENCY = True       # Resize the window from observed latency and errors
+MIN_PARALLEL_TASKS = 1            # Window never shrinks below this
+MAX_PARALLEL_TASKS_CEILING = 16   # ...or grows beyond this
+AIMD_DECREASE_FACTOR = 0.5        # Multiply the window by this on timeouts/errors/spikes
+AIMD_LATENCY_SAMPLES = 20         # Recent call latencies used for the p95 estimate
+AIMD_LATENCY_TOLERANCE = 1.2      # p95 may drift this much over its reference and still count as flat
+AIMD_SPIKE_FACTOR = 3.0           # A single call slower than reference p95 x this is a spike
+
 # Prompt file paths
 PROJECT_ROOT = os.path.dirname(__file__)
 PROMPT_DIR = os.path.join(PROJECT_ROOT, "prompts")
@@ -21,7 +65,90 @@ FILTER_PROMPT_PATH = os.path.join(PROMPT_DIR, "filter_prompt.txt")
 SYNTH_PROMPT_PATH = os.path.join(PROMPT_DIR, "synth_prompt.txt")
 EVAL_PROMPT_PATH = os.path.join(PROMPT_DIR, "eval_prompt.txt")
 
+# Response cache (persistent, keyed on model + temperature + filled prompt)
+CACHE_ENABLED = False             # Opt in: replay identical prompts from disk
+CACHE_PATH = os.path.join(PROJECT_ROOT, "cache", "llm_cache.sqlite3")
+CACHE_MAX_ENTRIES = 10000         # LRU-evict beyond this many responses
+CACHE_MAX_BYTES = 50 * 1024 * 1024  # ...or beyond this many stored response bytes
+CACHE_TTL_SEC = 7 * 24 * 3600     # Entries older than this are ignored (None = never expire)
+CACHE_DISABLED_AGENTS = set()     # Agent class names that always bypass the cache
+
+# Subtree memoization (reuse whole orchestration results for repeated subtasks)
+MEMO_ENABLED = False              # Opt in: graft memoized subtrees instead of re-planning them
+MEMO_PATH = os.path.join(PROJECT_ROOT, "cache", "subtree_memo.sqlite3")
+MEMO_TTL_SEC = 7 * 24 * 3600      # Memoized subtrees older than this are recomputed (None = never)
+MEMO_INVALIDATE_ON_PROMPT_CHANGE = True  # Drop memoized subtrees when any template in prompts/ changes
+
+# Near-duplicate subtask merging (model-free, applied between MetaAgent and fan-out)
+DEDUP_ENABLED = True              # Collapse paraphrased sibling subtasks before expanding them
+DEDUP_THRESHOLD = 0.8             # Jaccard similarity of normalized content words needed to merge
+DEDUP_ACROSS_TREE = False         # Also reuse results for near-duplicates under near-duplicate parents elsewhere
+
+# Dependency-aware scheduling: run subtasks as a DAG built from MetaAgent's
+# "dependencies", passing prerequisites' outputs as context
+DAG_SCHEDULING = False
+
+# Pipelined evaluation: critique finished branches in batches while their
+# siblings are still running, instead of one EvaluatorAgent call per level
+PIPELINED_EVAL = False
+EVAL_BATCH_SIZE = 2               # Branches per pipelined EvaluatorAgent call
+
+# Map-reduce for wide levels: branches are split into shards that are
+# evaluated/synthesized in parallel, then partial plans are reduced in a tree
+SHARD_TOKEN_BUDGET = 1500         # Estimated tokens of branch JSON per shard
+SHARD_MAX_BRANCHES = 8            # Branches per shard, whatever their size
+REDUCE_FAN_IN = 4                 # Partial plans merged per reduce call
+
+# Prompt budgeting
+CONTEXT_TOKEN_BUDGET = 512        # Estimated tokens of ancestor context passed to an agent
+
+# Run-wide budget (None = unbounded). Once spent, LLM calls are skipped and
+# every level returns its best-so-far plan
+RUN_DEADLINE_SEC = None           # Wall-clock limit for one orchestrate() run
+RUN_MAX_CALLS = None              # Maximum LLM calls per run
+RUN_MAX_TOKENS = None             # Maximum estimated prompt + completion tokens per run
+BUDGET_EXPAND_RESERVE = 0.5       # Stop recursing deeper once less than this share of the budget is left
+
+# Expansion policy: which subtasks of a multi-step level get their own subtree.
+# "all" recurses into every one; "beam" expands only the best-scoring few and
+# resolves the rest with a single ExplorerAgent call
+EXPANSION_POLICY = "all"
+EXPANSION_BEAM_WIDTH = 2          # Subtasks expanded per level under "beam"
+EXPANSION_MIN_SCORE = 0.0         # Minimum benefit/cost score to expand under "beam"
+EXPANSION_DEFAULT_LATENCY_SEC = 1.0  # Assumed per-call latency before any has been observed
+
+# Speculative execution: explore each goal concurrently with its MetaAgent call,
+# keeping the result when the goal turns out to be single-step
+SPECULATIVE_EXPLORE = False
+
+# What a failing branch does to its level: "raise" fails the whole tree;
+# "isolate" records it as a failed node and plans on with its siblings;
+# "fail_fast" also cancels the siblings still running. Levels with a failed
+# branch are marked partial
+FAILURE_POLICY = "raise"
+
+# Checkpointing: completed work is journaled per run so an interrupted run can
+# be resumed with --resume <run-id>, re-issuing only the calls that are missing
+CHECKPOINT_ENABLED = True
+CHECKPOINT_DIR = os.path.join(PROJECT_ROOT, "cache", "checkpoints")
+CHECKPOINT_KEEP_COMPLETED = False  # Keep the journal of a run that finished with no failed or partial branch
+
+# Tracing: every orchestration node and LLM call is written as a JSONL span
+# (parent id, tree path, agent, model, timings, sizes, retries, outcome)
+TRACE_ENABLED = True
+TRACE_PATH = "logs/trace.jsonl"   # Appended to by a background writer thread
+
+# Metrics: counters, gauges and latency histograms per run, written when the
+# run ends as a Prometheus textfile (orchestrator.prom) and <run_id>.json
+METRICS_ENABLED = True
+METRICS_DIR = "logs/metrics"
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # Seconds
 
 # Logging configuration
 LOG_LEVEL = "DEBUG"                # Root log level (DEBUG, INFO, WARNING, ERROR)
 LOG_FILE = "logs/orchestrator.log"  # File to write structured logs to
+LOG_MAX_BYTES = 10 * 1024 * 1024   # Rotate LOG_FILE beyond this size (None = never)
+LOG_BACKUP_COUNT = 5               # Rotated log files kept
+LOG_ROTATE_WHEN = None             # Rotate by time instead, e.g. "midnight" or "H"
+LOG_BODY_PREVIEW_CHARS = 200       # Prompt/response characters kept in log lines
+LOG_BODY_SAMPLE_RATE = 0.0         # Share of prompt/response bodies logged in full
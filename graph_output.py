@@ -1,12 +1,41 @@
 #!/usr/bin/env python3
-import sys
+"""
+Plot and summarize orchestration runs.
+
+Trace files (.jsonl, written by utils/tracing.py) are streamed, never
+loaded whole: an offset index next to the trace (<trace>.idx.json) records
+where each run's spans lie, so one run is extracted by seeking straight to
+them. Large trees are rendered collapsed below --max-depth, with nodes
+shaded by latency; --view depth|agent prints aggregate tables instead.
+
+Plain orchestrator logs are still accepted for the legacy per-call tree.
+"""
+import argparse
+import json
+import os
 import re
-import ast
-from graphviz import Digraph
+import sys
+from collections import defaultdict
+
+PROMPT_PREVIEW_CHARS = 40
+HEAT_PALETTE = ['#fff5eb', '#fdd0a2', '#fd8d3c', '#d94801', '#7f2704']
+
+_RUN_ID_RE = re.compile(rb'"run_id":"([^"]*)"')
+
+
+# ---------------------------------------------------------------------------
+# Legacy free-text logs
+# ---------------------------------------------------------------------------
 
 def parse_log(file_path):
     orchestration_re = re.compile(r'Orchestration started for goal: (.+) \(depth=(\d+)\)')
-    run_re = re.compile(r'OllamaClient: running (.+)')
+    # ollama invocations: [ 'ollama', CMD, MODEL, flags..., PROMPT ] (or with
+    # '--prompt', PROMPT among the flags); HTTP calls: [ 'POST', URL, MODEL,
+    # PROMPT ]. Only the model and a preview of the prompt are pulled out,
+    # without evaluating the list.
+    run_re = re.compile(r"OllamaClient: running \[\s*'[^']*',\s*'[^']*',\s*'([^']*)'")
+    flag_prompt_re = re.compile(r"""'--prompt', (['"])((?:\\.|(?!\1).)*)\1""")
+    prompt_re = re.compile(r""", (['"])((?:\\.|(?!\1).)*)\1\](?: \(attempt \d+\))?\s*$""")
     nodes = {}
     edges = []
     context_stack = []   # stack of {'id':..., 'depth':...}
@@ -38,14 +67,11 @@ def parse_log(file_path):
             # 2) Model run → a new “run” node under the last orchestration
             m2 = run_re.search(line)
             if m2:
-                list_str = m2.group(1)
-                try:
-                    parts = ast.literal_eval(list_str)
-                    # ollama run invocations: [ 'ollama', 'run', MODEL, PROMPT, ... ]
-                    model = parts[2]
-                    prompt = parts[3].strip().replace('\n', '\\n')
-                except Exception:
-                    continue
+                model = m2.group(1)
+                m3 = flag_prompt_re.search(line, m2.end()) or prompt_re.search(line, m2.end())
+                prompt = m3.group(2) if m3 else ''
+                # the prompt template's first lines, escapes left as written
+                prompt = prompt[:PROMPT_PREVIEW_CHARS * 2]
 
                 node_id = f"n{node_counter}"
                 nodes[node_id] = {
@@ -60,6 +86,17 @@ def parse_log(file_path):
 
     return nodes, edges
 
+
+def _digraph(comment):
+    try:
+        from graphviz import Digraph
+    except ImportError:
+        sys.exit("Rendering needs the graphviz package: pip install graphviz")
+    dot = Digraph(comment=comment)
+    dot.attr('node', style='filled', fontname='Helvetica')
+    return dot
+
+
 def render_tree(nodes, edges, outname='model_tree'):
     # Collect all model types
     model_types = sorted({n['model'] for n in nodes.values() if n['model']})
@@ -67,13 +104,12 @@ def render_tree(nodes, edges, outname='model_tree'):
     palette = ['red', 'blue', 'green', 'orange', 'purple', 'brown', 'pink', 'grey']
     colors = {mt: palette[i % len(palette)] for i, mt in enumerate(model_types)}
 
-    dot = Digraph(comment="LLM Call Tree")
-    dot.attr('node', style='filled', fontname='Helvetica')
+    dot = _digraph("LLM Call Tree")
 
     # add nodes
     for nid, data in nodes.items():
         if data['model']:
-            label = f"{data['model']}\\n{data['prompt'][:40]}..."
+            label = f"{data['model']}\\n{data['prompt'][:PROMPT_PREVIEW_CHARS]}..."
             dot.node(nid, label=label, fillcolor=colors[data['model']])
         else:
             dot.node(nid, label=data['label'], shape='box', fillcolor='lightgrey')
@@ -86,9 +122,236 @@ def render_tree(nodes, edges, outname='model_tree'):
     dot.render(outname, format='pdf', view=True)
     print(f"Rendered tree to {outname}.pdf")
 
+
+# ---------------------------------------------------------------------------
+# JSONL traces
+# ---------------------------------------------------------------------------
+
+def index_path_for(trace_path):
+    return trace_path + '.idx.json'
+
+
+def build_index(trace_path, index_path=None):
+    """
+    Bring the trace's offset index up to date and return it:
+    {"scanned_to": byte offset, "runs": {run_id: [[start, end], ...]}}.
+
+    Only bytes appended since the last call are scanned; a trace that
+    shrank (rotated or truncated) is re-indexed from the start. Each run
+    maps to the byte ranges of its consecutive lines.
+    """
+    index_path = index_path or index_path_for(trace_path)
+    index = {'scanned_to': 0, 'runs': {}}
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    size = os.path.getsize(trace_path)
+    if size < index['scanned_to']:
+        index = {'scanned_to': 0, 'runs': {}}
+    if size == index['scanned_to']:
+        return index
+
+    runs = index['runs']
+    with open(trace_path, 'rb') as f:
+        f.seek(index['scanned_to'])
+        offset = index['scanned_to']
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # a span still being written; picked up next time
+            m = _RUN_ID_RE.search(line)
+            if m:
+                ranges = runs.setdefault(m.group(1).decode('utf-8'), [])
+                if ranges and ranges[-1][1] == offset:
+                    ranges[-1][1] = offset + len(line)
+                else:
+                    ranges.append([offset, offset + len(line)])
+            offset += len(line)
+    index['scanned_to'] = offset
+
+    tmp = index_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp, index_path)
+    return index
+
+
+def iter_spans(trace_path, run_id=None, index=None):
+    """
+    Stream span records, one run's only when `run_id` is given (read
+    through the offset index rather than a full scan).
+    """
+    with open(trace_path, 'rb') as f:
+        if run_id is None:
+            ranges = [[0, None]]
+        else:
+            index = index or build_index(trace_path)
+            ranges = index['runs'].get(run_id, [])
+        for start, end in ranges:
+            f.seek(start)
+            while end is None or f.tell() < end:
+                line = f.readline()
+                if not line:
+                    break
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn final line
+
+
+def list_runs(trace_path):
+    """(run_id, started, goal) for each run in the trace, oldest first."""
+    index = build_index(trace_path)
+    runs = []
+    with open(trace_path, 'rb') as f:
+        for run_id, ranges in index['runs'].items():
+            f.seek(ranges[0][0])
+            first = json.loads(f.readline())
+            goal = ''
+            # the run span is written last, when the run ends
+            f.seek(ranges[-1][0])
+            for line in f.read(ranges[-1][1] - ranges[-1][0]).splitlines():
+                span = json.loads(line)
+                if span['kind'] == 'run':
+                    goal = span.get('goal', '')
+            runs.append((run_id, first['start'], goal))
+    return sorted(runs, key=lambda r: r[1])
+
+
+def aggregate(spans, key):
+    """
+    Fold LLM-call spans into rows keyed by key(span): calls, total and
+    max duration, queue wait and token estimates. Streams; O(#keys) memory.
+    """
+    rows = defaultdict(lambda: {
+        'calls': 0, 'duration_sec': 0.0, 'max_sec': 0.0, 'queue_wait_sec': 0.0,
+        'prompt_tokens': 0, 'completion_tokens': 0, 'failed': 0,
+    })
+    for span in spans:
+        if span['kind'] != 'llm_call':
+            continue
+        row = rows[key(span)]
+        row['calls'] += 1
+        row['duration_sec'] += span['duration_sec']
+        row['max_sec'] = max(row['max_sec'], span['duration_sec'])
+        row['queue_wait_sec'] += span.get('queue_wait_sec', 0.0)
+        row['prompt_tokens'] += span.get('prompt_tokens', 0)
+        row['completion_tokens'] += span.get('completion_tokens', 0)
+        if span['outcome'] not in ('ok', 'cache', 'coalesced', 'suppressed'):
+            row['failed'] += 1
+    return dict(rows)
+
+
+def by_depth(span):
+    return span.get('depth', 0)
+
+
+def by_agent(span):
+    return span['agent']
+
+
+def print_table(rows, title):
+    print(f"\n=== {title} ===")
+    print(f"{'':<20} {'calls':>6} {'total s':>9} {'mean s':>8} {'max s':>8} {'queue s':>8} {'failed':>6}")
+    for name, row in sorted(rows.items(), key=lambda kv: str(kv[0])):
+        mean = row['duration_sec'] / row['calls'] if row['calls'] else 0.0
+        print(
+            f"{str(name):<20} {row['calls']:>6} {row['duration_sec']:>9.2f} {mean:>8.2f} "
+            f"{row['max_sec']:>8.2f} {row['queue_wait_sec']:>8.2f} {row['failed']:>6}"
+        )
+
+
+def collapse_tree(spans, max_depth=2):
+    """
+    Fold a run's node spans into at most `max_depth` levels of tree path:
+    each deeper node (and its LLM calls) is counted into its ancestor at
+    the cut. Returns {path: {"goal", "nodes", "calls", "duration_sec",
+    "call_sec", "failed"}}.
+    """
+    tree = {}
+
+    def _cut(path):
+        parts = path.split('.') if path else []
+        return '.'.join(parts[:max_depth - 1])
+
+    for span in spans:
+        if span['kind'] not in ('node', 'llm_call'):
+            continue
+        cut = _cut(span.get('path', ''))
+        entry = tree.setdefault(cut, {
+            'goal': '', 'nodes': 0, 'calls': 0, 'duration_sec': 0.0, 'call_sec': 0.0, 'failed': 0,
+        })
+        if span['kind'] == 'node':
+            entry['nodes'] += 1
+            if span.get('path', '') == cut:
+                entry['goal'] = span.get('goal', '')
+                entry['duration_sec'] = span['duration_sec']
+            if span['outcome'] not in ('ok', 'checkpoint', 'memo', 'coalesced'):
+                entry['failed'] += 1
+        else:
+            entry['calls'] += 1
+            entry['call_sec'] += span['duration_sec']
+    return tree
+
+
+def render_collapsed(tree, outname='run_tree'):
+    """Render collapse_tree's output, shading each box by its total call time."""
+    dot = _digraph("Orchestration Tree")
+    hottest = max((e['call_sec'] for e in tree.values()), default=0.0) or 1.0
+    for path, entry in tree.items():
+        heat = HEAT_PALETTE[min(len(HEAT_PALETTE) - 1, int(entry['call_sec'] / hottest * len(HEAT_PALETTE)))]
+        folded = f"\\n+{entry['nodes'] - 1} nodes below" if entry['nodes'] > 1 else ''
+        label = (
+            f"{path or 'root'}: {entry['goal'][:PROMPT_PREVIEW_CHARS]}"
+            f"\\n{entry['calls']} calls, {entry['call_sec']:.1f}s in LLM, {entry['duration_sec']:.1f}s wall"
+            f"{folded}"
+        )
+        dot.node(path or 'root', label=label, shape='box', fillcolor=heat,
+                 color='red' if entry['failed'] else 'black')
+        if path:
+            parent = path.rsplit('.', 1)[0] if '.' in path else ''
+            dot.edge(parent or 'root', path)
+    dot.render(outname, format='pdf', view=True)
+    print(f"Rendered tree to {outname}.pdf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot or summarize orchestration runs.")
+    parser.add_argument("file", help="a JSONL trace (logs/trace.jsonl) or a plain orchestrator log")
+    parser.add_argument("--run", help="run id to show (default: the latest run in the trace)")
+    parser.add_argument("--list", action="store_true", help="list the runs in the trace")
+    parser.add_argument("--view", choices=("tree", "depth", "agent"), default="tree",
+                        help="collapsed tree, or latency per depth / per agent")
+    parser.add_argument("--max-depth", type=int, default=2, help="tree levels drawn before collapsing")
+    parser.add_argument("--out", default="model_tree", help="output file name, without extension")
+    args = parser.parse_args()
+
+    if not args.file.endswith('.jsonl'):
+        nodes, edges = parse_log(args.file)
+        render_tree(nodes, edges, args.out)
+        return
+
+    if args.list:
+        for run_id, started, goal in list_runs(args.file):
+            print(f"{run_id}  {started:.0f}  {goal}")
+        return
+
+    index = build_index(args.file)
+    run_id = args.run
+    if run_id is None:
+        if not index['runs']:
+            sys.exit(f"No runs in {args.file}")
+        run_id = max(index['runs'], key=lambda r: index['runs'][r][-1][1])
+    elif run_id not in index['runs']:
+        sys.exit(f"No run {run_id} in {args.file}")
+
+    spans = iter_spans(args.file, run_id, index)
+    if args.view == 'depth':
+        print_table(aggregate(spans, by_depth), f"Latency by depth, run {run_id}")
+    elif args.view == 'agent':
+        print_table(aggregate(spans, by_agent), f"Latency by agent, run {run_id}")
+    else:
+        render_collapsed(collapse_tree(spans, args.max_depth), args.out)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python plot_model_tree.py <log-file>")
-        sys.exit(1)
-    nodes, edges = parse_log(sys.argv[1])
-    render_tree(nodes, edges)
+    main()
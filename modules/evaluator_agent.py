@@ -1,6 +1,8 @@
-import json
 from config import EVAL_PROMPT_PATH
 from utils.llm_client import OllamaClient
+from utils.logging import log_body
+from utils.metrics import track_agent_run
+from utils.tokens import compact_json
 from utils.parser import parse_eval
 from schemas.task_models import EvalResult, ExploreResult
 import logging
@@ -9,30 +11,29 @@ class EvaluatorAgent:
     def __init__(self):
         with open(EVAL_PROMPT_PATH, "r") as f:
             self.prompt_template = f.read()
-        self.client = OllamaClient()
+        self.client = OllamaClient(agent_name=self.__class__.__name__, schema=EvalResult)
 
+    @track_agent_run
     async def run(self, branch_results: list[ExploreResult]) -> EvalResult:
         """
         1. Serialize branch_results to JSON.
         2. Fill the evaluator prompt.
-        3. Call the LLM synchronously.
+        3. Await the LLM call.
         4. Parse JSON into EvalResult.
         """
         # 1. Serialize branch outputs
-        branches_json = json.dumps([br.dict() for br in branch_results], indent=2)
+        branches_json = compact_json([br.model_dump() for br in branch_results])
 
         # 2. Prepare prompt
         prompt = self.prompt_template.replace("{branches_json}", branches_json)
 
         # … inside run() …
-        logging.debug(f"[{self.__class__.__name__}] using prompt template from {EVAL_PROMPT_PATH}")
-        logging.debug(f"[{self.__class__.__name__}] filled prompt:\n{prompt}\n--- end prompt ---")
-        raw_output = self.client.send(prompt)
-
-        # 3. Invoke LLM (synchronous)
-        raw_output = self.client.send(prompt)
-
-        # 4. Parse into EvalResult
-        result = parse_eval(raw_output)
+        logging.debug(
+            "[%s] filled prompt from %s: %s", self.__class__.__name__, EVAL_PROMPT_PATH, log_body(prompt)
+        )
+        # 3. Invoke LLM (async) and parse into EvalResult; malformed JSON is
+        #    repaired in process, and only re-requested if that fails
+        with self.client.invocation():
+            result = await self.client.send_parsed(prompt, parse_eval)
 
         return result
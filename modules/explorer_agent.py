@@ -1,6 +1,9 @@
 import json
 from config import EXPLORE_PROMPT_PATH
 from utils.llm_client import OllamaClient
+from utils.logging import log_body
+from utils.metrics import track_agent_run
+from utils.tokens import fit_context
 from utils.parser import parse_explore
 from schemas.task_models import ExploreResult
 import logging
@@ -9,31 +12,30 @@ class ExplorerAgent:
     def __init__(self):
         with open(EXPLORE_PROMPT_PATH, "r") as f:
             self.prompt_template = f.read()
-        self.client = OllamaClient()
+        self.client = OllamaClient(agent_name=self.__class__.__name__, schema=ExploreResult)
 
+    @track_agent_run
     async def run(self, subtask: str, parent_context: str="") -> ExploreResult:
         """
         1. Fill the explorer prompt with the subtask.
-        2. Call the LLM synchronously.
+        2. Await the LLM call.
         3. Parse JSON into ExploreResult.
         """
         # 1. Prepare prompt
         prompt = (
             self.prompt_template
-            .replace("{parent_context}", parent_context)
+            .replace("{parent_context}", fit_context(parent_context))
             .replace("{subtask}", subtask)
         )
 
 
         # … inside run() …
-        logging.debug(f"[{self.__class__.__name__}] using prompt template from {EXPLORE_PROMPT_PATH}")
-        logging.debug(f"[{self.__class__.__name__}] filled prompt:\n{prompt}\n--- end prompt ---")
-        raw_output = self.client.send(prompt)
-
-        # 2. Invoke LLM (synchronous)
-        raw_output = self.client.send(prompt)
-
-        # 3. Parse into ExploreResult
-        result = parse_explore(raw_output)
+        logging.debug(
+            "[%s] filled prompt from %s: %s", self.__class__.__name__, EXPLORE_PROMPT_PATH, log_body(prompt)
+        )
+        # 2. Invoke LLM (async) and parse into ExploreResult; malformed JSON is
+        #    repaired in process, and only re-requested if that fails
+        with self.client.invocation():
+            result = await self.client.send_parsed(prompt, parse_explore)
 
         return result
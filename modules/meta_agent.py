@@ -1,6 +1,9 @@
 import json
 from config import META_PROMPT_PATH
 from utils.llm_client import OllamaClient
+from utils.logging import log_body
+from utils.metrics import track_agent_run
+from utils.tokens import fit_context
 from utils.parser import parse_meta
 from schemas.task_models import MetaResult
 import logging
@@ -11,29 +14,28 @@ class MetaAgent:
         with open(META_PROMPT_PATH, "r") as f:
             self.prompt_template = f.read()
         # OllamaClient.send(prompt: str) -> str
-        self.client = OllamaClient()
+        self.client = OllamaClient(agent_name=self.__class__.__name__, schema=MetaResult)
 
+    @track_agent_run
     async def run(self, user_goal: str, parent_context: str="") -> MetaResult:
         """
         1. Fill the meta prompt with the user goal.
-        2. Call the LLM synchronously via client.send(prompt).
+        2. Await the LLM via client.send(prompt).
         3. Parse JSON into MetaResult.
         """
         # 1. Prepare prompt
         prompt = (self.prompt_template
-                .replace("{parent_context}", parent_context)
+                .replace("{parent_context}", fit_context(parent_context))
                 .replace("{user_goal}", user_goal)
         )
 
 
-        logging.debug(f"[{self.__class__.__name__}] using prompt template from {META_PROMPT_PATH}")
-        logging.debug(f"[{self.__class__.__name__}] filled prompt:\n{prompt}\n--- end prompt ---")
-        raw_output = self.client.send(prompt)
-
-        # 2. Invoke LLM (synchronous)
-        raw_output = self.client.send(prompt)
-
-        # 3. Parse into MetaResult
-        result = parse_meta(raw_output)
+        logging.debug(
+            "[%s] filled prompt from %s: %s", self.__class__.__name__, META_PROMPT_PATH, log_body(prompt)
+        )
+        # 2. Invoke LLM (async) and parse into MetaResult; malformed JSON is
+        #    repaired in process, and only re-requested if that fails
+        with self.client.invocation():
+            result = await self.client.send_parsed(prompt, parse_meta)
 
         return result
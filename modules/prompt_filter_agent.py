@@ -1,6 +1,8 @@
 # modules/prompt_filter_agent.py
 from config import FILTER_PROMPT_PATH
 from utils.llm_client import OllamaClient
+from utils.logging import log_body
+from utils.metrics import track_agent_run
 import logging
 
 class PromptFilterAgent:
@@ -10,17 +12,17 @@ class PromptFilterAgent:
     def __init__(self):
         with open(FILTER_PROMPT_PATH, "r") as f:
             self.prompt_template = f.read()
-        self.client = OllamaClient()
+        self.client = OllamaClient(agent_name=self.__class__.__name__)
 
+    @track_agent_run
     async def run(self, raw_prompt: str) -> str:
         """
         Returns the cleaned prompt as a plain string.
         """
         prompt = self.prompt_template.replace("{raw_prompt}", raw_prompt)
-        logging.debug(f"[{self.__class__.__name__}] using prompt template from {FILTER_PROMPT_PATH}")
-        logging.debug(f"[{self.__class__.__name__}] filled prompt:\n{prompt}\n--- end prompt ---")
-        raw_output = self.client.send(prompt)
-
-        # single-positional call
-        cleaned = self.client.send(prompt)
+        logging.debug(
+            "[%s] filled prompt from %s: %s", self.__class__.__name__, FILTER_PROMPT_PATH, log_body(prompt)
+        )
+        with self.client.invocation():
+            cleaned = await self.client.send(prompt)
         return cleaned.strip()
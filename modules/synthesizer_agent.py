@@ -1,10 +1,13 @@
 # modules/synthesizer_agent.py
 
-import json
 from typing import Any, Dict
 
 from config import SYNTH_PROMPT_PATH
 from utils.llm_client import OllamaClient
+from utils.logging import log_body
+from utils.metrics import track_agent_run
+from utils.tokens import compact_json
+from utils.parser import parse_synth
 from schemas.task_models import SynthResult  # you’ll need to add this model in task_models.py
 import logging
 
@@ -17,8 +20,9 @@ class SynthesizerAgent:
         # Load the synthesizer prompt template
         with open(SYNTH_PROMPT_PATH, "r") as f:
             self.prompt_template = f.read()
-        self.client = OllamaClient()
+        self.client = OllamaClient(agent_name=self.__class__.__name__, schema=SynthResult)
 
+    @track_agent_run
     async def run(self, synth_input: Dict[str, Any]) -> SynthResult:
         """
         synth_input dict must contain:
@@ -32,16 +36,13 @@ class SynthesizerAgent:
         prompt = (
             self.prompt_template
             .replace("{user_goal}", synth_input["user_goal"])
-            .replace("{branches_json}", json.dumps(synth_input["branches"], indent=2))
-            .replace("{suggestions_json}", json.dumps(synth_input["suggestions"], indent=2))
+            .replace("{branches_json}", compact_json(synth_input["branches"]))
+            .replace("{suggestions_json}", compact_json(synth_input["suggestions"]))
         )
-        logging.debug(f"[{self.__class__.__name__}] using prompt template from {SYNTH_PROMPT_PATH}")
-        logging.debug(f"[{self.__class__.__name__}] filled prompt:\n{prompt}\n--- end prompt ---")
-        raw_output = self.client.send(prompt)
-
-        # 2. Invoke the LLM (synchronous call)
-        raw_output = self.client.send(prompt)
-
-        # 3. Parse the JSON response into your SynthResult schema
-        data = json.loads(raw_output)
-        return SynthResult(**data)
+        logging.debug(
+            "[%s] filled prompt from %s: %s", self.__class__.__name__, SYNTH_PROMPT_PATH, log_body(prompt)
+        )
+        # 2. Invoke the LLM (async call) and parse the JSON response into
+        #    your SynthResult schema, repairing near-JSON before re-calling
+        with self.client.invocation():
+            return await self.client.send_parsed(prompt, parse_synth)
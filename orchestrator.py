@@ -1,21 +1,169 @@
-import sys
+import argparse
 import asyncio
 import json
+import time
+import uuid
 
-from config import MAX_PARALLEL_TASKS, MAX_RECURSION_DEPTH
+from config import (
+    MAX_RECURSION_DEPTH,
+    CACHE_ENABLED,
+    MEMO_ENABLED,
+    DEDUP_ENABLED,
+    DAG_SCHEDULING,
+    PIPELINED_EVAL,
+    EVAL_BATCH_SIZE,
+    SPECULATIVE_EXPLORE,
+    CHECKPOINT_ENABLED,
+    CHECKPOINT_KEEP_COMPLETED,
+    FAILURE_POLICY,
+)
 from modules.meta_agent import MetaAgent
 from modules.explorer_agent import ExplorerAgent
 from modules.evaluator_agent import EvaluatorAgent
 from modules.design_agent import DesignAgent
 from modules.synthesizer_agent import SynthesizerAgent
 from modules.prompt_filter_agent import PromptFilterAgent
+from schemas.task_models import MetaResult, ExploreResult, FailedResult, EvalResult, SynthResult
 
-from utils.concurrency import run_parallel
+from utils.llm_client import close_http_pool
+from utils.cache import get_default_cache
+from utils.memo import SubtreeMemo, get_default_memo, dump_node_result, load_node_result
+from utils.checkpoint import CheckpointJournal, format_path, parse_path
+from utils.dedup import SubtaskIndex
+from utils.dag import resolve_dependencies, run_dag, topological_order
+from utils.sharding import shard_branches, reduce_tree
+from utils.tokens import extend_context, fit_context
+from utils.expansion import get_policy
+from utils.budget import BudgetExhausted, RunBudget
+from utils.concurrency import OwnerCancelled
+from utils.run_context import current_run, start_run, end_run, enter_node
+from utils.tracing import span
 from utils.logging import log_info, log_error
 
 
+async def _with_http_pool(coro):
+    """Await coro, then release the loop's pooled HTTP connections."""
+    try:
+        return await coro
+    finally:
+        await close_http_pool()
+
+
+def _as_branch(subtask: str, child: dict, dependencies=None) -> ExploreResult:
+    """Summarize a deeper orchestration result as one branch of its parent."""
+    return ExploreResult(
+        subtask=subtask, steps=child["synth"].merged_plan, dependencies=dependencies
+    )
+
+
+def _fallback_plan(branches) -> SynthResult:
+    """
+    Deterministic stand-in for the synthesizer once the budget is spent:
+    every branch's steps in order, without exact repeats.
+    """
+    seen = set()
+    plan = []
+    for br in branches:
+        for step in br.steps:
+            key = step.strip().lower()
+            if key not in seen:
+                seen.add(key)
+                plan.append(step)
+    return SynthResult(merged_plan=plan)
+
+
+async def _gather_critiques(aws):
+    """
+    Await evaluator calls, keeping those that finished. Returns the
+    critiques and whether any were skipped because the budget ran out.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for res in results:
+        if isinstance(res, BaseException) and not isinstance(res, BudgetExhausted):
+            raise res
+    critiques = [res for res in results if not isinstance(res, BaseException)]
+    return critiques, len(critiques) < len(results)
+
+
+def _merge_evals(results) -> EvalResult:
+    """Concatenate the critiques of several branch batches, in batch order."""
+    return EvalResult(
+        issues=[issue for res in results for issue in res.issues],
+        suggestions=[s for res in results for s in res.suggestions],
+    )
+
+
+async def _synthesize(user_goal: str, shards, shard_suggestions, suggestions):
+    """
+    Merge branches into one plan. A single shard is one SynthesizerAgent
+    call; otherwise each shard (with its own critique) is synthesized in
+    parallel and the partial plans are reduced REDUCE_FAN_IN at a time,
+    the root-level reduce receiving the level-wide `suggestions`.
+    """
+    if len(shards) == 1:
+        return await SynthesizerAgent().run({
+            "user_goal": user_goal,
+            "branches": [br.model_dump() for br in shards[0]],
+            # "feedback":    eval_res.feedback,
+            "suggestions": suggestions,
+        })
+
+    partials = await asyncio.gather(*(
+        SynthesizerAgent().run({
+            "user_goal": user_goal,
+            "branches": [br.model_dump() for br in shard],
+            "suggestions": shard_sugg,
+        })
+        for shard, shard_sugg in zip(shards, shard_suggestions)
+    ))
+
+    async def _combine(group, final):
+        current_run().stats["reduce_calls"] += 1
+        return await SynthesizerAgent().run({
+            "user_goal": user_goal,
+            "branches": [
+                {"subtask": f"Partial plan {k}", "steps": part.merged_plan}
+                for k, part in enumerate(group, start=1)
+            ],
+            "suggestions": suggestions if final else [],
+        })
+
+    return await reduce_tree(list(partials), _combine)
+
+
+def _dag_context(root_goal: str, goal: str, lvl: int, prerequisites: dict) -> str:
+    """
+    Context for a subtask in DAG mode: the root goal, its parent goal and the
+    finished output of each prerequisite ({subtask: steps}), rather than
+    every ancestor's goal line.
+    """
+    lines = [f"User goal: {root_goal}"]
+    if goal != root_goal:
+        lines.append(f"User goal at depth {lvl}: {goal}")
+    for name, steps in prerequisites.items():
+        lines.append(f'Completed prerequisite "{name}":')
+        lines.extend(f"- {step}" for step in steps)
+    return fit_context("\n".join(lines))
+
+
+def failed_branches(result: dict, path: tuple = ()):
+    """Yield (tree path, FailedResult) for every failed branch under `result`."""
+    for i, item in enumerate(result["explore"]):
+        if isinstance(item, FailedResult):
+            yield path + (i,), item
+        elif isinstance(item, dict):
+            yield from failed_branches(item, path + (i,))
+
+
 # def orchestrate(user_goal: str):
-def orchestrate(user_goal: str, parent_context: str = "", depth: int=0):
+def orchestrate(
+    user_goal: str,
+    parent_context: str = "",
+    depth: int=0,
+    budget: RunBudget = None,
+    run_id: str = None,
+    branch: tuple = None,
+):
     """
     Core orchestration flow:
       1. Decompose goal into subtasks via MetaAgent
@@ -23,89 +171,529 @@ def orchestrate(user_goal: str, parent_context: str = "", depth: int=0):
       3. Merge branch outputs via EvaluatorAgent
       4. Plan file structure via DesignAgent
     Returns a dict with all intermediate and final results.
+
+    `budget` (default: RUN_DEADLINE_SEC / RUN_MAX_CALLS / RUN_MAX_TOKENS)
+    bounds the run. As it runs low, levels stop recursing and resolve
+    subtasks with single ExplorerAgent calls; once it is spent, the calls
+    still pending are skipped and each level returns a best-so-far plan
+    built from the branches that finished, marked with "partial": True.
+
+    With CHECKPOINT_ENABLED, completed work is journaled under `run_id`
+    (default: a fresh id). Passing the id of an interrupted run resumes it:
+    journaled results are replayed and only the missing calls are made.
+    `branch` (a tree path such as (0, 2)) re-plans just that subtree of
+    the journaled run, e.g. one that failed, and returns its result. The
+    journal of a run that completes with no failed or partial branch is
+    deleted unless CHECKPOINT_KEEP_COMPLETED.
     """
     if depth == 0:
-        filter_agent = PromptFilterAgent()
-        filtered_goal = asyncio.run(filter_agent.run(user_goal))
-        return orchestrate(filtered_goal, "", 1)
+        run = start_run(run_id, budget=budget or RunBudget.from_config())
+        if CHECKPOINT_ENABLED:
+            run.journal = CheckpointJournal(run.run_id)
+            log_info(f"Checkpointing run {run.run_id} to {run.journal.path}")
+        journal = run.journal
+        # the cache outlives the run: report only this run's lookups
+        cache = get_default_cache() if CACHE_ENABLED else None
+        cache_before = cache.snapshot() if cache is not None else None
+        try:
+            with span("run", goal=user_goal):
+                if branch is not None:
+                    root_goal = journal.get("filter", ()) if journal is not None else None
+                    if root_goal is None:
+                        raise ValueError(f"Run {run.run_id} has no checkpoint to retry a branch from")
+                    return orchestrate(root_goal, "", 1, branch=branch)
+
+                filtered_goal = None
+                if journal is not None:
+                    if journal.get("run", ()) is None:
+                        journal.record("run", (), {"goal": user_goal}, goal=user_goal)
+                    filtered_goal = journal.get("filter", (), user_goal)
+                if filtered_goal is not None:
+                    run.stats["checkpoint_replayed"] += 1
+                else:
+                    filter_agent = PromptFilterAgent()
+                    try:
+                        filtered_goal = asyncio.run(_with_http_pool(filter_agent.run(user_goal)))
+                        if journal is not None:
+                            journal.record("filter", (), filtered_goal, goal=user_goal)
+                    except BudgetExhausted:
+                        filtered_goal = user_goal
+                result = orchestrate(filtered_goal, "", 1)
+                if (
+                    journal is not None and not CHECKPOINT_KEEP_COMPLETED
+                    and not result.get("partial") and not any(failed_branches(result))
+                ):
+                    # nothing left to resume or retry
+                    journal.discard()
+                    log_info(f"Run {run.run_id} completed; removed its checkpoint")
+                return result
+        finally:
+            end_run(run)
+            if journal is not None:
+                journal.close()
+            if cache is not None:
+                cache.log_stats(since=cache_before)
+    memo = get_default_memo() if MEMO_ENABLED else None
+    # subtrees being planned right now, so identical siblings share one
+    pending_subtrees = {}
+    policy = get_policy()
+    # near-duplicate subtasks seen anywhere in this tree
+    dedup = SubtaskIndex() if DEDUP_ENABLED else None
+    # completed work of this run (and of the run being resumed)
+    journal = current_run().journal
+    # subtree results already journaled, by id: (result, path); a parent's
+    # record refers to these instead of copying them in again
+    journaled = {}
+
+    def _journal_ref(child):
+        entry = journaled.get(id(child))
+        return entry[1] if entry is not None and entry[0] is child else None
+
+    def _resolve_ref(ref):
+        data = journal.get("node", parse_path(ref))
+        if data is None:
+            raise KeyError(f"checkpointed subtree {ref!r} is missing")
+        return data
+
+    def _shared(kind, lvl, sub, compute, parent):
+        if dedup is None:
+            return compute()
+        return dedup.share(kind, lvl, sub, compute, parent=parent)
+
+    async def _run(goal, context, lvl, path=()):
+        enter_node(path)
+        started = time.perf_counter()
+        outcome = "expanded"
+        try:
+            with span("node", path=format_path(path), goal=goal, depth=lvl) as node_span:
+                stats = current_run().stats
+                if journal is not None:
+                    replayed = journal.get("node", path, goal)
+                    if replayed is not None:
+                        try:
+                            result = load_node_result(replayed, _resolve_ref)
+                        except KeyError as e:
+                            log_info(f"Not replaying {format_path(path) or 'root'}: {e}")
+                        else:
+                            stats["checkpoint_replayed"] += 1
+                            outcome = "checkpoint"
+                            node_span.set(outcome="checkpoint")
+                            log_info(f"Replaying checkpointed subtree {format_path(path) or 'root'} for goal: {goal}")
+                            journaled[id(result)] = (result, format_path(path))
+                            return result
+                    if journal.get("start", path, goal) is None:
+                        # lets this subtree be retried on its own later
+                        journal.record("start", path, {"goal": goal, "context": context, "lvl": lvl}, goal=goal)
+                if memo is not None:
+                    cached = memo.get(goal, context, lvl)
+                    if cached is not None:
+                        stats["subtree_memo_hits"] += 1
+                        outcome = "memo"
+                        node_span.set(outcome="memo")
+                        log_info(f"Reusing memoized subtree for goal: {goal} (depth={lvl})")
+                        return cached
+                    stats["subtree_memo_misses"] += 1
+
+                key = SubtreeMemo.make_key(goal, context, lvl)
+                pending = pending_subtrees.get(key)
+                while pending is not None:
+                    log_info(f"Sharing in-flight subtree for goal: {goal} (depth={lvl})")
+                    try:
+                        result = await asyncio.shield(pending)
+                    except OwnerCancelled:
+                        # the planning branch was cancelled, not this one: plan it here
+                        pending = pending_subtrees.get(key)
+                        continue
+                    stats["subtree_coalesced"] += 1
+                    outcome = "coalesced"
+                    node_span.set(outcome="coalesced")
+                    return result
+
+                fut = asyncio.get_running_loop().create_future()
+                fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+                pending_subtrees[key] = fut
+                try:
+                    result = await _expand(goal, context, lvl, path)
+                except asyncio.CancelledError:
+                    fut.set_exception(OwnerCancelled())
+                    raise
+                except BaseException as e:
+                    fut.set_exception(e)
+                    raise
+                finally:
+                    pending_subtrees.pop(key, None)
+                fut.set_result(result)
+                if result.get("partial"):
+                    outcome = "partial"
+                    node_span.set(partial=True)
+                # a budget-truncated subtree must not stand in for a full one later
+                if memo is not None and not result.get("partial"):
+                    memo.put(goal, context, lvl, result)
+                if journal is not None and not result.get("partial"):
+                    # child subtrees have records of their own: refer to them
+                    journal.record("node", path, dump_node_result(result, _journal_ref), goal=goal)
+                    journaled[id(result)] = (result, format_path(path))
+                return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            metrics = current_run().metrics
+            metrics.histogram("orchestration_node_seconds", "Orchestration node latency, subtree included").observe(
+                time.perf_counter() - started, depth=lvl
+            )
+            metrics.counter("orchestration_nodes_total", "Orchestration nodes by outcome").inc(
+                depth=lvl, outcome=outcome
+            )
+
     # async def _run():
-    async def _run(goal, context, lvl):
+    async def _expand(goal, context, lvl, path):
         log_info(f"Orchestration started for goal: {goal} (depth={lvl})")
 
+        stats = current_run().stats
+        budget = current_run().budget
+        # set once any stage below had to be skipped for lack of budget
+        partial = False
+
+        def _out_of_budget(stage):
+            nonlocal partial
+            partial = True
+            stats["budget_fallbacks"] += 1
+            log_info(f"Budget exhausted, skipping {stage} for goal: {goal} (depth={lvl})")
+
         try:
+            combined_context = extend_context(context, f"User goal at depth {lvl}: {goal}")
+
+            def _context_for(done):
+                if not DAG_SCHEDULING:
+                    return combined_context
+                return _dag_context(user_goal, goal, lvl, {
+                    subs[j]: (r["synth"].merged_plan if isinstance(r, dict) else r.steps)
+                    for j, r in sorted(done.items())
+                    if not isinstance(r, FailedResult)
+                })
+
+            journaled_meta = journal.get("meta", path, goal) if journal is not None else None
+
+            # with SPECULATIVE_EXPLORE, explore the goal itself while MetaAgent
+            # decides; the result is used if this turns out to be a leaf
+            speculative = None
+            if SPECULATIVE_EXPLORE and journaled_meta is None:
+                speculative = asyncio.create_task(ExplorerAgent().run(goal, _context_for({})))
+                speculative.add_done_callback(lambda t: t.cancelled() or t.exception())
+
             # 1. Meta decomposition
             meta_agent = MetaAgent()
-            meta_res = await meta_agent.run(goal, context)
-            combined_context = (context + "\n" + f"User goal at depth {lvl}: {goal}").strip()
+            try:
+                if journaled_meta is not None:
+                    stats["checkpoint_replayed"] += 1
+                    meta_res = MetaResult(**journaled_meta)
+                else:
+                    meta_res = await meta_agent.run(goal, context)
+                    if journal is not None:
+                        journal.record("meta", path, meta_res.model_dump(), goal=goal)
+            except BudgetExhausted:
+                _out_of_budget("decomposition")
+                meta_res = MetaResult(is_multi_step=False, subtasks=[])
+            except BaseException:
+                if speculative is not None:
+                    speculative.cancel()
+                raise
 
+            # Collapse paraphrased siblings before anything fans out
+            merged_into = []
+            if dedup is not None and meta_res.subtasks:
+                meta_res.subtasks, merged_into = dedup.merge_level(meta_res.subtasks)
 
             # Determine subtasks (fallback to entire goal if not multi-step)
             subtasks = meta_res.subtasks if meta_res.is_multi_step and meta_res.subtasks else [user_goal]
             log_info(f"Identified subtasks: {subtasks}")
 
-            if lvl < MAX_RECURSION_DEPTH and meta_res.is_multi_step and meta_res.subtasks:
-                # recurse one layer deeper in parallel
-                tasks = [
-                    asyncio.create_task(_run(sub, combined_context, lvl+1))
-                    for sub in meta_res.subtasks
-                ]
-                # each result is the full dict from a deeper orchestrate
-                explore_results = await asyncio.gather(*tasks)
+            expand = lvl < MAX_RECURSION_DEPTH and meta_res.is_multi_step and meta_res.subtasks
+            if expand and not budget.should_expand():
+                # running low: resolve this level with one explorer call per subtask
+                stats["budget_leaf_fallbacks"] += 1
+                log_info(f"Budget running low, not expanding below depth {lvl} for goal: {goal}")
+                expand = False
+            subs = meta_res.subtasks or [goal]
+            # subtasks planned as their own subtree; the rest get one explorer call
+            chosen = policy.select(subs, meta_res, lvl) if expand else set()
+            if expand and len(chosen) < len(subs):
+                stats["expansion_pruned"] += len(subs) - len(chosen)
+                log_info(f"Expanding {len(chosen)} of {len(subs)} subtasks at depth {lvl}")
+
+            # the speculative exploration is only valid for a leaf on the goal itself
+            speculative_hit = speculative is not None and subs == [goal] and not chosen
+
+            def _discard_speculative():
+                stats["speculative_misses"] += 1
+                if speculative.done():
+                    # its backend call completed for nothing
+                    stats["speculative_wasted_calls"] += 1
+                else:
+                    stats["speculative_cancelled"] += 1
+                    speculative.cancel()
+
+            if speculative is not None and not speculative_hit:
+                _discard_speculative()
+
+            # with DAG_SCHEDULING, dependent subtasks wait for their
+            # prerequisites and see their output; otherwise all run at once
+            if DAG_SCHEDULING:
+                prereqs = resolve_dependencies(subs, meta_res.dependencies)
             else:
+                prereqs = [set() for _ in subs]
+
+            def _branch(i, result):
+                if not isinstance(result, dict):
+                    return result
+                deps = [subs[j] for j in sorted(prereqs[i])] or None
+                return _as_branch(subs[i], result, deps)
+
+            # with PIPELINED_EVAL, finished branches are critiqued in small
+            # batches while their siblings are still running
+            eval_tasks = []
+            batch = []
+
+            def _flush_batch():
+                eval_tasks.append(asyncio.create_task(EvaluatorAgent().run(list(batch))))
+                batch.clear()
+
+            def _on_branch(i, result):
+                batch.append(_branch(i, result))
+                if len(batch) >= EVAL_BATCH_SIZE:
+                    _flush_batch()
+
+            on_result = _on_branch if PIPELINED_EVAL else None
+
+            # unless FAILURE_POLICY is "raise", a failing branch becomes a
+            # FailedResult and the level is planned from the survivors
+            errors = {}
+
+            def _on_error(i, exc):
+                errors[i] = exc
+                if isinstance(exc, asyncio.CancelledError):
+                    stats["branches_cancelled"] += 1
+                    return FailedResult(subtask=subs[i], error="cancelled after a sibling failed")
+                stats["branches_failed"] += 1
+                log_error(f"Branch {format_path(path + (i,))} failed: {exc}")
+                return FailedResult(subtask=subs[i], error=f"{type(exc).__name__}: {exc}")
+
+            on_error = None if FAILURE_POLICY == "raise" else _on_error
+            async def _explore_one(i, ctx, pending=None):
+                task = subs[i]
+                if journal is not None:
+                    replayed = journal.get("explore", path + (i,), task)
+                    if replayed is not None:
+                        if pending is not None:
+                            _discard_speculative()
+                        stats["checkpoint_replayed"] += 1
+                        return ExploreResult(**replayed)
+                try:
+                    if pending is not None:
+                        res = await pending
+                        stats["speculative_hits"] += 1
+                    else:
+                        res = await ExplorerAgent().run(task, ctx)
+                    if journal is not None:
+                        journal.record("explore", path + (i,), res.model_dump(), goal=task)
+                    return res
+                except BudgetExhausted:
+                    _out_of_budget("exploration")
+                    return ExploreResult(subtask=task, steps=[task])
+
+            def _child(i, done):
+                ctx = _context_for(done)
+                if i in chosen:
+                    # recurse one layer deeper; LLM calls are bounded by
+                    # the run-wide scheduler, not per level
+                    return _shared(
+                        "node", lvl+1, subs[i],
+                        lambda: _run(subs[i], ctx, lvl+1, path + (i,)),
+                        goal,
+                    )
                 # leaf: just run ExplorerAgent, feeding context
-                explorers = [
-                    ExplorerAgent().run(task, combined_context)
-                    for task in (meta_res.subtasks or [goal])
-                ]
-                explore_results = await run_parallel(explorers, limit=MAX_PARALLEL_TASKS)
+                if speculative_hit:
+                    # already paid for: use it rather than another branch's result
+                    return _explore_one(i, ctx, speculative)
+                return _shared(
+                    "explore", lvl+1, subs[i],
+                    lambda: _explore_one(i, ctx),
+                    goal,
+                )
+
+            try:
+                # each result is either the full dict from a deeper
+                # orchestrate or a single ExploreResult
+                explore_results = await run_dag(
+                    prereqs, _child, on_result, on_error, fail_fast=FAILURE_POLICY == "fail_fast"
+                )
+            except BaseException:
+                for task in eval_tasks:
+                    task.cancel()
+                if speculative is not None:
+                    speculative.cancel()
+                raise
+            survivors = {
+                i: _branch(i, r) for i, r in enumerate(explore_results)
+                if not isinstance(r, FailedResult)
+            }
+            branches = list(survivors.values())
+            if errors:
+                if not branches:
+                    for task in eval_tasks:
+                        task.cancel()
+                    # nothing survived: fail this level as a whole
+                    raise next(e for e in errors.values() if not isinstance(e, asyncio.CancelledError))
+                partial = True
+            if any(isinstance(r, dict) and r.get("partial") for r in explore_results):
+                partial = True
+            if merged_into:
+                dedup.record_savings(merged_into, explore_results)
+            if DAG_SCHEDULING:
+                # present branches in dependency order, also honouring the
+                # dependencies explorers reported for themselves
+                reported = {
+                    subs[i]: [subs[j] for j in prereqs[i]] + list(br.dependencies or [])
+                    for i, br in survivors.items()
+                }
+                order = topological_order(resolve_dependencies(subs, reported))
+                branches = [survivors[i] for i in order if i in survivors]
+
+            # wide levels are evaluated and synthesized shard by shard
+            shards = shard_branches(branches)
+            if len(shards) > 1:
+                stats["reduce_shards"] += len(shards)
+                log_info(f"Sharding {len(branches)} branches into {len(shards)} shards")
 
             # 3. Critique each branch (feedback + suggestions)
-            eval_res = await EvaluatorAgent().run(explore_results)
+            shard_suggestions = [[] for _ in shards]
+            if PIPELINED_EVAL:
+                if batch:
+                    _flush_batch()
+                critiques, skipped = await _gather_critiques(eval_tasks)
+                eval_res = _merge_evals(critiques)
+                suggestions = eval_res.suggestions
+            elif len(shards) == 1:
+                critiques, skipped = await _gather_critiques([EvaluatorAgent().run(branches)])
+                eval_res = _merge_evals(critiques)
+                suggestions = eval_res.suggestions
+            else:
+                shard_evals, skipped = await _gather_critiques(
+                    [EvaluatorAgent().run(sh) for sh in shards]
+                )
+                eval_res = _merge_evals(shard_evals)
+                if not skipped:
+                    # each shard's critique travels with that shard's synthesis
+                    shard_suggestions = [res.suggestions for res in shard_evals]
+                    suggestions = []
+                else:
+                    suggestions = eval_res.suggestions
+            if skipped:
+                _out_of_budget("evaluation")
             log_info("Evaluator produced feedback and suggestions.")
 
             # 4. Synthesize final plan from parent goal + branches + feedback
-            synth_in = {
-                "user_goal": user_goal,
-                "branches": [br.dict() for br in explore_results],
-                # "feedback":    eval_res.feedback,
-                "suggestions": eval_res.suggestions,
-            }
-            synth_res = await SynthesizerAgent().run(synth_in)
+            try:
+                synth_res = await _synthesize(user_goal, shards, shard_suggestions, suggestions)
+            except BudgetExhausted:
+                _out_of_budget("synthesis")
+                synth_res = _fallback_plan(branches)
             log_info("Synthesizer combined everything into a final plan.")
 
             # 5. Design file/folder tree
             file_tree = DesignAgent().plan(synth_res.merged_plan)
             log_info("Design tree generated.")
 
-            return {
+            result = {
                 "meta": meta_res,
                 "explore": explore_results,
                 "eval": eval_res,
                 "synth":   synth_res,
                 "design": file_tree,
             }
+            if partial:
+                result["partial"] = True
+            return result
 
         except Exception as e:
             log_error(f"Orchestration error: {e}")
             raise
 
+    if branch is not None:
+        start = journal.get("start", branch) if journal is not None else None
+        if start is None:
+            raise ValueError(f"No checkpointed branch at path {format_path(branch)!r}")
+        log_info(f"Retrying checkpointed branch {format_path(branch)}: {start['goal']}")
+        return asyncio.run(_with_http_pool(
+            _run(start["goal"], start["context"], start["lvl"], tuple(branch))
+        ))
+
     # return asyncio.run(_run())
-    return asyncio.run(_run(user_goal, parent_context, depth))
+    return asyncio.run(_with_http_pool(_run(user_goal, parent_context, depth)))
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python orchestrator.py <user_goal>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Plan a software project from a goal.")
+    parser.add_argument("user_goal", nargs="*", help="what to build")
+    parser.add_argument("--deadline", type=float, help="wall-clock budget for the run, in seconds")
+    parser.add_argument("--max-calls", type=int, help="maximum LLM calls for the run")
+    parser.add_argument("--max-tokens", type=int, help="maximum estimated LLM tokens for the run")
+    parser.add_argument("--resume", metavar="RUN_ID", help="resume a checkpointed run")
+    parser.add_argument(
+        "--retry-branch", metavar="PATH",
+        help="with --resume, re-plan only the subtree at PATH (e.g. 0.2)",
+    )
+    args = parser.parse_args()
 
-    user_goal = " ".join(sys.argv[1:])
-    result = orchestrate(user_goal)
+    run_id = args.resume or uuid.uuid4().hex[:12]
+    if args.resume:
+        if not CheckpointJournal.exists(args.resume):
+            parser.error(f"no checkpoint found for run {args.resume}")
+        journal = CheckpointJournal(args.resume)
+        started = journal.get("run", ())
+        journal.close()
+        user_goal = " ".join(args.user_goal) or (started or {}).get("goal")
+    elif args.retry_branch:
+        parser.error("--retry-branch requires --resume")
+    else:
+        user_goal = " ".join(args.user_goal)
+    if not user_goal:
+        parser.error("a goal is required")
+    budget = RunBudget.from_config()
+    for name, value in (
+        ("deadline_sec", args.deadline),
+        ("max_calls", args.max_calls),
+        ("max_tokens", args.max_tokens),
+    ):
+        if value is not None:
+            setattr(budget, name, value)
+    branch = parse_path(args.retry_branch) if args.retry_branch else None
+    try:
+        result = orchestrate(user_goal, budget=budget, run_id=run_id, branch=branch)
+    except BaseException:
+        # also on Ctrl-C or a cancellation: the journal is there to resume from
+        if CHECKPOINT_ENABLED:
+            print(f"\nRun {run_id} failed; continue it with --resume {run_id}")
+        raise
 
     # Display merged plan
-    print("\n=== Unified Plan ===")
-    for idx, step in enumerate(result["eval"].merged_plan, start=1):
+    title = "Unified Plan (partial)" if result.get("partial") else "Unified Plan"
+    print(f"\n=== {title} ===")
+    for idx, step in enumerate(result["synth"].merged_plan, start=1):
         print(f"{idx}. {step}")
 
+    failed = list(failed_branches(result, branch or ()))
+    if failed:
+        print("\n=== Failed Branches ===")
+        for path, res in failed:
+            print(f"{format_path(path)}: {res.subtask} ({res.error})")
+        if CHECKPOINT_ENABLED:
+            print(f"Retry one with --resume {run_id} --retry-branch <path>")
+
     # Display file structure
     print("\n=== File Structure ===")
     print(json.dumps(result["design"], indent=2))
@@ -1,10 +1,65 @@
-import re
 import json
+from typing import List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
 
 from .task_models import MetaResult, ExploreResult, EvalResult
 
-# Regex to extract the first JSON object in a response
-JSON_OBJ_PATTERN = re.compile(r"\{(?:[^{}]|(?R))*\}", re.DOTALL)
+
+class JSONObjectScanner:
+    """
+    Incremental, brace-balanced scanner for JSON objects in LLM output.
+
+    Feed it text in arbitrary chunks (e.g. streamed tokens); each call to
+    `feed` returns the top-level `{...}` spans that closed within that
+    chunk. Braces inside JSON strings (including escaped quotes) are
+    ignored, and any text between objects is skipped.
+    """
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[str]:
+        closed = []
+        for ch in chunk:
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._buf = [ch]
+                continue
+
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    closed.append("".join(self._buf))
+                    self._buf = []
+        return closed
+
+
+def match_schema(candidate: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+    """
+    Return `candidate` validated as `schema`, or None if it is not valid
+    JSON for that model.
+    """
+    try:
+        return schema.model_validate_json(candidate)
+    except ValidationError:
+        return None
 
 
 def _extract_json(raw: str) -> str:
@@ -12,10 +67,13 @@ def _extract_json(raw: str) -> str:
     Find and return the first JSON object in the raw LLM response.
     Raises ValueError if none found.
     """
-    match = JSON_OBJ_PATTERN.search(raw)
-    if not match:
-        raise ValueError("No JSON object found in LLM response")
-    return match.group(0)
+    for candidate in JSONObjectScanner().feed(raw):
+        try:
+            json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        return candidate
+    raise ValueError("No JSON object found in LLM response")
 
 
 def parse_meta_response(raw: str) -> MetaResult:
@@ -1,17 +1,24 @@
 # schemas/task_models.py
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class MetaResult(BaseModel):
     is_multi_step: bool
     subtasks: List[str]
+    dependencies: Optional[Dict[str, List[str]]] = None
+    confidence: Optional[float] = None
 
 class ExploreResult(BaseModel):
     subtask: str
     steps: List[str]
     dependencies: Optional[List[str]] = None
 
+class FailedResult(BaseModel):
+    """A branch that raised instead of producing a plan."""
+    subtask: str
+    error: str
+
 class EvalResult(BaseModel):
     issues: List[str]
     suggestions: List[str]
@@ -0,0 +1,224 @@
+# tests/conftest.py
+import asyncio
+import json
+import logging.handlers
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import utils.logging as log_module
+from utils.llm_client import OllamaClient
+from utils.run_context import start_run, end_run
+
+
+@pytest.fixture(autouse=True)
+def log_file(tmp_path):
+    # the listener writes to a per-test file instead of logs/orchestrator.log
+    path = tmp_path / "orchestrator.log"
+    handler = logging.handlers.RotatingFileHandler(path)
+    handler.setLevel(log_module.file_handler.level)
+    handler.setFormatter(log_module.formatter)
+    listener = log_module.listener
+    saved = listener.handlers
+    listener.handlers = tuple(handler if h is log_module.file_handler else h for h in saved)
+    yield path
+    # let the listener drain this test's records before switching back
+    log_module.log_queue.join()
+    listener.handlers = saved
+    handler.close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_run(log_file):
+    # isolate scheduler/AIMD state between tests; end_run's metric lines
+    # still go to the test's log file
+    run = start_run()
+    yield run
+    end_run(run)
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    # keep run journals out of the project's cache/
+    directory = tmp_path / "checkpoints"
+    monkeypatch.setattr("utils.checkpoint.CHECKPOINT_DIR", str(directory))
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def trace_path(tmp_path, monkeypatch):
+    # spans go to a per-test file instead of logs/trace.jsonl
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr("utils.tracing.TRACE_PATH", str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path, monkeypatch):
+    # end_run writes metrics here instead of logs/metrics
+    path = tmp_path / "metrics"
+    monkeypatch.setattr("utils.metrics.METRICS_DIR", str(path))
+    return path
+
+
+class StubOllama:
+    """
+    Minimal local stand-in for the Ollama HTTP API.
+    `/api/generate` replies with `reply` after `delay` seconds, failing the
+    first `fail_first` requests with a 500 (or all of them while `broken`).
+    Streaming requests get the reply as NDJSON chunks of `token_chars`
+    characters, `token_delay` seconds apart.
+    `/api/version` answers 200 unless `broken` is set.
+    """
+
+    def __init__(self, reply="ok", delay=0.0, fail_first=0, token_chars=4, token_delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.fail_first = fail_first
+        self.token_chars = token_chars
+        self.token_delay = token_delay
+        self.tokens_sent = 0
+        self.broken = False
+        self.requests = []
+        self.probes = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _write(self, status, payload):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                stub.probes += 1
+                if stub.broken:
+                    self._write(503, b'{"error": "down"}')
+                else:
+                    self._write(200, b'{"version": "stub"}')
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests.append(json.loads(body))
+                time.sleep(stub.delay)
+                if stub.broken or len(stub.requests) <= stub.fail_first:
+                    self._write(500, b'{"error": "boom"}')
+                    return
+                request = stub.requests[-1]
+                reply = stub.reply(request) if callable(stub.reply) else stub.reply
+                if request.get("stream"):
+                    self._stream(reply)
+                else:
+                    self._write(200, json.dumps({"response": reply, "done": True}).encode())
+
+            def _stream(self, reply):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                n = stub.token_chars
+                tokens = [reply[i:i + n] for i in range(0, len(reply), n)]
+                lines = [{"response": t, "done": False} for t in tokens]
+                lines.append({"response": "", "done": True})
+                try:
+                    for line in lines:
+                        data = (json.dumps(line) + "\n").encode()
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        self.wfile.flush()
+                        stub.tokens_sent += 1
+                        time.sleep(stub.token_delay)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # client hung up once it had what it needed
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_ollama():
+    """Factory for local stub Ollama servers: `with stub_ollama(...) as stub:`."""
+    return StubOllama
+
+
+class FakeLLM:
+    """
+    Scripted stand-in for the Ollama backend, patched in below the client's
+    cache/coalescing/scheduling layers. The root goal splits into
+    `subtasks` (default: `fanout` numbered ones), optionally declaring
+    `dependencies` between them; every other goal is single-step.
+    """
+
+    def __init__(self, fanout=3, delay=0.01):
+        self.fanout = fanout
+        self.subtasks = None
+        self.dependencies = None
+        self.delay = delay
+        self.calls = []
+        self.routes = []
+        self.active = 0
+        self.peak = 0
+
+    def reply(self, agent, prompt):
+        if agent == "PromptFilterAgent":
+            return "root goal"
+        if agent == "MetaAgent":
+            goal = re.search(r'Input:\s*"(.*)"', prompt).group(1)
+            if goal == "root goal":
+                subtasks = self.subtasks or [f"subtask {i}" for i in range(self.fanout)]
+                reply = {"is_multi_step": True, "subtasks": subtasks}
+                if self.dependencies:
+                    reply["dependencies"] = self.dependencies
+                return json.dumps(reply)
+            return json.dumps({"is_multi_step": False, "subtasks": []})
+        if agent == "ExplorerAgent":
+            subtask = re.search(r'Subtask:\s*"(.*)"', prompt).group(1)
+            return json.dumps({"subtask": subtask, "steps": [f"do {subtask}"], "dependencies": []})
+        if agent == "EvaluatorAgent":
+            return json.dumps({"issues": [], "suggestions": ["be careful"]})
+        if agent == "SynthesizerAgent":
+            return json.dumps({"merged_plan": ["step one", "step two"]})
+        raise AssertionError(f"unexpected agent {agent}")
+
+    async def send(self, client, prompt, route):
+        self.calls.append((client.agent_name, prompt))
+        self.routes.append(route)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return self.reply(client.agent_name, prompt)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    fake = FakeLLM()
+
+    async def _send_with_retries(self, prompt, route):
+        return await fake.send(self, prompt, route)
+
+    monkeypatch.setattr(OllamaClient, "_send_with_retries", _send_with_retries)
+    return fake
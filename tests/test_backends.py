@@ -0,0 +1,118 @@
+# tests/test_backends.py
+import asyncio
+import time
+
+import pytest
+
+import utils.llm_client as llm_client
+from utils.backends import Backend, BackendPool
+from utils.llm_client import OllamaClient
+
+
+@pytest.mark.asyncio
+async def test_least_outstanding_spreads_concurrent_calls(stub_ollama):
+    with stub_ollama(reply="a", delay=0.1) as a, stub_ollama(reply="b", delay=0.1) as b:
+        pool = BackendPool([Backend(a.url), Backend(b.url)])
+        client = OllamaClient(pool=pool, use_cache=False)
+        await asyncio.gather(*(client.send(f"p{i}") for i in range(4)))
+        await llm_client.close_http_pool()
+
+    assert len(a.requests) == 2
+    assert len(b.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_attempt_releases_backend(stub_ollama, fresh_run):
+    with stub_ollama(reply="late", delay=0.5) as stub:
+        backend = Backend(stub.url)
+        client = OllamaClient(pool=BackendPool([backend]), use_cache=False)
+        task = asyncio.create_task(client.send("p"))
+        await asyncio.sleep(0.1)
+        assert backend.outstanding == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await llm_client.close_http_pool()
+
+    assert backend.outstanding == 0
+    # a cancelled attempt is not held against the server
+    assert backend.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_weights_bias_routing():
+    big, small = Backend("http://big:1", weight=3), Backend("http://small:1", weight=1)
+    pool = BackendPool([big, small])
+    picks = [await pool.acquire() for _ in range(8)]
+
+    assert picks.count(big) == 6
+    assert picks.count(small) == 2
+
+
+@pytest.mark.asyncio
+async def test_failing_backend_is_ejected_and_readmitted(monkeypatch, stub_ollama, fresh_run):
+    monkeypatch.setattr(llm_client, "RETRY_BACKOFF_SEC", 0)
+    with stub_ollama(reply="good") as good, stub_ollama() as bad:
+        bad.broken = True
+        bad_backend = Backend(bad.url)
+        pool = BackendPool([bad_backend, Backend(good.url)], failure_threshold=2, reset_sec=0.5)
+        client = OllamaClient(pool=pool, use_cache=False)
+
+        for i in range(6):
+            assert await client.send(f"p{i}") == "good"
+        assert bad_backend.ejected
+        assert len(bad.requests) == 2
+        assert fresh_run.stats["backend_ejections"] == 1
+
+        # still down at the health check: stays ejected
+        await asyncio.sleep(0.55)
+        await client.send("probe while broken")
+        await pool.wait_for_probes()
+        assert bad_backend.ejected
+        assert bad.probes == 1
+
+        bad.broken = False
+        await asyncio.sleep(0.55)
+        await client.send("probe after recovery")
+        await pool.wait_for_probes()
+        await llm_client.close_http_pool()
+
+    assert not bad_backend.ejected
+    assert bad.probes == 2
+
+
+@pytest.mark.asyncio
+async def test_health_probes_run_in_the_background(monkeypatch):
+    up, dead_a, dead_b = Backend("http://up:1"), Backend("http://a:1"), Backend("http://b:1")
+    pool = BackendPool([up, dead_a, dead_b], reset_sec=60)
+    dead_a.ejected_until = dead_b.ejected_until = 0.0
+    probed = []
+
+    async def slow_probe(backend):
+        probed.append(backend)
+        await asyncio.sleep(0.3)
+        return backend is dead_b
+
+    monkeypatch.setattr(pool, "probe", slow_probe)
+    started = time.monotonic()
+    assert await pool.acquire() is up
+    assert time.monotonic() - started < 0.1
+    await pool.wait_for_probes()
+
+    # both probed at once, not one after the other
+    assert time.monotonic() - started < 0.5
+    assert probed == [dead_a, dead_b]
+    assert dead_a.ejected and not dead_b.ejected
+
+
+@pytest.mark.asyncio
+async def test_all_backends_ejected_still_attempts_soonest():
+    first, second = Backend("http://first:1"), Backend("http://second:1")
+    pool = BackendPool([first, second], reset_sec=60)
+    first.ejected_until, second.ejected_until = 10.0**12, 10.0**11
+    assert await pool.acquire() is second
+
+
+def test_pool_rejects_unknown_routing():
+    with pytest.raises(ValueError):
+        BackendPool([Backend("localhost:11434")], routing="random")
@@ -0,0 +1,61 @@
+# tests/test_budget.py
+import time
+
+import pytest
+
+import orchestrator
+from utils.budget import BudgetExhausted, RunBudget
+
+
+def test_budget_admits_up_to_max_calls():
+    budget = RunBudget(max_calls=2)
+    budget.admit()
+    assert budget.should_expand() is False  # half spent, at the reserve
+    budget.admit()
+    with pytest.raises(BudgetExhausted):
+        budget.admit()
+    assert RunBudget().remaining_fraction() == 1.0
+
+
+def test_tokens_and_deadline_count_toward_remaining_share():
+    budget = RunBudget(max_tokens=1000, deadline_sec=60)
+    budget.charge(250)
+    assert budget.remaining_fraction() == pytest.approx(0.75, abs=0.01)
+    budget.charge(750)
+    assert budget.exhausted()
+
+
+def _capture_runs(monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    return runs
+
+
+def test_call_budget_returns_best_so_far_plan(fake_llm, monkeypatch):
+    runs = _capture_runs(monkeypatch)
+    result = orchestrator.orchestrate("build a to-do list app", budget=RunBudget(max_calls=4))
+
+    assert len(fake_llm.calls) <= 4
+    assert result["partial"] is True
+    assert result["synth"].merged_plan
+    assert "project" in result["design"]
+    assert runs[0].stats["budget_fallbacks"] > 0
+
+
+def test_low_budget_resolves_level_with_explorers(fake_llm, monkeypatch):
+    runs = _capture_runs(monkeypatch)
+    result = orchestrator.orchestrate("build a to-do list app", budget=RunBudget(max_calls=4))
+
+    assert runs[0].stats["budget_leaf_fallbacks"] == 1
+    assert all(not isinstance(item, dict) for item in result["explore"])
+    assert [br.subtask for br in result["explore"]] == ["subtask 0", "subtask 1", "subtask 2"]
+
+
+def test_deadline_bounds_wall_clock(fake_llm):
+    fake_llm.delay = 0.2
+    started = time.monotonic()
+    result = orchestrator.orchestrate("build a to-do list app", budget=RunBudget(deadline_sec=0.5))
+
+    assert time.monotonic() - started < 0.5 + 0.3
+    assert result["partial"] is True
+    assert result["synth"].merged_plan
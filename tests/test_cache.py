@@ -0,0 +1,122 @@
+# tests/test_cache.py
+import pytest
+
+import utils.cache as cache_mod
+from utils.cache import ResponseCache
+from utils.llm_client import OllamaClient
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_key_depends_on_model_temperature_and_prompt():
+    base = ResponseCache.make_key("llama3", 0.7, "p")
+    assert base == ResponseCache.make_key("llama3", 0.7, "p")
+    assert base != ResponseCache.make_key("llama3", 0.2, "p")
+    assert base != ResponseCache.make_key("mistral", 0.7, "p")
+    assert base != ResponseCache.make_key("llama3", 0.7, "p ")
+
+
+def test_hit_miss_counters_and_persistence(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key("m", 0.7, "prompt")
+    assert cache.get(key, agent="MetaAgent") is None
+    cache.put(key, "m", "answer", latency=2.5)
+    assert cache.get(key, agent="MetaAgent") == "answer"
+    cache.close()
+
+    reopened = make_cache(tmp_path)
+    assert reopened.get(key) == "answer"
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["saved_sec"] == 2.5
+
+
+def test_log_stats_since_snapshot_reports_one_run(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key("m", 0.7, "prompt")
+    cache.get(key)
+    cache.put(key, "m", "answer", latency=1.0)
+    before = cache.snapshot()
+    cache.get(key)
+
+    assert cache.log_stats(since=before) == {
+        "hits": 1, "misses": 0, "evictions": 0, "hit_rate": 1.0, "saved_sec": 1.0,
+    }
+    assert cache.log_stats()["misses"] == 1
+
+
+def test_ttl_expiry(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "time", lambda: now[0])
+    cache = make_cache(tmp_path, ttl_sec=60)
+    cache.put("k", "m", "v")
+    now[0] += 30
+    assert cache.get("k") == "v"
+    now[0] += 31
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_by_entry_count(tmp_path, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache_mod.time, "time", lambda: now[0])
+    cache = make_cache(tmp_path, max_entries=2)
+    for key in ("a", "b"):
+        now[0] += 1
+        cache.put(key, "m", key)
+    now[0] += 1
+    cache.get("a")          # "b" is now least recently used
+    now[0] += 1
+    cache.put("c", "m", "c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.get("c") == "c"
+    assert cache.stats["evictions"] == 1
+
+
+def test_eviction_by_size(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=10)
+    cache.put("a", "m", "x" * 6)
+    cache.put("b", "m", "y" * 6)
+    assert len(cache) == 1
+    assert cache.get("b") == "y" * 6
+
+
+@pytest.mark.asyncio
+async def test_client_serves_repeat_prompt_from_cache(tmp_path, monkeypatch):
+    calls = []
+
+    async def fake_backend(self, prompt, route):
+        calls.append(prompt)
+        return "fresh"
+
+    monkeypatch.setattr(OllamaClient, "_send_with_retries", fake_backend)
+    cache = make_cache(tmp_path)
+    client = OllamaClient(agent_name="MetaAgent", cache=cache, use_cache=True)
+
+    assert await client.send("same prompt") == "fresh"
+    assert await client.send("same prompt") == "fresh"
+    assert calls == ["same prompt"]
+    assert cache.stats["hits.MetaAgent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_agent_opt_out_bypasses_cache(tmp_path, monkeypatch):
+    calls = []
+
+    async def fake_backend(self, prompt, route):
+        calls.append(prompt)
+        return "fresh"
+
+    monkeypatch.setattr(OllamaClient, "_send_with_retries", fake_backend)
+    monkeypatch.setattr("utils.llm_client.CACHE_ENABLED", True)
+    monkeypatch.setattr("utils.llm_client.CACHE_DISABLED_AGENTS", {"PromptFilterAgent"})
+    client = OllamaClient(agent_name="PromptFilterAgent", cache=make_cache(tmp_path))
+
+    await client.send("p")
+    await client.send("p")
+    assert client.cache is None
+    assert len(calls) == 2
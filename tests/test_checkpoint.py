@@ -0,0 +1,104 @@
+# tests/test_checkpoint.py
+import asyncio
+
+import pytest
+
+import orchestrator
+from utils.checkpoint import CheckpointJournal, format_path, parse_path
+
+
+def test_journal_replays_latest_record_and_skips_torn_lines(checkpoint_dir):
+    journal = CheckpointJournal("run1")
+    journal.record("explore", (0, 2), {"steps": ["a"]}, goal="x")
+    journal.record("explore", (0, 2), {"steps": ["b"]}, goal="x")
+    journal.close()
+    with open(checkpoint_dir / "run1.jsonl", "a") as f:
+        f.write('{"kind": "node", "pa')
+
+    reopened = CheckpointJournal("run1")
+    assert reopened.get("explore", (0, 2)) == {"steps": ["b"]}
+    assert reopened.get("explore", (0, 2), goal="y") is None
+    assert len(reopened) == 1
+    assert parse_path(format_path((0, 2))) == (0, 2)
+    assert format_path(()) == ""
+
+
+def _fail_explorer_once(fake_llm, monkeypatch, subtask):
+    """Make ExplorerAgent fail on `subtask` after its siblings have finished."""
+    send = fake_llm.send
+    failed = []
+
+    async def flaky_send(client, prompt, route):
+        if client.agent_name == "ExplorerAgent" and f'"{subtask}"' in prompt and not failed:
+            await asyncio.sleep(0.3)
+            failed.append(prompt)
+            raise RuntimeError("backend went away")
+        return await send(client, prompt, route)
+
+    monkeypatch.setattr(fake_llm, "send", flaky_send)
+
+
+def _agents(calls):
+    return {agent for agent, _ in calls}
+
+
+def test_resume_reissues_only_missing_calls(fake_llm, monkeypatch):
+    _fail_explorer_once(fake_llm, monkeypatch, "subtask 1")
+    with pytest.raises(RuntimeError):
+        orchestrator.orchestrate("build a to-do list app", run_id="run-a")
+    fake_llm.calls.clear()
+
+    result = orchestrator.orchestrate("build a to-do list app", run_id="run-a")
+
+    assert [r["explore"][0].subtask for r in result["explore"]] == [
+        "subtask 0", "subtask 1", "subtask 2"
+    ]
+    assert _agents(fake_llm.calls) == {"ExplorerAgent", "EvaluatorAgent", "SynthesizerAgent"}
+    explored = {p for agent, p in fake_llm.calls if agent == "ExplorerAgent"}
+    assert len(explored) == 1 and '"subtask 1"' in explored.pop()
+
+
+def test_failed_branch_is_retried_in_isolation(fake_llm, monkeypatch):
+    _fail_explorer_once(fake_llm, monkeypatch, "subtask 2")
+    with pytest.raises(RuntimeError):
+        orchestrator.orchestrate("build a to-do list app", run_id="run-b")
+    fake_llm.calls.clear()
+
+    branch = orchestrator.orchestrate("build a to-do list app", run_id="run-b", branch=(2,))
+    assert branch["explore"][0].subtask == "subtask 2"
+    assert "MetaAgent" not in _agents(fake_llm.calls)
+    fake_llm.calls.clear()
+
+    # with the branch journaled, resuming only has the root level left to finish
+    orchestrator.orchestrate("build a to-do list app", run_id="run-b")
+    assert _agents(fake_llm.calls) == {"EvaluatorAgent", "SynthesizerAgent"}
+
+
+def test_nodes_refer_to_child_records_and_completed_journal_is_removed(fake_llm, monkeypatch, checkpoint_dir):
+    _fail_explorer_once(fake_llm, monkeypatch, "subtask 1")
+    with pytest.raises(RuntimeError):
+        orchestrator.orchestrate("build a to-do list app", run_id="run-c")
+    journal = CheckpointJournal("run-c")
+    journal.close()
+    # each finished subtree is written once, at its own path
+    assert journal.get("node", (0,)) is not None and journal.get("node", ()) is None
+
+    orchestrator.orchestrate("build a to-do list app", run_id="run-c")
+    assert not CheckpointJournal.exists("run-c")
+
+
+def test_root_record_rebuilds_children_from_their_records(fake_llm, monkeypatch):
+    monkeypatch.setattr(orchestrator, "CHECKPOINT_KEEP_COMPLETED", True)
+    first = orchestrator.orchestrate("build a to-do list app", run_id="run-d")
+    journal = CheckpointJournal("run-d")
+    journal.close()
+    root = journal.get("node", ())
+    assert [item for item in root["explore"]] == [{"ref": "0"}, {"ref": "1"}, {"ref": "2"}]
+    fake_llm.calls.clear()
+
+    replayed = orchestrator.orchestrate("build a to-do list app", run_id="run-d")
+    assert fake_llm.calls == []
+    assert replayed["synth"] == first["synth"]
+    assert [r["explore"][0].subtask for r in replayed["explore"]] == [
+        "subtask 0", "subtask 1", "subtask 2"
+    ]
@@ -0,0 +1,121 @@
+# tests/test_concurrency.py
+import asyncio
+
+import pytest
+
+from utils.concurrency import Scheduler
+
+
+class Tracker:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.by_agent = {}
+        self.peak_by_agent = {}
+        self.order = []
+
+    async def call(self, scheduler, agent, priority=0, label=None, hold=0.02):
+        async with scheduler.slot(agent, priority):
+            self.order.append(label)
+            self.active += 1
+            self.by_agent[agent] = self.by_agent.get(agent, 0) + 1
+            self.peak = max(self.peak, self.active)
+            self.peak_by_agent[agent] = max(self.peak_by_agent.get(agent, 0), self.by_agent[agent])
+            await asyncio.sleep(hold)
+            self.active -= 1
+            self.by_agent[agent] -= 1
+
+
+@pytest.mark.asyncio
+async def test_global_cap_holds_across_nested_groups():
+    scheduler = Scheduler(max_concurrency=3, agent_limits={})
+    tracker = Tracker()
+
+    async def level(width, depth):
+        if depth == 0:
+            await tracker.call(scheduler, "ExplorerAgent")
+            return
+        await asyncio.gather(*(level(width, depth - 1) for _ in range(width)))
+
+    await level(4, 2)   # 16 leaf calls issued at once
+    assert tracker.peak == 3
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_agent_sub_limit_does_not_block_other_agents():
+    scheduler = Scheduler(max_concurrency=4, agent_limits={"SynthesizerAgent": 1})
+    tracker = Tracker()
+    await asyncio.gather(
+        *(tracker.call(scheduler, "SynthesizerAgent") for _ in range(3)),
+        *(tracker.call(scheduler, "ExplorerAgent") for _ in range(3)),
+    )
+    assert tracker.peak_by_agent["SynthesizerAgent"] == 1
+    assert tracker.peak_by_agent["ExplorerAgent"] == 3
+
+
+@pytest.mark.asyncio
+async def test_lower_priority_value_is_granted_first():
+    scheduler = Scheduler(max_concurrency=1, agent_limits={})
+    tracker = Tracker()
+    blocker = asyncio.create_task(tracker.call(scheduler, "MetaAgent", label="blocker", hold=0.05))
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(tracker.call(scheduler, "ExplorerAgent", priority=p, label=f"depth{p}"))
+        for p in (3, 1, 2, 1)
+    ]
+    await asyncio.gather(blocker, *waiters)
+    assert tracker.order == ["blocker", "depth1", "depth1", "depth2", "depth3"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_releases_nothing():
+    scheduler = Scheduler(max_concurrency=1, agent_limits={})
+    await scheduler.acquire("A")
+    waiter = asyncio.create_task(scheduler.acquire("B"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    scheduler.release("A")
+    assert scheduler.active == 0
+    assert scheduler.queue_depth == 0
+
+
+def test_aimd_increases_while_latency_is_flat():
+    scheduler = Scheduler(max_concurrency=2, agent_limits={}, adaptive=True)
+    t = 0.0
+    for _ in range(20):
+        t += 1
+        scheduler.observe(1.0, started_at=t)
+    assert scheduler.max_concurrency > 2
+    assert all(c["reason"] == "latency_flat" for c in scheduler.controller.history)
+
+
+def test_aimd_halves_on_timeout_once_per_burst():
+    scheduler = Scheduler(max_concurrency=8, agent_limits={}, adaptive=True)
+    started = 0.0   # every call in the burst started before the decrease
+    for _ in range(3):
+        scheduler.observe(30.0, started_at=started, error="timeout")
+    assert scheduler.max_concurrency == 4
+    assert scheduler.stats["aimd_decreases"] == 1
+
+
+def test_aimd_decreases_on_latency_spike_and_respects_floor():
+    scheduler = Scheduler(max_concurrency=2, agent_limits={}, adaptive=True)
+    scheduler.controller.min_window = 1
+    t = 0.0
+    for _ in range(2):
+        t += 1
+        scheduler.observe(1.0, started_at=t)      # establishes the reference p95
+    scheduler.observe(10.0, started_at=t + 1)
+    assert scheduler.max_concurrency == 1
+    assert scheduler.controller.history[-1]["reason"] == "latency_spike"
+    scheduler.observe(30.0, started_at=t + 10**9, error="exit")
+    assert scheduler.max_concurrency == 1
+
+
+def test_static_scheduler_ignores_observations():
+    scheduler = Scheduler(max_concurrency=3, agent_limits={}, adaptive=False)
+    scheduler.observe(30.0, started_at=0.0, error="timeout")
+    assert scheduler.max_concurrency == 3
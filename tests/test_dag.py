@@ -0,0 +1,107 @@
+# tests/test_dag.py
+import asyncio
+import time
+
+import orchestrator
+from utils.dag import critical_path_lengths, resolve_dependencies, run_dag, topological_order
+from utils.parser import parse_meta
+
+SUBTASKS = ["Design the database schema", "Write API endpoints", "Write docs", "Deploy"]
+
+
+def test_resolve_matches_paraphrased_names_and_drops_cycles():
+    prereqs = resolve_dependencies(SUBTASKS, {
+        "write the API endpoints": ["design database schema"],
+        "Deploy": ["Write API endpoints", "Deploy", "something unknown"],
+        "Design the database schema": ["Deploy"],  # would close a cycle
+    })
+    assert prereqs == [set(), {0}, set(), {1}]
+
+
+def test_critical_path_first_topological_order():
+    prereqs = [set(), {0}, set(), {1}]
+    assert critical_path_lengths(prereqs) == [3, 2, 1, 1]
+    assert topological_order(prereqs) == [0, 2, 1, 3]
+
+
+def test_parse_meta_keeps_well_formed_dependencies_only():
+    meta = parse_meta('{"is_multi_step": true, "subtasks": ["a", "b"], "dependencies": {"b": "a"}}')
+    assert meta.dependencies == {"b": ["a"]}
+    meta = parse_meta('{"is_multi_step": true, "subtasks": ["a", "b"], "dependencies": ["a"]}')
+    assert meta.dependencies is None
+
+
+def test_run_dag_is_bounded_by_critical_path():
+    # 0 -> 1 -> 2 is the critical path; 3..7 are independent
+    prereqs = [set(), {0}, {1}] + [set() for _ in range(5)]
+    started = []
+
+    async def run_one(i, done):
+        started.append(i)
+        await asyncio.sleep(0.05)
+        return sum(done.values()) + 1
+
+    t0 = time.monotonic()
+    results = asyncio.run(run_dag(prereqs, run_one))
+    elapsed = time.monotonic() - t0
+
+    assert results == [1, 2, 3, 1, 1, 1, 1, 1]
+    assert started[0] == 0  # critical path starts first
+    assert elapsed < 0.15 + 0.1
+
+
+def test_run_dag_isolates_failures_or_fails_fast():
+    prereqs = [set(), set(), {0}, set()]
+
+    async def run_one(i, done):
+        await asyncio.sleep(0.3 if i == 3 else 0.01 * i)
+        if i == 1:
+            raise RuntimeError("boom")
+        return i
+
+    def on_error(i, exc):
+        return type(exc).__name__
+
+    assert asyncio.run(run_dag(prereqs, run_one, on_error=on_error)) == [0, "RuntimeError", 2, 3]
+    t0 = time.monotonic()
+    results = asyncio.run(run_dag(prereqs, run_one, on_error=on_error, fail_fast=True))
+    assert results == [0, "RuntimeError", "CancelledError", "CancelledError"]
+    assert time.monotonic() - t0 < 0.2
+
+
+def test_run_dag_passes_a_node_cancelled_from_outside_to_on_error():
+    prereqs = [set(), {0}]
+
+    async def run_one(i, done):
+        if i == 0:
+            # e.g. awaiting a result shared with a branch that got cancelled
+            asyncio.current_task().cancel()
+            await asyncio.sleep(0)
+        return i
+
+    def on_error(i, exc):
+        return type(exc).__name__
+
+    assert asyncio.run(run_dag(prereqs, run_one, on_error=on_error)) == ["CancelledError", 1]
+
+
+def test_orchestrator_passes_prerequisite_output_as_context(fake_llm, monkeypatch):
+    monkeypatch.setattr(orchestrator, "DAG_SCHEDULING", True)
+    fake_llm.subtasks = SUBTASKS[:3]
+    fake_llm.dependencies = {"Write API endpoints": ["Design the database schema"]}
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    agents = [agent for agent, _ in fake_llm.calls]
+    metas = {p.split('Input:')[-1].strip(): i for i, (a, p) in enumerate(fake_llm.calls) if a == "MetaAgent"}
+    api_meta = metas['"Write API endpoints"']
+    api_prompt = fake_llm.calls[api_meta][1]
+    assert 'Completed prerequisite "Design the database schema"' in api_prompt
+    assert "User goal at depth 1" not in api_prompt
+    # the dependent subtree only starts once its prerequisite has synthesized
+    assert "SynthesizerAgent" in agents[metas['"Design the database schema"']:api_meta]
+    assert "Completed prerequisite" not in fake_llm.calls[metas['"Write docs"']][1]
+
+    # the root synthesizer sees the dependency on the summarized branch
+    root_synth = [p for agent, p in fake_llm.calls if agent == "SynthesizerAgent"][-1]
+    assert '"dependencies":["Design the database schema"]' in root_synth
+    assert [r["explore"][0].subtask for r in result["explore"]] == SUBTASKS[:3]
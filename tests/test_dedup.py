@@ -0,0 +1,95 @@
+# tests/test_dedup.py
+import asyncio
+
+import orchestrator
+from schemas.task_models import FailedResult
+from utils.dedup import SubtaskIndex, shingles, similarity
+from utils.run_context import current_run
+
+
+def test_paraphrases_are_similar_but_distinct_tasks_are_not():
+    a = shingles("Set up user authentication")
+    b = shingles("set up authentication for users.")
+    assert similarity(a, b) == 1.0
+    assert similarity(shingles("Build the frontend"), shingles("Build the backend")) < 0.5
+    assert similarity(shingles("subtask 0"), shingles("subtask 1")) < 0.5
+    assert shingles("databases") == shingles("database")
+    assert shingles("caching") == shingles("cache")
+
+
+def test_merge_level_keeps_first_of_each_cluster():
+    index = SubtaskIndex(threshold=0.8)
+    kept, merged_into = index.merge_level([
+        "Design the database schema",
+        "Write API endpoints",
+        "design a database schema",
+    ])
+    assert kept == ["Design the database schema", "Write API endpoints"]
+    assert merged_into == [0]
+    assert current_run().stats["subtasks_merged"] == 1
+
+
+def test_threshold_is_tunable():
+    subtasks = ["Design the database schema", "Design database schema and indexes"]
+    assert len(SubtaskIndex(threshold=0.8).merge_level(subtasks)[0]) == 2
+    assert len(SubtaskIndex(threshold=0.5).merge_level(subtasks)[0]) == 1
+
+
+def test_share_reuses_result_across_branches():
+    index = SubtaskIndex(threshold=0.8, across_tree=True)
+    computed = []
+
+    async def compute(name):
+        computed.append(name)
+        await asyncio.sleep(0.01)
+        return name
+
+    async def main():
+        return await asyncio.gather(
+            index.share("explore", 2, "Set up user authentication", lambda: compute("a"), parent="Build the backend"),
+            index.share("explore", 2, "set up authentication for users", lambda: compute("b"), parent="backend build"),
+            # same text at another depth is not merged
+            index.share("explore", 3, "Set up user authentication", lambda: compute("c"), parent="Build the backend"),
+            # ...nor under an unrelated parent
+            index.share("explore", 2, "Set up user authentication", lambda: compute("d"), parent="Write the docs"),
+        )
+
+    assert asyncio.run(main()) == ["a", "a", "c", "d"]
+    assert computed == ["a", "c", "d"]
+    assert current_run().stats["dedup_calls_saved"] == 1
+
+
+def test_share_is_opt_in_and_skips_failed_owners():
+    computed = []
+
+    async def compute(name, result=None):
+        computed.append(name)
+        await asyncio.sleep(0.01)
+        return result if result is not None else name
+
+    async def main(index, owner_result):
+        return await asyncio.gather(
+            index.share("node", 2, "Set up user authentication", lambda: compute("a", owner_result)),
+            index.share("node", 2, "set up authentication for users", lambda: compute("b")),
+        )
+
+    assert asyncio.run(main(SubtaskIndex(), None)) == ["a", "b"]
+    failed = FailedResult(subtask="Set up user authentication", error="boom")
+    assert asyncio.run(main(SubtaskIndex(across_tree=True), failed))[1] == "b"
+    assert computed == ["a", "b", "a", "b"]
+    assert current_run().stats["subtasks_merged"] == 0
+
+
+def test_orchestrator_merges_paraphrased_siblings(fake_llm, monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    fake_llm.subtasks = ["Design the database schema", "Write API endpoints", "design a database schema"]
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    assert result["meta"].subtasks == ["Design the database schema", "Write API endpoints"]
+    metas = {p for agent, p in fake_llm.calls if agent == "MetaAgent"}
+    assert len(metas) == 3  # root + two children
+    stats = runs[0].stats
+    assert stats["subtasks_merged"] == 1
+    # the dropped child's meta, explorer, evaluator and synthesizer calls
+    assert stats["dedup_calls_saved"] == 4
@@ -6,8 +6,10 @@ from schemas.task_models import EvalResult
 
 @pytest.mark.asyncio
 async def test_evaluator_agent_parses(monkeypatch):
-    raw = '{"merged_plan": ["m1", "m2"], "issues": ["i1"]}'
-    monkeypatch.setattr(OllamaClient, 'send', lambda self, prompt: raw)
+    raw = '{"issues": ["i1"], "suggestions": ["s1", "s2"]}'
+    async def fake_send(self, prompt):
+        return raw
+    monkeypatch.setattr(OllamaClient, 'send', fake_send)
 
     agent = EvaluatorAgent()
     result = await agent.run([
@@ -15,16 +17,18 @@ async def test_evaluator_agent_parses(monkeypatch):
     ])
 
     assert isinstance(result, EvalResult)
-    assert result.merged_plan == ["m1", "m2"]
     assert result.issues == ["i1"]
+    assert result.suggestions == ["s1", "s2"]
 
 @pytest.mark.asyncio
 async def test_evaluator_agent_empty(monkeypatch):
-    raw = '{"merged_plan": [], "issues": []}'
-    monkeypatch.setattr(OllamaClient, 'send', lambda self, prompt: raw)
+    raw = '{"issues": [], "suggestions": []}'
+    async def fake_send(self, prompt):
+        return raw
+    monkeypatch.setattr(OllamaClient, 'send', fake_send)
 
     agent = EvaluatorAgent()
     result = await agent.run([])
 
-    assert result.merged_plan == []
     assert result.issues == []
+    assert result.suggestions == []
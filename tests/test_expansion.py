@@ -0,0 +1,72 @@
+# tests/test_expansion.py
+import pytest
+
+import orchestrator
+from schemas.task_models import MetaResult
+from utils.budget import RunBudget
+from utils.expansion import BeamPolicy, ExpandAllPolicy, ExpansionPolicy, get_policy
+from utils.parser import parse_meta
+
+SUBTASKS = [
+    "Write docs",
+    "Design and implement the persistence layer with migrations and indexes",
+    "Add login",
+    "Build the REST API with pagination, filtering and validation",
+]
+
+
+def test_beam_expands_the_richest_subtasks():
+    meta = MetaResult(is_multi_step=True, subtasks=SUBTASKS)
+    assert BeamPolicy(width=2).select(SUBTASKS, meta, 1) == {1, 3}
+    assert ExpandAllPolicy().select(SUBTASKS, meta, 1) == {0, 1, 2, 3}
+
+
+def test_low_confidence_falls_under_min_score():
+    policy = BeamPolicy(width=4, min_score=0.05)
+    sure = MetaResult(is_multi_step=True, subtasks=SUBTASKS, confidence=1.0)
+    unsure = MetaResult(is_multi_step=True, subtasks=SUBTASKS, confidence=0.0)
+    assert policy.select(SUBTASKS, sure, 1)
+    assert policy.select(SUBTASKS, unsure, 1) == set()
+
+
+def test_beam_cost_depends_on_each_subtask(fresh_run):
+    policy = BeamPolicy(width=4)
+    # listing three parts means two more explorer calls than a one-part subtask
+    assert [policy.expected_fanout(sub) for sub in SUBTASKS] == [1, 3, 1, 3]
+    assert policy.cost(SUBTASKS[1]) - policy.cost(SUBTASKS[0]) == pytest.approx(2.0)
+
+
+def test_beam_skips_subtrees_that_cannot_finish_before_the_deadline(fresh_run):
+    meta = MetaResult(is_multi_step=True, subtasks=SUBTASKS)
+    # 3 node calls at the assumed 1s each fit in 4s; 3 nodes + 2 more explorers do not
+    fresh_run.budget = RunBudget(deadline_sec=4)
+    assert BeamPolicy(width=4).select(SUBTASKS, meta, 1) == {0, 2}
+
+
+def test_expansion_policy_is_abstract():
+    with pytest.raises(TypeError):
+        ExpansionPolicy()
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        get_policy("greedy")
+
+
+def test_parse_meta_clamps_confidence():
+    assert parse_meta('{"is_multi_step": true, "subtasks": [], "confidence": 3}').confidence == 1.0
+    assert parse_meta('{"is_multi_step": true, "subtasks": [], "confidence": "high"}').confidence is None
+
+
+def test_beam_policy_resolves_the_rest_with_explorers(fake_llm, monkeypatch):
+    monkeypatch.setattr("utils.expansion.EXPANSION_POLICY", "beam")
+    monkeypatch.setattr("utils.expansion.EXPANSION_BEAM_WIDTH", 1)
+    fake_llm.subtasks = SUBTASKS[:3]
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    # the top-level structure is kept: every subtask is still a branch
+    assert len(result["explore"]) == 3
+    assert isinstance(result["explore"][1], dict)
+    assert [br.subtask for br in (result["explore"][0], result["explore"][2])] == [SUBTASKS[0], SUBTASKS[2]]
+    metas = {p for agent, p in fake_llm.calls if agent == "MetaAgent"}
+    assert len(metas) == 2  # root + the one expanded subtask
@@ -7,7 +7,9 @@ from schemas.task_models import ExploreResult
 @pytest.mark.asyncio
 async def test_explorer_agent_parses(monkeypatch):
     raw = '{"subtask": "X", "steps": ["step1", "step2"], "dependencies": ["D1"]}'
-    monkeypatch.setattr(OllamaClient, 'send', lambda self, prompt: raw)
+    async def fake_send(self, prompt):
+        return raw
+    monkeypatch.setattr(OllamaClient, 'send', fake_send)
 
     agent = ExplorerAgent()
     result = await agent.run("X", parent_context="")
@@ -20,7 +22,9 @@ async def test_explorer_agent_parses(monkeypatch):
 @pytest.mark.asyncio
 async def test_explorer_agent_no_dependencies(monkeypatch):
     raw = '{"subtask": "Y", "steps": ["only_step"]}'
-    monkeypatch.setattr(OllamaClient, 'send', lambda self, prompt: raw)
+    async def fake_send(self, prompt):
+        return raw
+    monkeypatch.setattr(OllamaClient, 'send', fake_send)
 
     agent = ExplorerAgent()
     result = await agent.run("Y", parent_context="")
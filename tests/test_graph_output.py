@@ -0,0 +1,60 @@
+# tests/test_graph_output.py
+import graph_output
+import orchestrator
+from utils.tracing import get_default_writer
+
+
+def _traced_runs(monkeypatch, n):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    for _ in range(n):
+        orchestrator.orchestrate("build a to-do list app")
+    get_default_writer().flush()
+    return [run.run_id for run in runs]
+
+
+def test_index_extracts_one_run_and_updates_incrementally(fake_llm, monkeypatch, trace_path):
+    first, second = _traced_runs(monkeypatch, 2)
+    trace = str(trace_path)
+
+    index = graph_output.build_index(trace)
+    assert set(index["runs"]) == {first, second}
+    assert index["scanned_to"] == trace_path.stat().st_size
+    spans = list(graph_output.iter_spans(trace, second, index))
+    assert len(spans) == 1 + 4 + 16  # run + nodes + calls
+    assert {s["run_id"] for s in spans} == {second}
+
+    (third,) = _traced_runs(monkeypatch, 1)
+    scanned = index["scanned_to"]
+    index = graph_output.build_index(trace)
+    assert index["runs"][third][0][0] == scanned
+    assert index["runs"][first] == graph_output.build_index(trace)["runs"][first]
+    assert [r[0] for r in graph_output.list_runs(trace)] == [first, second, third]
+
+
+def test_aggregated_and_collapsed_views(fake_llm, monkeypatch, trace_path):
+    (run_id,) = _traced_runs(monkeypatch, 1)
+    spans = list(graph_output.iter_spans(str(trace_path), run_id))
+
+    per_agent = graph_output.aggregate(spans, graph_output.by_agent)
+    assert per_agent["ExplorerAgent"]["calls"] == 3
+    per_depth = graph_output.aggregate(spans, graph_output.by_depth)
+    assert {d: row["calls"] for d, row in per_depth.items()} == {0: 1, 1: 3, 2: 12}
+
+    tree = graph_output.collapse_tree(spans, max_depth=1)
+    assert list(tree) == [""]
+    assert tree[""]["nodes"] == 4 and tree[""]["calls"] == 16
+    assert set(graph_output.collapse_tree(spans, max_depth=2)) == {"", "0", "1", "2"}
+
+
+def test_parse_log_reads_model_and_prompt_preview(tmp_path):
+    log = tmp_path / "orchestrator.log"
+    log.write_text(
+        "x [INFO] root: Orchestration started for goal: build it (depth=1)\n"
+        "x [INFO] root: OllamaClient: running ['ollama', 'run', 'llama3', '--format', 'json', "
+        "'You are a meta-agent.\\nIt\\'s fine'] (attempt 1)\n"
+    )
+    nodes, edges = graph_output.parse_log(str(log))
+    assert nodes["n1"]["model"] == "llama3"
+    assert nodes["n1"]["prompt"].startswith("You are a meta-agent.")
+    assert edges == [("n0", "n1")]
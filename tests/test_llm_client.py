@@ -0,0 +1,252 @@
+# tests/test_llm_client.py
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+import utils.llm_client as llm_client
+from schemas.task_models import ExploreResult, MetaResult
+from utils.llm_client import OllamaClient
+from utils.parser import parse_explore
+
+
+@pytest.mark.asyncio
+async def test_http_backend_returns_response(monkeypatch, stub_ollama):
+    monkeypatch.setattr(llm_client, "STREAM_RESPONSES", False)
+    with stub_ollama(reply='  {"a": 1}\n') as stub:
+        client = OllamaClient(model_name="tiny", backend="http", host=stub.url)
+        out = await client.send("hello")
+        await llm_client.close_http_pool()
+
+    assert out == '{"a": 1}'
+    assert stub.requests[0]["model"] == "tiny"
+    assert stub.requests[0]["prompt"] == "hello"
+    assert stub.requests[0]["stream"] is False
+
+
+@pytest.mark.asyncio
+async def test_http_backend_retries_on_server_error(monkeypatch, stub_ollama):
+    monkeypatch.setattr(llm_client, "RETRY_BACKOFF_SEC", 0)
+    with stub_ollama(reply="second time lucky", fail_first=1) as stub:
+        client = OllamaClient(backend="http", host=stub.url)
+        out = await client.send("hello")
+        await llm_client.close_http_pool()
+
+    assert out == "second time lucky"
+    assert len(stub.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_http_backend_gives_up_after_max_retries(monkeypatch, stub_ollama):
+    monkeypatch.setattr(llm_client, "RETRY_BACKOFF_SEC", 0)
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 2)
+    with stub_ollama(fail_first=10) as stub:
+        client = OllamaClient(backend="http", host=stub.url)
+        with pytest.raises(RuntimeError):
+            await client.send("hello")
+        await llm_client.close_http_pool()
+
+    assert len(stub.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_http_backend_calls_run_concurrently(stub_ollama):
+    with stub_ollama(delay=0.3) as stub:
+        client = OllamaClient(backend="http", host=stub.url)
+        start = time.perf_counter()
+        await asyncio.gather(*(client.send(f"p{i}") for i in range(5)))
+        elapsed = time.perf_counter() - start
+        await llm_client.close_http_pool()
+
+    # five 0.3s calls would take 1.5s back to back
+    assert elapsed < 1.0
+    assert len(stub.requests) == 5
+
+
+@pytest.mark.asyncio
+async def test_streaming_stops_once_schema_object_is_complete(stub_ollama, fresh_run):
+    obj = '{"subtask": "X", "steps": ["a {b}", "say \\"}\\""], "dependencies": []}'
+    reply = "Sure! Here it is:\n" + obj + "\nLet me know if you need more." + " blah" * 200
+    with stub_ollama(reply=reply, token_delay=0.005) as stub:
+        client = OllamaClient(host=stub.url, schema=ExploreResult, use_cache=False)
+        start = time.perf_counter()
+        out = await client.send("explore X")
+        elapsed = time.perf_counter() - start
+        await llm_client.close_http_pool()
+        total_tokens = len(reply) // stub.token_chars
+
+    assert out == obj
+    assert fresh_run.stats["stream_early_stops"] == 1
+    # full stream would take ~total_tokens * 5ms
+    assert elapsed < total_tokens * 0.005 / 2
+
+
+@pytest.mark.asyncio
+async def test_streaming_without_schema_returns_whole_text(stub_ollama):
+    with stub_ollama(reply="  cleaned prompt text \n") as stub:
+        client = OllamaClient(host=stub.url, use_cache=False)
+        out = await client.send("filter this")
+        await llm_client.close_http_pool()
+
+    assert stub.requests[0]["stream"] is True
+    assert out == "cleaned prompt text"
+
+
+@pytest.mark.asyncio
+async def test_streaming_skips_objects_that_do_not_match_schema(stub_ollama):
+    reply = 'Example: {"foo": 1} then {"is_multi_step": false, "subtasks": []} trailing'
+    with stub_ollama(reply=reply) as stub:
+        client = OllamaClient(host=stub.url, schema=MetaResult, use_cache=False)
+        out = await client.send("meta")
+        await llm_client.close_http_pool()
+
+    assert out == '{"is_multi_step": false, "subtasks": []}'
+
+
+@pytest.mark.asyncio
+async def test_subprocess_output_keeps_characters_split_across_reads(monkeypatch, tmp_path):
+    # "’" is three bytes; put it across the 4096-byte read boundary
+    text = "a" * 4095 + "\u2019 done"
+    cli = tmp_path / "ollama"
+    cli.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"sys.stdout.buffer.write({text.encode('utf-8')!r})\n"
+    )
+    cli.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    client = OllamaClient(backend="subprocess", use_cache=False)
+
+    assert await client.send("hello") == text
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        OllamaClient(backend="carrier-pigeon")
+
+
+@pytest.mark.asyncio
+async def test_identical_inflight_calls_are_coalesced(monkeypatch, fresh_run):
+    calls = []
+
+    async def slow_backend(self, prompt, route):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return f"answer to {prompt}"
+
+    monkeypatch.setattr(OllamaClient, "_send_with_retries", slow_backend)
+    clients = [OllamaClient(agent_name="ExplorerAgent", use_cache=False) for _ in range(3)]
+    outs = await asyncio.gather(
+        *(c.send("Plan for data storage") for c in clients),
+        clients[0].send("Plan for auth"),
+    )
+
+    assert outs[:3] == ["answer to Plan for data storage"] * 3
+    assert sorted(calls) == ["Plan for auth", "Plan for data storage"]
+    assert fresh_run.stats["llm_calls_deduplicated"] == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesced_followers_see_leader_failure(monkeypatch):
+    async def failing_backend(self, prompt, route):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("OllamaClient: all retries exhausted")
+
+    monkeypatch.setattr(OllamaClient, "_send_with_retries", failing_backend)
+    client = OllamaClient(use_cache=False)
+    results = await asyncio.gather(client.send("p"), client.send("p"), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_when_leader_is_cancelled(monkeypatch, fresh_run):
+    calls = []
+
+    async def slow_backend(self, prompt, route):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return f"answer to {prompt}"
+
+    monkeypatch.setattr(OllamaClient, "_send_with_retries", slow_backend)
+    leader = asyncio.create_task(OllamaClient(use_cache=False).send("p"))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.create_task(OllamaClient(use_cache=False).send("p")) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await asyncio.gather(*followers) == ["answer to p"] * 2
+    assert leader.cancelled()
+    # the leader's call, then one re-issued call the other follower joined
+    assert calls == ["p", "p"]
+    assert fresh_run.stats["llm_calls_taken_over"] == 1
+    # one follower joined the re-issued call; the other one issued it
+    assert fresh_run.stats["llm_calls_deduplicated"] == 1
+    assert [e.source for e in fresh_run.ledger.entries] == ["backend", "backend", "coalesced"]
+
+
+@pytest.mark.asyncio
+async def test_structured_output_requests_schema_format(stub_ollama):
+    with stub_ollama(reply='{"is_multi_step": false, "subtasks": []}') as stub:
+        client = OllamaClient(host=stub.url, schema=MetaResult, use_cache=False)
+        await client.send("meta")
+        await llm_client.close_http_pool()
+
+    fmt = stub.requests[0]["format"]
+    assert fmt["type"] == "object"
+    assert set(fmt["required"]) == {"is_multi_step", "subtasks"}
+
+
+@pytest.mark.asyncio
+async def test_send_parsed_recalls_only_when_repair_fails(monkeypatch, fresh_run):
+    replies = iter(["I'd rather not.", '{"subtask": "S", "steps": ["a",]}'])
+    calls = []
+
+    async def fake_send(self, prompt):
+        calls.append(prompt)
+        return next(replies)
+
+    monkeypatch.setattr(OllamaClient, "send", fake_send)
+    client = OllamaClient(agent_name="ExplorerAgent", use_cache=False)
+    result = await client.send_parsed("explore S", parse_explore)
+
+    assert result.steps == ["a"]
+    assert len(calls) == 2
+    assert fresh_run.stats["llm_parse_retries"] == 1
+    assert fresh_run.stats["llm_json_repaired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_send_parsed_gives_up_after_parse_retries(monkeypatch):
+    async def fake_send(self, prompt):
+        return "still not json"
+
+    monkeypatch.setattr(OllamaClient, "send", fake_send)
+    monkeypatch.setattr(llm_client, "PARSE_RETRIES", 2)
+    client = OllamaClient(use_cache=False)
+    with pytest.raises(ValueError):
+        await client.send_parsed("p", parse_explore)
+
+
+@pytest.mark.asyncio
+async def test_repeat_within_invocation_is_suppressed_but_parse_retry_is_not(monkeypatch, fresh_run):
+    replies = iter(["nope", '{"subtask": "S", "steps": ["a"]}'])
+
+    async def backend(self, prompt, route):
+        return next(replies)
+
+    monkeypatch.setattr(OllamaClient, "_send_with_retries", backend)
+    client = OllamaClient(agent_name="ExplorerAgent", use_cache=False)
+    with client.invocation():
+        assert await client.send("explore S") == "nope"
+        assert await client.send("explore S") == "nope"
+        result = await client.send_parsed("explore S", parse_explore)
+
+    assert result.steps == ["a"]
+    ledger = fresh_run.ledger
+    assert [e.source for e in ledger.entries] == ["backend", "suppressed", "suppressed", "backend"]
+    assert ledger.count("ExplorerAgent") == 2
+    assert len(ledger.duplicates()) == 1  # the deliberate parse re-call
+    assert fresh_run.stats["llm_duplicate_sends_suppressed"] == 2
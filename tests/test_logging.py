@@ -0,0 +1,70 @@
+# tests/test_logging.py
+import logging
+import queue
+
+import utils.logging as log_module
+from utils.logging import log_body, log_debug, log_info
+
+
+def test_bodies_are_truncated_with_a_hash_unless_sampled(monkeypatch):
+    prompt = "You are a meta-agent. " * 50
+    monkeypatch.setattr(log_module, "LOG_BODY_PREVIEW_CHARS", 20)
+    summary = str(log_body(prompt))
+    assert summary.startswith("<sha256:") and f"{len(prompt)} chars> You are a meta-agent..." in summary
+    assert str(log_body(prompt)) == summary  # same body, same line
+    assert repr(log_body("short")).endswith("short'")
+
+    monkeypatch.setattr(log_module, "LOG_BODY_SAMPLE_RATE", 1.0)
+    assert str(log_body(prompt)) == prompt
+
+
+def test_disabled_levels_skip_formatting():
+    formatted = []
+
+    class Expensive:
+        def __str__(self):
+            formatted.append(1)
+            return "expensive"
+
+    logger = log_module.logger
+    previous = logger.level
+    try:
+        logger.setLevel(logging.INFO)
+        log_debug("prompt: %s", Expensive(), agent="MetaAgent")
+        assert formatted == []
+
+        logger.setLevel(logging.DEBUG)
+        log_debug("prompt: %s", Expensive(), agent="MetaAgent")
+        assert formatted  # formatted once the record is emitted
+    finally:
+        logger.setLevel(previous)
+
+
+def test_queue_handler_leaves_formatting_to_the_listener():
+    hashed = []
+
+    class Body(log_module._Body):
+        def __str__(self):
+            hashed.append(1)
+            return super().__str__()
+
+    records = queue.Queue()
+    handler = log_module._DeferredQueueHandler(records)
+    handler.handle(logging.LogRecord("root", logging.DEBUG, __file__, 1, "prompt: %s", (Body("p"),), None))
+
+    record = records.get_nowait()
+    assert hashed == []
+    assert record.getMessage().startswith("prompt: <sha256:") and hashed == [1]
+
+
+def test_file_and_console_output_go_through_the_listener():
+    assert any(isinstance(h, logging.handlers.QueueHandler) for h in log_module.logger.handlers)
+    assert log_module.console_handler not in log_module.logger.handlers
+    assert log_module.console_handler in log_module.listener.handlers
+    assert isinstance(log_module.file_handler, logging.handlers.RotatingFileHandler)
+
+
+def test_tests_log_to_their_own_file(log_file):
+    log_info("written under tmp_path")
+    log_module.log_queue.join()
+    assert "written under tmp_path" in log_file.read_text()
@@ -0,0 +1,75 @@
+# tests/test_memo.py
+import orchestrator
+from utils.memo import SubtreeMemo, normalize_subtask
+
+
+def make_memo(tmp_path, prompt_dir=None, **kwargs):
+    kwargs.setdefault("prompt_dir", str(prompt_dir or tmp_path))
+    return SubtreeMemo(path=str(tmp_path / "memo.sqlite3"), **kwargs)
+
+
+def test_key_normalizes_subtask_text():
+    assert normalize_subtask('  Plan for  Data Storage. ') == "plan for data storage"
+    assert SubtreeMemo.make_key("Plan for data storage", "ctx", 2) == \
+        SubtreeMemo.make_key("plan for DATA storage.", "ctx", 2)
+    assert SubtreeMemo.make_key("x", "ctx", 2) != SubtreeMemo.make_key("x", "other", 2)
+    assert SubtreeMemo.make_key("x", "ctx", 2) != SubtreeMemo.make_key("x", "ctx", 3)
+
+
+def test_prompt_change_invalidates(tmp_path):
+    prompts = tmp_path / "prompts"
+    prompts.mkdir()
+    (prompts / "meta_prompt.txt").write_text("v1")
+    memo = make_memo(tmp_path, prompt_dir=prompts)
+    memo.put("g", "", 1, _tiny_result())
+    memo.close()
+
+    assert make_memo(tmp_path, prompt_dir=prompts).get("g", "", 1) is not None
+    (prompts / "meta_prompt.txt").write_text("v2")
+    reopened = make_memo(tmp_path, prompt_dir=prompts)
+    assert reopened.get("g", "", 1) is None
+    assert len(reopened) == 0
+
+
+def test_invalidation_can_be_disabled(tmp_path):
+    prompts = tmp_path / "prompts"
+    prompts.mkdir()
+    (prompts / "meta_prompt.txt").write_text("v1")
+    make_memo(tmp_path, prompt_dir=prompts).put("g", "", 1, _tiny_result())
+    (prompts / "meta_prompt.txt").write_text("v2")
+    memo = make_memo(tmp_path, prompt_dir=prompts, invalidate_on_prompt_change=False)
+    assert memo.get("g", "", 1) is not None
+
+
+def test_second_run_is_grafted_from_memo(fake_llm, tmp_path, monkeypatch):
+    memo = make_memo(tmp_path)
+    monkeypatch.setattr(orchestrator, "MEMO_ENABLED", True)
+    monkeypatch.setattr(orchestrator, "get_default_memo", lambda: memo)
+
+    first = orchestrator.orchestrate("build a to-do list app")
+    calls_first = len(fake_llm.calls)
+    second = orchestrator.orchestrate("build a to-do list app")
+
+    # only the prompt filter runs again
+    assert {agent for agent, _ in fake_llm.calls[calls_first:]} == {"PromptFilterAgent"}
+    assert second["synth"] == first["synth"]
+    assert [c["explore"][0] for c in second["explore"]] == [c["explore"][0] for c in first["explore"]]
+
+
+def test_identical_siblings_share_one_subtree(fake_llm, monkeypatch):
+    fake_llm.subtasks = ["Plan for data storage", "plan for data storage.", "Plan auth"]
+    orchestrator.orchestrate("build a to-do list app")
+
+    explored = {p for agent, p in fake_llm.calls if agent == "ExplorerAgent"}
+    assert len(explored) == 2
+
+
+def _tiny_result():
+    from schemas.task_models import MetaResult, ExploreResult, EvalResult, SynthResult
+    return {
+        "meta": MetaResult(is_multi_step=False, subtasks=[]),
+        "explore": [ExploreResult(subtask="g", steps=["s"])],
+        "eval": EvalResult(issues=[], suggestions=[]),
+        "synth": SynthResult(merged_plan=["s"]),
+        "design": {"project": {"README.md": None}},
+    }
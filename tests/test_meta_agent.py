@@ -8,7 +8,9 @@ from schemas.task_models import MetaResult
 async def test_meta_agent_parses(monkeypatch):
     raw = '{"is_multi_step": true, "subtasks": ["A","B"], "approaches": ["X","Y"]}'
     # Stub out the LLM response
-    monkeypatch.setattr(OllamaClient, 'send', lambda self, prompt: raw)
+    async def fake_send(self, prompt):
+        return raw
+    monkeypatch.setattr(OllamaClient, 'send', fake_send)
 
     agent = MetaAgent()
     result = await agent.run("dummy goal", parent_context="")
@@ -20,7 +22,9 @@ async def test_meta_agent_parses(monkeypatch):
 @pytest.mark.asyncio
 async def test_meta_agent_single_step(monkeypatch):
     raw = '{"is_multi_step": false, "subtasks": [], "approaches": []}'
-    monkeypatch.setattr(OllamaClient, 'send', lambda self, prompt: raw)
+    async def fake_send(self, prompt):
+        return raw
+    monkeypatch.setattr(OllamaClient, 'send', fake_send)
 
     agent = MetaAgent()
     result = await agent.run("another goal", parent_context="")
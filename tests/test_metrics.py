@@ -0,0 +1,86 @@
+# tests/test_metrics.py
+import json
+
+import orchestrator
+from utils.metrics import MetricsRegistry
+from utils.run_context import current_run, end_run, start_run
+
+
+def _capture_runs(monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    return runs
+
+
+def _value(registry, name, **labels):
+    metric = registry.metrics[name]
+    return sum(
+        v for key, v in metric.values.items()
+        if all(dict(key).get(k) == str(want) for k, want in labels.items())
+    )
+
+
+def test_histogram_buckets_and_quantiles():
+    registry = MetricsRegistry()
+    hist = registry.histogram("latency_seconds", buckets=(0.1, 1, 10))
+    for value in (0.05, 0.5, 0.5, 5, 50):
+        hist.observe(value, agent="A")
+
+    ((key, (counts, total)),) = hist.values.items()
+    assert counts == [1, 2, 1, 1]
+    assert total == 56.05
+    assert hist.quantile(key, 0.5) == 1
+    assert hist.quantile(key, 0.95) == float("inf")
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("calls_total", "Calls").inc(agent='Meta"Agent', source="backend")
+    registry.counter("calls_total").inc(2, agent='Meta"Agent', source="backend")
+    registry.gauge("depth_max").set_max(3)
+    registry.gauge("depth_max").set_max(1)
+    registry.histogram("latency_seconds", buckets=(1, 10)).observe(2)
+
+    lines = registry.to_prometheus().splitlines()
+    assert "# HELP calls_total Calls" in lines
+    assert "# TYPE calls_total counter" in lines
+    assert 'calls_total{agent="Meta\\"Agent",source="backend"} 3' in lines
+    assert "depth_max 3" in lines
+    assert 'latency_seconds_bucket{le="1"} 0' in lines
+    assert 'latency_seconds_bucket{le="10"} 1' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in lines
+    assert "latency_seconds_sum 2.0" in lines
+    assert "latency_seconds_count 1" in lines
+
+
+def test_orchestrate_records_calls_agents_and_nodes(fake_llm, monkeypatch):
+    runs = _capture_runs(monkeypatch)
+    orchestrator.orchestrate("build a to-do list app")
+    metrics = runs[0].metrics
+
+    assert _value(metrics, "llm_calls_total", source="backend") == runs[0].ledger.count() == 16
+    assert _value(metrics, "llm_calls_total", agent="MetaAgent", source="backend") == 4
+    assert sum(sum(c) for c, _ in metrics.metrics["llm_call_latency_seconds"].values.values()) == 16
+    assert _value(metrics, "llm_tokens_total", type="prompt") == runs[0].stats["prompt_tokens"]
+    assert _value(metrics, "agent_runs_total", agent="ExplorerAgent", outcome="ok") == 3
+    assert _value(metrics, "agent_runs_total", outcome="ok") == 16
+    assert _value(metrics, "orchestration_nodes_total", depth=1) == 1
+    assert _value(metrics, "orchestration_nodes_total", depth=2, outcome="expanded") == 3
+    assert _value(metrics, "parallel_tasks_total", outcome="ok") > 0
+    assert _value(metrics, "parallel_tasks_total", outcome="error") == 0
+
+
+def test_end_run_writes_textfile_and_summary(metrics_dir):
+    run = start_run("metrics-run")
+    run.metrics.counter("llm_calls_total").inc(agent="MetaAgent", source="backend")
+    run.metrics.histogram("agent_run_seconds").observe(0.3, agent="MetaAgent")
+    end_run(run)
+
+    prom = (metrics_dir / "orchestrator.prom").read_text()
+    assert 'llm_calls_total{agent="MetaAgent",source="backend"} 1' in prom
+    assert "llm_queue_depth_max 0" in prom
+    summary = json.loads((metrics_dir / "metrics-run.json").read_text())
+    assert summary["run_id"] == "metrics-run"
+    (series,) = summary["metrics"]["agent_run_seconds"]["series"]
+    assert series["labels"] == {"agent": "MetaAgent"}
+    assert series["count"] == 1 and series["p50"] == "0.5"
@@ -0,0 +1,223 @@
+# tests/test_orchestrator.py
+import asyncio
+import json
+import re
+import time
+
+import orchestrator
+from utils import dedup
+from config import LLM_MODEL
+
+
+def test_orchestrate_end_to_end(fake_llm):
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    assert result["meta"].is_multi_step is True
+    assert [r["explore"][0].subtask for r in result["explore"]] == [
+        "subtask 0", "subtask 1", "subtask 2"
+    ]
+    assert result["synth"].merged_plan == ["step one", "step two"]
+    assert "project" in result["design"]
+
+
+def test_orchestrate_respects_global_concurrency_cap(fake_llm, monkeypatch):
+    fake_llm.fanout = 8
+    monkeypatch.setattr("utils.concurrency.MAX_PARALLEL_TASKS", 2)
+    orchestrator.orchestrate("build a to-do list app")
+
+    assert fake_llm.peak <= 2
+
+
+def test_orchestrate_routes_agents_by_config(fake_llm, monkeypatch):
+    monkeypatch.setattr("utils.routing.AGENT_ROUTES", {
+        "MetaAgent": {"model": "tiny", "max_tokens": 128, "depths": {2: {"model": "tinier"}}},
+        "SynthesizerAgent": {"model": "large", "timeout_sec": 90},
+    })
+    orchestrator.orchestrate("build a to-do list app")
+
+    seen = {(r.agent, r.depth): r for r in fake_llm.routes}
+    assert seen[("MetaAgent", 1)].model == "tiny"
+    assert seen[("MetaAgent", 1)].max_tokens == 128
+    assert seen[("MetaAgent", 2)].model == "tinier"
+    assert seen[("MetaAgent", 2)].max_tokens == 128
+    assert seen[("SynthesizerAgent", 1)].model == "large"
+    assert seen[("SynthesizerAgent", 1)].timeout_sec == 90
+    assert seen[("PromptFilterAgent", 0)].model == LLM_MODEL
+
+
+def test_pipelined_eval_critiques_batches_while_slow_branch_runs(fake_llm, monkeypatch):
+    monkeypatch.setattr(orchestrator, "PIPELINED_EVAL", True)
+    monkeypatch.setattr(orchestrator, "EVAL_BATCH_SIZE", 2)
+    fake_llm.subtasks = ["subtask a", "subtask b", "slow subtask c"]
+    send = fake_llm.send
+
+    async def slow_send(client, prompt, route):
+        reply = await send(client, prompt, route)
+        if client.agent_name == "ExplorerAgent" and "slow" in prompt:
+            await asyncio.sleep(0.2)
+        return reply
+
+    monkeypatch.setattr(fake_llm, "send", slow_send)
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    calls = fake_llm.calls
+    # root-level critiques see summarized subtrees ("step one"), not explorer steps
+    root_evals = [i for i, (agent, p) in enumerate(calls) if agent == "EvaluatorAgent" and "step one" in p]
+    slow_explore = next(i for i, (agent, p) in enumerate(calls) if agent == "ExplorerAgent" and "slow" in p)
+    slow_done = min(i for i, (agent, p) in enumerate(calls) if agent == "SynthesizerAgent" and "slow" in p)
+    assert len({calls[i][1] for i in root_evals}) == 2
+    assert slow_explore < root_evals[0] < slow_done
+    assert result["eval"].suggestions == ["be careful", "be careful"]
+
+
+def test_speculative_explore_reuses_leaf_calls(fake_llm, monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    monkeypatch.setattr(orchestrator, "SPECULATIVE_EXPLORE", True)
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    stats = runs[0].stats
+    # the three single-step subtasks use their speculative exploration;
+    # the multi-step root discards its own
+    assert stats["speculative_hits"] == 3
+    assert stats["speculative_misses"] == 1
+    assert stats["speculative_wasted_calls"] + stats["speculative_cancelled"] == 1
+    assert [r["explore"][0].subtask for r in result["explore"]] == [
+        "subtask 0", "subtask 1", "subtask 2"
+    ]
+    explored = {p for agent, p in fake_llm.calls if agent == "ExplorerAgent"}
+    assert len(explored) == 4  # one per subtask + the discarded root speculation
+
+
+def test_speculative_leaf_uses_its_own_exploration_with_cross_tree_dedup(fake_llm, monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    monkeypatch.setattr(orchestrator, "SPECULATIVE_EXPLORE", True)
+    monkeypatch.setattr(dedup, "DEDUP_ACROSS_TREE", True)
+    tree = {
+        "root goal": ["plan A", "plan B"],
+        "plan A": ["shared storage layer", "alpha service"],
+        "plan B": ["shared storage layer", "beta frontend"],
+    }
+    reply = fake_llm.reply
+
+    def tree_reply(agent, prompt):
+        if agent == "MetaAgent":
+            goal = re.search(r'Input:\s*"(.*)"', prompt).group(1)
+            if goal in tree:
+                return json.dumps({"is_multi_step": True, "subtasks": tree[goal]})
+        return reply(agent, prompt)
+
+    monkeypatch.setattr(fake_llm, "reply", tree_reply)
+    orchestrator.orchestrate("build a to-do list app")
+
+    stats = runs[0].stats
+    # both "shared storage layer" leaves consume their own speculation
+    # instead of one waiting on the other's
+    assert stats["speculative_hits"] == 4
+    assert stats["speculative_misses"] == 3
+    assert stats["subtasks_merged"] == 0
+
+def _failing_explorer(fake_llm, monkeypatch, fail_after, slow=()):
+    """ExplorerAgent raises for the subtasks in `fail_after` ({subtask: delay})."""
+    send = fake_llm.send
+
+    async def flaky_send(client, prompt, route):
+        if client.agent_name == "ExplorerAgent":
+            for subtask, delay in fail_after.items():
+                if f'"{subtask}"' in prompt:
+                    await asyncio.sleep(delay)
+                    raise RuntimeError(f"{subtask} broke")
+            if any(f'"{subtask}"' in prompt for subtask in slow):
+                await asyncio.sleep(1.0)
+        return await send(client, prompt, route)
+
+    monkeypatch.setattr(fake_llm, "send", flaky_send)
+
+
+def test_isolated_failure_keeps_siblings(fake_llm, monkeypatch):
+    monkeypatch.setattr(orchestrator, "FAILURE_POLICY", "isolate")
+    _failing_explorer(fake_llm, monkeypatch, {"subtask 1": 0.0})
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    assert result["partial"] is True
+    assert [(path, res.subtask) for path, res in orchestrator.failed_branches(result)] == [
+        ((1,), "subtask 1")
+    ]
+    assert "subtask 1 broke" in result["explore"][1].error
+    assert result["synth"].merged_plan == ["step one", "step two"]
+    root_synth = [p for agent, p in fake_llm.calls if agent == "SynthesizerAgent"][-1]
+    assert "subtask 0" in root_synth and "subtask 1" not in root_synth
+
+
+def test_fail_fast_cancels_pending_siblings(fake_llm, monkeypatch):
+    monkeypatch.setattr(orchestrator, "FAILURE_POLICY", "fail_fast")
+    _failing_explorer(fake_llm, monkeypatch, {"subtask 1": 0.2}, slow={"subtask 2"})
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    started = time.monotonic()
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    assert time.monotonic() - started < 1.0
+    assert isinstance(result["explore"][0], dict)
+    assert "cancelled" in result["explore"][2].error
+    # the explorer fails inside subtask 1's node, which then fails at the root
+    assert runs[0].stats["branches_failed"] == 2
+    assert runs[0].stats["branches_cancelled"] == 1
+
+
+def test_fail_fast_does_not_cancel_branches_sharing_a_deduplicated_result(fake_llm, monkeypatch):
+    monkeypatch.setattr(orchestrator, "FAILURE_POLICY", "fail_fast")
+    monkeypatch.setattr(orchestrator, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(dedup, "DEDUP_ACROSS_TREE", True)
+    monkeypatch.setattr(orchestrator, "MAX_RECURSION_DEPTH", 4)
+    # cross-tree reuse needs near-duplicate parents, so they sit one level down
+    tree = {
+        "root goal": ["plan A", "plan B"],
+        "plan A": ["storage design"],
+        "plan B": ["design the storage"],
+        "storage design": ["alpha broken", "quick thing", "shared storage layer"],
+        "design the storage": ["shared storage layer", "beta frontend"],
+    }
+    reply = fake_llm.reply
+
+    def tree_reply(agent, prompt):
+        if agent == "MetaAgent":
+            goal = re.search(r'Input:\s*"(.*)"', prompt).group(1)
+            if goal in tree:
+                return json.dumps({"is_multi_step": True, "subtasks": tree[goal]})
+            return json.dumps({"is_multi_step": False, "subtasks": [goal]})
+        return reply(agent, prompt)
+
+    monkeypatch.setattr(fake_llm, "reply", tree_reply)
+    # plan A claims "shared storage layer" first; plan B's copy waits on it
+    _failing_explorer(fake_llm, monkeypatch, {"alpha broken": 0.2}, slow={"shared storage layer"})
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    design_a = result["explore"][0]["explore"][0]
+    design_b = result["explore"][1]["explore"][0]
+    assert [path for path, _ in orchestrator.failed_branches(result)] == [(0, 0, 0), (0, 0, 2)]
+    assert "alpha broken broke" in design_a["explore"][0].error
+    assert "cancelled" in design_a["explore"][2].error
+    # plan B did not fail: its follower computed the shared result itself
+    assert [br["explore"][0].subtask for br in design_b["explore"]] == ["shared storage layer", "beta frontend"]
+    assert result["partial"] is True
+
+
+def test_each_agent_invocation_makes_exactly_one_call(fake_llm, monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    orchestrator.orchestrate("build a to-do list app")
+
+    ledger = runs[0].ledger
+    # filter + root meta/eval/synth + meta/explore/eval/synth per subtask
+    assert ledger.by_agent() == {
+        "PromptFilterAgent": 1,
+        "MetaAgent": 4,
+        "ExplorerAgent": 3,
+        "EvaluatorAgent": 4,
+        "SynthesizerAgent": 4,
+    }
+    assert len(fake_llm.calls) == ledger.count() == 16
+    assert ledger.duplicates() == []
+    assert {e.path for e in ledger.entries if e.agent == "ExplorerAgent"} == {(0,), (1,), (2,)}
@@ -0,0 +1,34 @@
+# tests/test_parser.py
+import pytest
+
+from utils.parser import parse_explore, parse_meta, parse_synth, repair_json
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('Sure!\n```json\n{"a": [1, 2,], "b": True,}\n```', '{"a": [1, 2], "b": true}'),
+    ('{"subtask": "x", "steps": ["one", "tw', '{"subtask": "x", "steps": ["one", "tw"]}'),
+    ('Here {draft}: {“a”: “b”}', '{"a": "b"}'),
+    ('{"text": "keep, } and True here",}', '{"text": "keep, } and True here"}'),
+    ('{"merged_plan": ["Use the “repository” pattern",],}', '{"merged_plan": ["Use the “repository” pattern"]}'),
+])
+def test_repair_json(raw, expected):
+    assert repair_json(raw) == expected
+
+
+def test_repair_json_gives_up_without_object():
+    with pytest.raises(ValueError):
+        repair_json("I cannot help with that.")
+
+
+def test_parse_counts_repairs(fresh_run):
+    result = parse_meta('Answer: {"is_multi_step": true, "subtasks": ["A", "B",]}')
+    assert result.subtasks == ["A", "B"]
+    assert fresh_run.stats["llm_json_repaired"] == 1
+
+    parse_explore('{"subtask": "S", "steps": []}')
+    assert fresh_run.stats["llm_json_repaired"] == 1
+
+
+def test_parse_synth_rejects_non_object():
+    with pytest.raises(ValueError):
+        parse_synth('["a", "b"]')
@@ -0,0 +1,31 @@
+# tests/test_response_models.py
+import pytest
+
+from schemas.response_models import JSONObjectScanner, parse_explore_response
+
+
+def test_scanner_handles_chunk_boundaries_and_strings():
+    text = 'noise {"a": "x}y", "b": {"c": "\\"{"}} more {"d": 1}'
+    scanner = JSONObjectScanner()
+    found = []
+    for i in range(0, len(text), 3):
+        found.extend(scanner.feed(text[i:i + 3]))
+    assert found == ['{"a": "x}y", "b": {"c": "\\"{"}}', '{"d": 1}']
+
+
+def test_scanner_holds_incomplete_object():
+    scanner = JSONObjectScanner()
+    assert scanner.feed('{"steps": ["one"') == []
+    assert scanner.feed(']}') == ['{"steps": ["one"]}']
+
+
+def test_parse_response_skips_prose_and_invalid_braces():
+    raw = 'Plan {draft} below:\n{"subtask": "S", "steps": ["a"]}\nThanks!'
+    result = parse_explore_response(raw)
+    assert result.subtask == "S"
+    assert result.steps == ["a"]
+
+
+def test_parse_response_without_object_raises():
+    with pytest.raises(ValueError):
+        parse_explore_response("no json here")
@@ -0,0 +1,59 @@
+# tests/test_sharding.py
+import asyncio
+
+import orchestrator
+from schemas.task_models import ExploreResult
+from utils.sharding import reduce_tree, shard_branches
+from utils.tokens import estimate_tokens
+
+
+def _branch(i, steps=1):
+    return ExploreResult(subtask=f"subtask {i}", steps=[f"step {n}" for n in range(steps)])
+
+
+def test_shards_respect_branch_count_and_token_budget():
+    branches = [_branch(i) for i in range(10)]
+    assert [len(s) for s in shard_branches(branches, token_budget=10_000, max_branches=4)] == [4, 4, 2]
+
+    cost = estimate_tokens('{"subtask":"subtask 0","steps":["step 0"],"dependencies":null}')
+    shards = shard_branches(branches, token_budget=cost * 3, max_branches=100)
+    assert [len(s) for s in shards] == [3, 3, 3, 1]
+    assert [br for s in shards for br in s] == branches
+
+
+def test_oversized_branch_gets_its_own_shard():
+    shards = shard_branches([_branch(0), _branch(1, steps=200), _branch(2)], token_budget=100)
+    assert [len(s) for s in shards] == [1, 1, 1]
+    assert shard_branches([]) == [[]]
+
+
+def test_reduce_tree_handles_fifty_partials():
+    levels = []
+
+    async def combine(group, final):
+        levels.append((len(group), final))
+        return sum(group)
+
+    total = asyncio.run(reduce_tree(list(range(50)), combine, fan_in=4))
+    assert total == sum(range(50))
+    # 50 -> 13 -> 4 -> 1 (the 13th partial is carried up); only the last combine is final
+    assert len(levels) == 13 + 3 + 1
+    assert [final for _, final in levels].count(True) == 1
+    assert max(size for size, _ in levels) <= 4
+
+
+def test_wide_level_is_map_reduced(fake_llm, monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    monkeypatch.setattr("utils.sharding.SHARD_MAX_BRANCHES", 4)
+    monkeypatch.setattr("utils.sharding.REDUCE_FAN_IN", 2)
+    fake_llm.fanout = 12
+    result = orchestrator.orchestrate("build a to-do list app")
+
+    root_evals = {p for agent, p in fake_llm.calls if agent == "EvaluatorAgent" and "step one" in p}
+    assert len(root_evals) == 3
+    assert runs[0].stats["reduce_shards"] == 3
+    # three shard plans -> one pair merge, the leftover carried up -> final merge
+    assert runs[0].stats["reduce_calls"] == 2
+    assert result["synth"].merged_plan == ["step one", "step two"]
+    assert len(result["explore"]) == 12
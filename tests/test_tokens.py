@@ -0,0 +1,54 @@
+# tests/test_tokens.py
+import orchestrator
+from utils.tokens import (
+    ELIDED_MARKER,
+    compact_json,
+    dedupe_goal_lines,
+    estimate_tokens,
+    extend_context,
+    fit_context,
+)
+
+
+def test_compact_json_drops_whitespace():
+    data = [{"subtask": "a", "steps": ["x", "y"]}]
+    assert compact_json(data) == '[{"subtask":"a","steps":["x","y"]}]'
+
+
+def test_repeated_goal_lines_are_dropped():
+    lines = [
+        "User goal at depth 1: Build an app",
+        "User goal at depth 2: build an app.",
+        "User goal at depth 3: Write tests",
+        "",
+    ]
+    assert dedupe_goal_lines(lines) == [lines[0], lines[2]]
+
+
+def test_context_over_budget_keeps_root_and_nearest_ancestors():
+    context = "User goal at depth 1: root goal"
+    for lvl in range(2, 40):
+        context = extend_context(context, f"User goal at depth {lvl}: subtask number {lvl} " + "x" * 40, budget=100)
+    lines = context.splitlines()
+
+    assert estimate_tokens(context) <= 100
+    assert lines[0] == "User goal at depth 1: root goal"
+    assert lines[1] == ELIDED_MARKER
+    assert lines[-1].startswith("User goal at depth 39:")
+
+
+def test_single_oversized_line_is_truncated():
+    fitted = fit_context("y" * 4000, budget=50)
+    assert estimate_tokens(fitted) <= 50
+    assert fitted.endswith("...")
+
+
+def test_run_records_prompt_and_completion_tokens(fake_llm, monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    orchestrator.orchestrate("build a to-do list app")
+
+    stats = runs[0].stats
+    assert stats["prompt_tokens"] > stats["completion_tokens"] > 0
+    assert stats["prompt_tokens.ExplorerAgent"] > 0
+    assert stats["completion_tokens.SynthesizerAgent"] > 0
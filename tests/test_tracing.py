@@ -0,0 +1,57 @@
+# tests/test_tracing.py
+import orchestrator
+from utils.tracing import critical_path, get_default_writer, latency_by_agent, read_spans
+
+
+def _capture_runs(monkeypatch):
+    runs = []
+    monkeypatch.setattr(orchestrator, "end_run", runs.append)
+    return runs
+
+
+def test_run_is_traced_as_a_span_tree(fake_llm, monkeypatch, trace_path):
+    runs = _capture_runs(monkeypatch)
+    orchestrator.orchestrate("build a to-do list app")
+    get_default_writer().flush()
+
+    spans = read_spans(str(trace_path), run_id=runs[0].run_id)
+    by_id = {s["span_id"]: s for s in spans}
+    (run_span,) = [s for s in spans if s["kind"] == "run"]
+    nodes = [s for s in spans if s["kind"] == "node"]
+    calls = [s for s in spans if s["kind"] == "llm_call"]
+
+    assert sorted(s["path"] for s in nodes) == ["", "0", "1", "2"]
+    assert len(calls) == runs[0].ledger.count() == 16
+    for call in calls:
+        assert call["start"] <= call["end"]
+        assert call["prompt_chars"] > 0 and call["completion_chars"] > 0
+        assert call["retries"] == 0 and call["queue_wait_sec"] >= 0
+        parent = by_id[call["parent_id"]]
+        # the filter runs directly under the run; every other call under its node
+        assert parent["kind"] == ("run" if call["agent"] == "PromptFilterAgent" else "node")
+        assert parent["path"] == call["path"]
+    assert by_id[nodes[0]["parent_id"]]["kind"] in ("run", "node")
+    assert {s["outcome"] for s in spans} == {"ok"}
+
+    path = critical_path(spans)
+    assert path[0] is run_span and path[-1]["kind"] == "llm_call"
+    breakdown = latency_by_agent(spans)
+    assert breakdown["ExplorerAgent"]["calls"] == 3
+    assert breakdown["MetaAgent"]["duration_sec"] > 0
+
+
+def test_failed_call_span_records_outcome(fake_llm, monkeypatch, trace_path):
+    async def broken(client, prompt, route):
+        raise RuntimeError("backend went away")
+
+    monkeypatch.setattr(fake_llm, "send", broken)
+    try:
+        orchestrator.orchestrate("build a to-do list app")
+    except RuntimeError:
+        pass
+    get_default_writer().flush()
+
+    spans = read_spans(str(trace_path))
+    (call,) = [s for s in spans if s["kind"] == "llm_call"]
+    assert call["outcome"] == "error" and "backend went away" in call["error"]
+    assert [s["outcome"] for s in spans if s["kind"] == "run"] == ["error"]
@@ -0,0 +1,225 @@
+# utils/backends.py
+
+import asyncio
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import httpx
+
+from config import (
+    TIMEOUT_SEC,
+    HTTP_POOL_SIZE,
+    OLLAMA_BACKENDS,
+    BACKEND_ROUTING,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SEC,
+    HEALTH_CHECK_TIMEOUT_SEC,
+)
+from utils.logging import log_info, log_warning
+from utils.run_context import current_run
+
+
+# One pooled keep-alive HTTP client per event loop, shared by every agent.
+# httpx clients are bound to the loop they were first used on, and
+# orchestrate() runs more than one loop, so we key the pool by loop.
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(TIMEOUT_SEC),
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE,
+            ),
+        )
+        _http_clients[loop] = client
+    return client
+
+
+async def close_http_pool() -> None:
+    """
+    Close the pooled HTTP client for the running loop (if any).
+    Call this before the loop shuts down.
+    """
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def normalize_host(host: str) -> str:
+    # OLLAMA_HOST is often set as "127.0.0.1:11434" without a scheme
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.rstrip("/")
+
+
+class Backend:
+    """
+    One Ollama server in a BackendPool, with its routing and circuit state.
+    """
+
+    # latency EWMA smoothing factor
+    ALPHA = 0.3
+
+    def __init__(self, host: str, weight: float = 1, model: Optional[str] = None):
+        self.host = normalize_host(host)
+        self.weight = max(float(weight), 1e-6)
+        self.model = model
+        self.outstanding = 0
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until: Optional[float] = None  # monotonic time; None = circuit closed
+        self.probing = False
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until is not None
+
+    def score(self, routing: str) -> float:
+        """Lower is better."""
+        load = (self.outstanding + 1) / self.weight
+        if routing == "latency" and self.latency_ewma is not None:
+            return load * self.latency_ewma
+        return load
+
+    def __repr__(self) -> str:
+        return f"Backend({self.host!r}, weight={self.weight:g})"
+
+
+class BackendPool:
+    """
+    Routes each LLM attempt to one of several Ollama servers.
+
+    Healthy backends are chosen by least outstanding requests per unit of
+    weight ("least_outstanding") or by that load times their latency EWMA
+    ("latency"). After CIRCUIT_FAILURE_THRESHOLD consecutive failures a
+    backend is ejected for CIRCUIT_RESET_SEC; once that elapses, the next
+    acquire() starts a background probe of its /api/version endpoint,
+    which readmits it on success. acquire() itself never waits on a probe.
+    If every backend is ejected, the one due back soonest is used anyway
+    rather than failing the call outright.
+    """
+
+    def __init__(
+        self,
+        backends: Iterable[Backend],
+        routing: str = BACKEND_ROUTING,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_sec: float = CIRCUIT_RESET_SEC,
+    ):
+        self.backends: List[Backend] = list(backends)
+        if not self.backends:
+            raise ValueError("BackendPool needs at least one backend")
+        if routing not in ("least_outstanding", "latency"):
+            raise ValueError(f"Unknown backend routing: {routing!r}")
+        self.routing = routing
+        self.failure_threshold = failure_threshold
+        self.reset_sec = reset_sec
+        # running health probes, kept referenced until they finish
+        self._probes: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, entries: List[Dict[str, Any]] = OLLAMA_BACKENDS) -> "BackendPool":
+        return cls(Backend(**entry) for entry in entries)
+
+    async def probe(self, backend: Backend) -> bool:
+        """Health check: GET /api/version on the backend, over the pooled client."""
+        try:
+            resp = await get_http_client().get(
+                f"{backend.host}/api/version", timeout=HEALTH_CHECK_TIMEOUT_SEC
+            )
+            return resp.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    async def _probe_and_readmit(self, backend: Backend) -> None:
+        try:
+            healthy = await self.probe(backend)
+        except Exception as e:
+            # e.g. the loop's HTTP pool closed under it: still due, probe again later
+            log_warning(f"BackendPool: health check of {backend.host} did not complete: {e!r}")
+            return
+        finally:
+            backend.probing = False
+        if healthy:
+            backend.ejected_until = None
+            backend.consecutive_failures = 0
+            log_info(f"BackendPool: {backend.host} passed health check, readmitted")
+        else:
+            backend.ejected_until = time.monotonic() + self.reset_sec
+
+    def _start_due_probes(self) -> None:
+        """Probe every ejected backend whose reset time has passed, concurrently."""
+        now = time.monotonic()
+        for backend in self.backends:
+            if not backend.ejected or backend.probing or now < backend.ejected_until:
+                continue
+            backend.probing = True
+            task = asyncio.create_task(self._probe_and_readmit(backend))
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+
+    async def wait_for_probes(self) -> None:
+        """Wait for the health probes started so far."""
+        if self._probes:
+            await asyncio.gather(*self._probes, return_exceptions=True)
+
+    async def acquire(self, exclude: Optional[Backend] = None) -> Backend:
+        """
+        Pick a backend for one attempt and count it as outstanding.
+        `exclude` (e.g. the backend that just failed) is avoided if possible.
+        """
+        self._start_due_probes()
+        healthy = [b for b in self.backends if not b.ejected]
+        candidates = [b for b in healthy if b is not exclude] or healthy
+        if candidates:
+            backend = min(candidates, key=lambda b: b.score(self.routing))
+        else:
+            backend = min(self.backends, key=lambda b: b.ejected_until)
+        backend.outstanding += 1
+        current_run().stats[f"backend_calls.{backend.host}"] += 1
+        return backend
+
+    def release(self, backend: Backend, latency: float, ok: Optional[bool]) -> None:
+        """
+        Record the outcome of an attempt started with acquire(). `ok=None`
+        (the attempt was cancelled) only frees its slot.
+        """
+        backend.outstanding -= 1
+        if ok is None:
+            return
+        if ok:
+            backend.consecutive_failures = 0
+            if backend.latency_ewma is None:
+                backend.latency_ewma = latency
+            else:
+                backend.latency_ewma += Backend.ALPHA * (latency - backend.latency_ewma)
+            return
+
+        backend.consecutive_failures += 1
+        current_run().stats[f"backend_failures.{backend.host}"] += 1
+        if not backend.ejected and backend.consecutive_failures >= self.failure_threshold:
+            backend.ejected_until = time.monotonic() + self.reset_sec
+            current_run().stats["backend_ejections"] += 1
+            log_warning(
+                f"BackendPool: ejecting {backend.host} after "
+                f"{backend.consecutive_failures} consecutive failures"
+            )
+
+
+_default_pool: Optional[BackendPool] = None
+
+
+def get_default_pool() -> BackendPool:
+    """Process-wide pool built from OLLAMA_BACKENDS, so circuit state is shared."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = BackendPool.from_config()
+    return _default_pool
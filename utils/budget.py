@@ -0,0 +1,78 @@
+# utils/budget.py
+
+import time
+from typing import Optional
+
+from config import (
+    RUN_DEADLINE_SEC,
+    RUN_MAX_CALLS,
+    RUN_MAX_TOKENS,
+    BUDGET_EXPAND_RESERVE,
+)
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of making an LLM call once the run's budget is spent."""
+
+
+class RunBudget:
+    """
+    Wall-clock deadline and LLM call/token allowance for one run. Any limit
+    left as None is unbounded.
+
+    Calls are reserved when they are admitted, so concurrent callers can
+    never overshoot `max_calls`; tokens are charged as calls complete.
+    """
+
+    def __init__(
+        self,
+        deadline_sec: Optional[float] = None,
+        max_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        self.deadline_sec = deadline_sec
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.started = time.monotonic()
+        self.calls = 0
+        self.tokens = 0
+
+    @classmethod
+    def from_config(cls) -> "RunBudget":
+        return cls(RUN_DEADLINE_SEC, RUN_MAX_CALLS, RUN_MAX_TOKENS)
+
+    @property
+    def limited(self) -> bool:
+        return any(v is not None for v in (self.deadline_sec, self.max_calls, self.max_tokens))
+
+    def remaining_sec(self) -> Optional[float]:
+        if self.deadline_sec is None:
+            return None
+        return self.deadline_sec - (time.monotonic() - self.started)
+
+    def remaining_fraction(self) -> float:
+        """Share of the tightest limit still unspent (1.0 when unbounded)."""
+        fractions = [1.0]
+        if self.deadline_sec is not None:
+            fractions.append(self.remaining_sec() / self.deadline_sec if self.deadline_sec else 0.0)
+        if self.max_calls is not None:
+            fractions.append(1 - self.calls / self.max_calls if self.max_calls else 0.0)
+        if self.max_tokens is not None:
+            fractions.append(1 - self.tokens / self.max_tokens if self.max_tokens else 0.0)
+        return max(0.0, min(fractions))
+
+    def exhausted(self) -> bool:
+        return self.remaining_fraction() <= 0.0
+
+    def should_expand(self) -> bool:
+        """Whether there is enough budget left to plan another level deeper."""
+        return self.remaining_fraction() > BUDGET_EXPAND_RESERVE
+
+    def admit(self) -> None:
+        """Reserve one LLM call, or raise BudgetExhausted."""
+        if self.exhausted():
+            raise BudgetExhausted("run budget exhausted")
+        self.calls += 1
+
+    def charge(self, tokens: int) -> None:
+        self.tokens += tokens
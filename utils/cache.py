@@ -0,0 +1,198 @@
+# utils/cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from config import (
+    CACHE_PATH,
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_BYTES,
+    CACHE_TTL_SEC,
+)
+from utils.logging import log_debug, log_warning, log_metrics
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed store of raw LLM responses.
+
+    Entries live in a single SQLite table keyed by a SHA-256 of
+    (model, temperature, filled prompt). Reads refresh `last_access`, and
+    writes evict least-recently-used rows until both the entry-count and
+    byte budgets fit. Rows older than `ttl_sec` are treated as misses.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl_sec: Optional[float] = CACHE_TTL_SEC,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT PRIMARY KEY,
+                model       TEXT NOT NULL,
+                response    TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                latency     REAL NOT NULL,
+                created_at  REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses(last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, repr(float(temperature)), prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str, agent: str = "") -> Optional[str]:
+        """
+        Return the cached response for key, or None on a miss/expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and self.ttl_sec is not None and now - row[2] > self.ttl_sec:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats["expired"] += 1
+                row = None
+
+            if row is None:
+                self.stats["misses"] += 1
+                self.stats[f"misses.{agent}"] += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.stats["hits"] += 1
+            self.stats[f"hits.{agent}"] += 1
+            # latency the hit avoided paying again
+            self.stats["saved_sec"] += row[1]
+        log_debug("ResponseCache hit for %s (%s)", agent or "client", key[:12])
+        return row[0]
+
+    def put(self, key: str, model: str, response: str, latency: float = 0.0) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, size, latency, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, latency, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        """Drop one entry, e.g. a response that turned out to be unusable."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used rows until both budgets are respected."""
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.stats["evictions"] += len(victims)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def snapshot(self) -> Counter:
+        """Copy of the counters, to report one run's share with log_stats(since=...)."""
+        with self._lock:
+            return Counter(self.stats)
+
+    def log_stats(self, since: Optional[Counter] = None) -> Dict[str, float]:
+        """
+        Emit hit/miss counters through log_metrics and return them. With
+        `since` (a snapshot()), only what was counted after it is reported.
+        """
+        stats = self.snapshot()
+        if since is not None:
+            stats.subtract(since)
+        lookups = stats["hits"] + stats["misses"]
+        summary = {
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "evictions": stats["evictions"],
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            "saved_sec": round(stats["saved_sec"], 3),
+        }
+        for name, value in summary.items():
+            log_metrics(f"llm_cache_{name}", value)
+        return summary
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """
+    Lazily open the process-wide cache at CACHE_PATH.
+    Returns None (and logs) if the store cannot be opened.
+    """
+    global _default_cache
+    if _default_cache is None:
+        try:
+            _default_cache = ResponseCache()
+        except sqlite3.Error as e:
+            log_warning(f"Could not open response cache at {CACHE_PATH}: {e}")
+            return None
+    return _default_cache
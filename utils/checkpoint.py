@@ -0,0 +1,96 @@
+# utils/checkpoint.py
+
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import CHECKPOINT_DIR
+from utils.logging import log_info, log_warning
+
+Path = Tuple[int, ...]
+
+
+def format_path(path: Path) -> str:
+    """Tree path as written in the journal: (0, 2) -> "0.2", the root -> ""."""
+    return ".".join(str(i) for i in path)
+
+
+def parse_path(text: str) -> Path:
+    """Inverse of format_path."""
+    return tuple(int(part) for part in text.split(".") if part != "")
+
+
+class CheckpointJournal:
+    """
+    Append-only JSONL journal of one run's completed work, keyed by kind
+    ("filter", "start", "meta", "explore", "node") and tree path.
+
+    Every record is flushed as it is written, so whatever finished before
+    a crash or an exhausted retry can be replayed by a resumed run. When a
+    path is recorded twice (e.g. a branch retried in isolation), the later
+    record wins.
+    """
+
+    def __init__(self, run_id: str, directory: Optional[str] = None):
+        self.run_id = run_id
+        self.path = os.path.join(directory or CHECKPOINT_DIR, f"{run_id}.jsonl")
+        self._records: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if os.path.exists(self.path):
+            self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    @classmethod
+    def exists(cls, run_id: str, directory: Optional[str] = None) -> bool:
+        return os.path.exists(os.path.join(directory or CHECKPOINT_DIR, f"{run_id}.jsonl"))
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for lineno, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a torn final line from a crash mid-write
+                    log_warning(f"Checkpoint {self.path}:{lineno} is unreadable, ignoring it")
+                    continue
+                self._records[(record["kind"], record["path"])] = record
+        log_info(f"Checkpoint: loaded {len(self._records)} records for run {self.run_id}")
+
+    def get(self, kind: str, path: Path, goal: Optional[str] = None) -> Optional[Any]:
+        """
+        Journaled data for (kind, path), or None. With `goal`, a record
+        made for a different goal at that path is ignored.
+        """
+        record = self._records.get((kind, format_path(path)))
+        if record is None or (goal is not None and record.get("goal") != goal):
+            return None
+        return record["data"]
+
+    def record(self, kind: str, path: Path, data: Any, goal: Optional[str] = None) -> None:
+        record = {
+            "kind": kind,
+            "path": format_path(path),
+            "goal": goal,
+            "data": data,
+            "ts": time.time(),
+        }
+        self._records[(kind, record["path"])] = record
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def discard(self) -> None:
+        """Close and delete the journal, once there is nothing left to resume."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            log_warning(f"Could not delete checkpoint {self.path}: {e}")
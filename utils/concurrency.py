@@ -1,32 +1,229 @@
 import asyncio
-from typing import List, Any, Coroutine
+import heapq
+import itertools
+import math
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import List, Any, Dict, Optional
 
-from utils.logging import log_error
+from config import (
+    MAX_PARALLEL_TASKS,
+    AGENT_CONCURRENCY_LIMITS,
+    ADAPTIVE_CONCURRENCY,
+    MIN_PARALLEL_TASKS,
+    MAX_PARALLEL_TASKS_CEILING,
+    AIMD_DECREASE_FACTOR,
+    AIMD_LATENCY_SAMPLES,
+    AIMD_LATENCY_TOLERANCE,
+    AIMD_SPIKE_FACTOR,
+)
+from utils.logging import log_metrics
 
-async def run_parallel(coros: List[Coroutine], limit: int) -> List[Any]:
+
+class OwnerCancelled(Exception):
+    """
+    Set on a shared future when the task computing it was cancelled.
+    The waiters were not cancelled themselves, so they should compute
+    the result on their own rather than re-raise.
+    """
+
+
+def _p95(samples) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class AIMDController:
     """
-    Run a list of coroutines with a concurrency limit.
+    Additive-increase / multiplicative-decrease control of a Scheduler's
+    global window, driven by per-attempt LLM outcomes.
+
+    - Once a full window's worth of calls has succeeded since the last
+      change and p95 latency is still within AIMD_LATENCY_TOLERANCE of
+      its reference, the window grows by one.
+    - A timeout, backend error, or a call slower than AIMD_SPIKE_FACTOR x
+      the reference p95 multiplies the window by AIMD_DECREASE_FACTOR.
+      Outcomes of calls started before the last decrease are ignored, so
+      one overload burst only shrinks the window once.
+    """
+
+    def __init__(
+        self,
+        scheduler: "Scheduler",
+        min_window: int = MIN_PARALLEL_TASKS,
+        max_window: int = MAX_PARALLEL_TASKS_CEILING,
+    ):
+        self.scheduler = scheduler
+        self.min_window = min_window
+        self.max_window = max(max_window, scheduler.max_concurrency)
+        self.samples: deque = deque(maxlen=AIMD_LATENCY_SAMPLES)
+        self.reference_p95: Optional[float] = None
+        self.successes_since_change = 0
+        self.last_decrease_at = float("-inf")
+        self.history: List[Dict[str, Any]] = []
+
+    @property
+    def window(self) -> int:
+        return self.scheduler.max_concurrency
+
+    def _resize(self, new_window: int, reason: str) -> None:
+        old = self.window
+        new_window = max(self.min_window, min(self.max_window, new_window))
+        self.successes_since_change = 0
+        if new_window == old:
+            return
+        self.scheduler.max_concurrency = new_window
+        self.history.append(
+            {"at": time.time(), "from": old, "to": new_window, "reason": reason}
+        )
+        self.scheduler.stats["aimd_increases" if new_window > old else "aimd_decreases"] += 1
+        log_metrics("llm_concurrency_window", new_window, previous=old, reason=reason)
+        # a wider window may admit queued waiters right away
+        self.scheduler._dispatch()
+
+    def record_success(self, latency: float, started_at: float) -> None:
+        if started_at < self.last_decrease_at:
+            return
+        self.samples.append(latency)
+        if self.reference_p95 is None:
+            if len(self.samples) >= min(self.window, self.samples.maxlen):
+                self.reference_p95 = _p95(self.samples)
+            return
 
-    Args:
-        coros: List of coroutine objects to execute.
-        limit: Maximum number of coroutines to run concurrently.
+        if latency > self.reference_p95 * AIMD_SPIKE_FACTOR:
+            self.record_failure("latency_spike", started_at)
+            return
 
-    Returns:
-        List of results corresponding to each coroutine, in the same order.
+        self.successes_since_change += 1
+        if self.successes_since_change >= self.window:
+            p95 = _p95(self.samples)
+            if p95 <= self.reference_p95 * AIMD_LATENCY_TOLERANCE:
+                self.reference_p95 = p95
+                self._resize(self.window + 1, "latency_flat")
+            else:
+                # latency is creeping up: hold the window where it is
+                self.successes_since_change = 0
 
-    Raises:
-        Exception: Propagates the first exception encountered.
+    def record_failure(self, reason: str, started_at: float) -> None:
+        if started_at < self.last_decrease_at:
+            return
+        self.last_decrease_at = time.perf_counter()
+        self._resize(math.floor(self.window * AIMD_DECREASE_FACTOR), reason)
+
+
+class Scheduler:
+    """
+    Run-wide admission gate for LLM calls.
+
+    Every call in the tree waits here, whatever level issued it, so the
+    number of requests hitting the backend never exceeds `max_concurrency`.
+    Agents listed in `agent_limits` are additionally capped at their own
+    sub-limit. Waiters are granted in priority order (lower first, FIFO
+    among equals); a waiter blocked only by its agent sub-limit does not
+    hold up waiters of other agents behind it.
     """
-    semaphore = asyncio.Semaphore(limit)
-
-    async def sem_task(coro):
-        async with semaphore:
-            try:
-                return await coro
-            except Exception as e:
-                # Log and re-raise to let gather handle it
-                log_error(f"Subtask error: {e}")
-                raise
-
-    # Gather will cancel all on first exception by default
-    return await asyncio.gather(*(sem_task(c) for c in coros))
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        agent_limits: Optional[Dict[str, int]] = None,
+        stats: Optional[Counter] = None,
+        adaptive: Optional[bool] = None,
+    ):
+        self.max_concurrency = max_concurrency or MAX_PARALLEL_TASKS
+        self.agent_limits = dict(AGENT_CONCURRENCY_LIMITS if agent_limits is None else agent_limits)
+        self.stats = stats if stats is not None else Counter()
+        self.active = 0
+        self.active_by_agent: Counter = Counter()
+        self._waiters: list = []  # heap of (priority, seq, agent, future)
+        self._seq = itertools.count()
+        if adaptive is None:
+            adaptive = ADAPTIVE_CONCURRENCY
+        self.controller = AIMDController(self) if adaptive else None
+
+    def observe(self, latency: float, started_at: float, error: Optional[str] = None) -> None:
+        """
+        Feed one LLM attempt's outcome to the adaptive controller, if any.
+        `started_at` is a time.perf_counter() reading; `error` names the
+        failure kind (e.g. "timeout") or is None on success.
+        """
+        if self.controller is None:
+            return
+        if error is None:
+            self.controller.record_success(latency, started_at)
+        else:
+            self.controller.record_failure(error, started_at)
+
+    def log_window(self) -> None:
+        """Export the final window and its adjustment history."""
+        log_metrics("llm_concurrency_window_final", self.max_concurrency)
+        if self.controller is not None:
+            for step, change in enumerate(self.controller.history):
+                log_metrics(
+                    "llm_concurrency_window_history",
+                    change["to"],
+                    step=step,
+                    previous=change["from"],
+                    reason=change["reason"],
+                )
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for *_, fut in self._waiters if not fut.done())
+
+    def _has_room(self, agent: str) -> bool:
+        if self.active >= self.max_concurrency:
+            return False
+        limit = self.agent_limits.get(agent)
+        return limit is None or self.active_by_agent[agent] < limit
+
+    def _dispatch(self) -> None:
+        skipped = []
+        while self._waiters and self.active < self.max_concurrency:
+            entry = heapq.heappop(self._waiters)
+            _, _, agent, fut = entry
+            if fut.done():
+                # waiter was cancelled while queued
+                continue
+            if not self._has_room(agent):
+                skipped.append(entry)
+                continue
+            self.active += 1
+            self.active_by_agent[agent] += 1
+            fut.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    async def acquire(self, agent: str = "", priority: int = 0) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), agent, fut))
+        self._dispatch()
+        if not fut.done():
+            self.stats["scheduler_queued"] += 1
+            self.stats["scheduler_max_queue_depth"] = max(
+                self.stats["scheduler_max_queue_depth"], self.queue_depth
+            )
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # granted just as we were cancelled: hand the slot back
+                self.release(agent)
+            raise
+
+    def release(self, agent: str = "") -> None:
+        self.active -= 1
+        self.active_by_agent[agent] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, agent: str = "", priority: int = 0):
+        """Hold one concurrency slot for the duration of the block."""
+        start = time.perf_counter()
+        await self.acquire(agent, priority)
+        self.stats["scheduler_wait_sec"] += time.perf_counter() - start
+        try:
+            yield
+        finally:
+            self.release(agent)
@@ -0,0 +1,175 @@
+# utils/dag.py
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from config import DEDUP_THRESHOLD
+from utils.dedup import shingles, similarity
+from utils.logging import log_warning
+from utils.memo import normalize_subtask
+from utils.run_context import current_run
+
+
+def _match_subtask(name: str, subtasks: Sequence[str], threshold: float) -> Optional[int]:
+    """Index of the subtask `name` refers to: exact (normalized) match first, else the most similar."""
+    target = normalize_subtask(name)
+    for i, sub in enumerate(subtasks):
+        if normalize_subtask(sub) == target:
+            return i
+    sig = shingles(name)
+    best, best_score = None, threshold
+    for i, sub in enumerate(subtasks):
+        score = similarity(sig, shingles(sub))
+        if score >= best_score:
+            best, best_score = i, score
+    return best
+
+
+def resolve_dependencies(
+    subtasks: Sequence[str],
+    dependencies: Optional[Dict[str, List[str]]],
+    threshold: float = DEDUP_THRESHOLD,
+) -> List[Set[int]]:
+    """
+    Turn a {subtask: [prerequisite, ...]} mapping (names as the LLM wrote
+    them) into prerequisite index sets, one per subtask. Unknown names and
+    self-references are dropped, and any edge that would close a cycle is
+    ignored so the result is always a DAG.
+    """
+    prereqs: List[Set[int]] = [set() for _ in subtasks]
+    for name, deps in (dependencies or {}).items():
+        i = _match_subtask(name, subtasks, threshold)
+        if i is None:
+            continue
+        for dep in deps or []:
+            j = _match_subtask(dep, subtasks, threshold)
+            if j is None or j == i:
+                continue
+            if _reaches(prereqs, j, i):
+                log_warning(f"Ignoring cyclic dependency {subtasks[i]!r} -> {subtasks[j]!r}")
+                continue
+            prereqs[i].add(j)
+    return prereqs
+
+
+def _reaches(prereqs: List[Set[int]], start: int, target: int) -> bool:
+    """True if `target` is a (transitive) prerequisite of `start`."""
+    stack, seen = [start], set()
+    while stack:
+        node = stack.pop()
+        if node == target:
+            return True
+        if node not in seen:
+            seen.add(node)
+            stack.extend(prereqs[node])
+    return False
+
+
+def critical_path_lengths(prereqs: List[Set[int]]) -> List[int]:
+    """
+    For each node, the number of nodes on the longest chain from it to the
+    end of the plan (itself included). Higher means more work is waiting
+    on it, so it should start first.
+    """
+    dependents: List[Set[int]] = [set() for _ in prereqs]
+    for i, deps in enumerate(prereqs):
+        for j in deps:
+            dependents[j].add(i)
+
+    lengths: Dict[int, int] = {}
+
+    def length(i: int) -> int:
+        if i not in lengths:
+            lengths[i] = 1 + max((length(d) for d in dependents[i]), default=0)
+        return lengths[i]
+
+    return [length(i) for i in range(len(prereqs))]
+
+
+def topological_order(prereqs: List[Set[int]]) -> List[int]:
+    """Indices with every prerequisite before its dependents, critical path first among peers."""
+    priority = critical_path_lengths(prereqs)
+    done: Set[int] = set()
+    order: List[int] = []
+    while len(order) < len(prereqs):
+        ready = [i for i in range(len(prereqs)) if i not in done and prereqs[i] <= done]
+        ready.sort(key=lambda i: (-priority[i], i))
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+
+async def run_dag(
+    prereqs: List[Set[int]],
+    run_one: Callable[[int, Dict[int, Any]], Awaitable[Any]],
+    on_result: Optional[Callable[[int, Any], None]] = None,
+    on_error: Optional[Callable[[int, BaseException], Any]] = None,
+    fail_fast: bool = False,
+) -> List[Any]:
+    """
+    Run one coroutine per node as soon as all of its prerequisites have
+    finished, passing it their results as {index: result}. Nodes that
+    become ready together are started longest-critical-path first, so
+    under a saturated scheduler they are also dispatched first.
+    `on_result(i, result)`, if given, is called as each node finishes.
+
+    Returns results in node order. The first exception cancels the rest,
+    unless `on_error(i, exc)` is given: its return value then stands in for
+    the failed node's result and its dependents still run. With
+    `fail_fast`, the first failure instead cancels every node not yet
+    finished, each standing in as on_error(i, CancelledError()).
+    """
+    priority = critical_path_lengths(prereqs)
+    n = len(prereqs)
+    results: Dict[int, Any] = {}
+    remaining = [set(deps) for deps in prereqs]
+    running: Dict[asyncio.Task, int] = {}
+    metrics = current_run().metrics
+    outcomes = metrics.counter("parallel_tasks_total", "run_dag nodes by outcome")
+    started = time.perf_counter()
+
+    def start_ready():
+        ready = [i for i in range(n) if not remaining[i] and i not in results
+                 and i not in running.values()]
+        for i in sorted(ready, key=lambda i: (-priority[i], i)):
+            task = asyncio.create_task(run_one(i, {j: results[j] for j in prereqs[i]}))
+            running[task] = i
+
+    start_ready()
+    try:
+        while running:
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            failed = False
+            for task in finished:
+                i = running.pop(task)
+                # a node cancelled from outside (not by this runner) is a failure too
+                exc = asyncio.CancelledError() if task.cancelled() else task.exception()
+                outcomes.inc(outcome="ok" if exc is None else "error")
+                if exc is not None:
+                    if on_error is None or not isinstance(exc, (Exception, asyncio.CancelledError)):
+                        raise exc
+                    results[i] = on_error(i, exc)
+                    failed = True
+                else:
+                    results[i] = task.result()
+                    if on_result is not None:
+                        on_result(i, results[i])
+                for deps in remaining:
+                    deps.discard(i)
+            if failed and fail_fast:
+                for i in range(n):
+                    if i not in results:
+                        results[i] = on_error(i, asyncio.CancelledError())
+                break
+            start_ready()
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            outcomes.inc(len(running), outcome="cancelled")
+            await asyncio.gather(*running, return_exceptions=True)
+        metrics.histogram("parallel_batch_seconds", "run_dag wall-clock time").observe(
+            time.perf_counter() - started
+        )
+    return [results[i] for i in range(n)]
@@ -0,0 +1,184 @@
+# utils/dedup.py
+
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from config import DEDUP_THRESHOLD, DEDUP_ACROSS_TREE
+from schemas.task_models import ExploreResult, FailedResult
+from utils.concurrency import OwnerCancelled
+from utils.logging import log_info
+from utils.run_context import current_run
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and the of for to in on with by from into at as is are be "
+    "that this these those it its their your our all any each".split()
+)
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            word = word[: -len(suffix)]
+            break
+    # "database"/"databases" and "cache"/"caching" stem alike
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """
+    Bag of normalized content words: lowercased, stopwords dropped, crude
+    suffix stemming. Word order is ignored so reorderings of the same
+    request ("user authentication" / "authentication for users") match.
+    """
+    words = _WORD_RE.findall(text.lower())
+    return frozenset(_stem(w) for w in words if w not in _STOPWORDS)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def count_node_calls(result: Any) -> int:
+    """LLM calls needed to produce an orchestration result (or a single branch)."""
+    if not isinstance(result, dict):
+        return 1  # one ExplorerAgent call
+    # meta + evaluator + synthesizer, plus every branch beneath
+    return 3 + sum(count_node_calls(item) for item in result["explore"])
+
+
+class SubtaskIndex:
+    """
+    Model-free near-duplicate detection for subtasks within one run.
+
+    `merge_level` collapses paraphrased siblings before fan-out.
+    `share` extends that across the tree (opt-in, `DEDUP_ACROSS_TREE`):
+    the first subtask of a given kind and depth to be claimed computes its
+    result, and any later near-duplicate at the same depth whose parent
+    goal is also a near-duplicate awaits and reuses it. Matching on the
+    parent keeps a result planned for one goal out of unrelated branches.
+    Restricting cross-tree reuse to the same depth keeps waits acyclic: a
+    node that reuses another never expands, and owners only wait on
+    strictly deeper work.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, across_tree: Optional[bool] = None):
+        self.threshold = threshold
+        self.across_tree = DEDUP_ACROSS_TREE if across_tree is None else across_tree
+        self._owners: Dict[
+            Tuple[str, int], List[Tuple[FrozenSet[str], FrozenSet[str], str, asyncio.Future]]
+        ] = {}
+
+    def _find(self, sig: FrozenSet[str], candidates) -> int:
+        best, best_score = -1, self.threshold
+        for i, other in enumerate(candidates):
+            score = similarity(sig, other)
+            if score >= best_score:
+                best, best_score = i, score
+        return best
+
+    def _find_owner(self, sig: FrozenSet[str], parent_sig: FrozenSet[str], owners) -> int:
+        best, best_score = -1, self.threshold
+        for i, (other, other_parent, _, _) in enumerate(owners):
+            if similarity(parent_sig, other_parent) < self.threshold:
+                continue
+            score = similarity(sig, other)
+            if score >= best_score:
+                best, best_score = i, score
+        return best
+
+    def merge_level(self, subtasks: List[str]) -> Tuple[List[str], List[int]]:
+        """
+        Drop siblings that near-duplicate an earlier sibling. Returns the
+        kept subtasks and, for each dropped one, the index of the kept
+        subtask it was merged into (see `record_savings`).
+        """
+        kept: List[str] = []
+        sigs: List[FrozenSet[str]] = []
+        merged_into: List[int] = []
+        for sub in subtasks:
+            sig = shingles(sub)
+            match = self._find(sig, sigs)
+            if match >= 0:
+                current_run().stats["subtasks_merged"] += 1
+                log_info(f"Merged near-duplicate subtask {sub!r} into {kept[match]!r}")
+                merged_into.append(match)
+                continue
+            kept.append(sub)
+            sigs.append(sig)
+        return kept, merged_into
+
+    @staticmethod
+    def record_savings(merged_into: List[int], results: List[Any]) -> None:
+        """Count the calls each merged sibling would have cost, now that its twin ran."""
+        current_run().stats["dedup_calls_saved"] += sum(
+            count_node_calls(results[i]) for i in merged_into
+        )
+
+    async def share(
+        self,
+        kind: str,
+        depth: int,
+        subtask: str,
+        compute: Callable[[], Awaitable[Any]],
+        parent: str = "",
+    ) -> Any:
+        """
+        Run `compute` for this subtask unless a near-duplicate of the same
+        kind and depth, planned under a near-duplicate `parent` goal, has
+        already been claimed elsewhere in the tree, in which case await and
+        return that result instead. Failed or partial owner results are not
+        reused: the waiter computes its own.
+        """
+        if not self.across_tree:
+            return await compute()
+
+        sig, parent_sig = shingles(subtask), shingles(parent)
+        owners = self._owners.setdefault((kind, depth), [])
+        match = self._find_owner(sig, parent_sig, owners)
+        while match >= 0:
+            _, _, owner_text, fut = owners[match]
+            log_info(f"Reusing {kind} result for {owner_text!r} as {subtask!r} (depth={depth})")
+            try:
+                result = await asyncio.shield(fut)
+            except OwnerCancelled:
+                # the owner's branch was cancelled, not this one: claim it again
+                match = self._find_owner(sig, parent_sig, owners)
+                continue
+            except Exception:
+                break
+            if isinstance(result, FailedResult) or (isinstance(result, dict) and result.get("partial")):
+                break
+            stats = current_run().stats
+            stats["subtasks_merged"] += 1
+            stats["dedup_calls_saved"] += count_node_calls(result)
+            if isinstance(result, ExploreResult):
+                result = result.model_copy(update={"subtask": subtask})
+            return result
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+            owner = (sig, parent_sig, subtask, fut)
+            owners.append(owner)
+            try:
+                result = await compute()
+            except asyncio.CancelledError:
+                # waiters in other branches compute the result themselves
+                owners.remove(owner)
+                fut.set_exception(OwnerCancelled())
+                raise
+            except BaseException as e:
+                fut.set_exception(e)
+                raise
+            fut.set_result(result)
+            return result
+
+        # the owner failed: compute this branch's result without claiming it
+        return await compute()
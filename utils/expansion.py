@@ -0,0 +1,117 @@
+# utils/expansion.py
+
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Type
+
+from config import (
+    MAX_RECURSION_DEPTH,
+    EXPANSION_POLICY,
+    EXPANSION_BEAM_WIDTH,
+    EXPANSION_MIN_SCORE,
+    EXPANSION_DEFAULT_LATENCY_SEC,
+)
+from schemas.task_models import MetaResult
+from utils.dedup import shingles
+from utils.run_context import current_run
+
+# Agents that run at a node on top of its children, whatever its fan-out
+_NODE_AGENTS = ("MetaAgent", "EvaluatorAgent", "SynthesizerAgent")
+# Separators between the parts a subtask lists ("X, Y and Z")
+_CLAUSE_RE = re.compile(r",|;|\band\b|\bthen\b", re.IGNORECASE)
+
+
+def mean_latency(agent: str, default: float = EXPANSION_DEFAULT_LATENCY_SEC) -> float:
+    """Average observed latency of `agent`'s LLM calls so far in this run."""
+    stats = current_run().stats
+    calls = latency = 0.0
+    for name, value in stats.items():
+        if name.startswith(f"route_calls.{agent}:"):
+            calls += value
+        elif name.startswith(f"route_latency_sec.{agent}:"):
+            latency += value
+    return latency / calls if calls else default
+
+
+class ExpansionPolicy(ABC):
+    """
+    Decides which subtasks of a multi-step level are planned as their own
+    subtree; the rest are resolved with a single ExplorerAgent call.
+    """
+
+    @abstractmethod
+    def select(self, subtasks: List[str], meta: MetaResult, lvl: int) -> Set[int]:
+        """Indices of the subtasks to expand."""
+
+
+class ExpandAllPolicy(ExpansionPolicy):
+    """Recurse into every subtask until MAX_RECURSION_DEPTH."""
+
+    def select(self, subtasks: List[str], meta: MetaResult, lvl: int) -> Set[int]:
+        return set(range(len(subtasks)))
+
+
+class BeamPolicy(ExpansionPolicy):
+    """
+    Expand only the `width` subtasks with the best estimated benefit per
+    second of extra latency.
+
+    Benefit grows with how much a subtask says (content words, as a proxy
+    for its complexity), with the number of parts it lists (a single-part
+    subtask has little to gain from its own plan), with MetaAgent's
+    confidence in the split and with the number of levels still left to
+    plan below it. Cost is the expected
+    extra latency of the subtask's own subtree over one explorer call: its
+    node calls plus an explorer per part it lists, at the latencies
+    observed so far in the run. Subtasks scoring under `min_score`, or
+    whose subtree is not expected to finish before the run's deadline,
+    are never expanded.
+    """
+
+    def __init__(self, width: Optional[int] = None, min_score: Optional[float] = None):
+        self.width = EXPANSION_BEAM_WIDTH if width is None else width
+        self.min_score = EXPANSION_MIN_SCORE if min_score is None else min_score
+
+    def benefit(self, subtask: str, meta: MetaResult, lvl: int) -> float:
+        confidence = meta.confidence if meta.confidence is not None else 0.5
+        levels_left = max(1, MAX_RECURSION_DEPTH - lvl)
+        parts = math.log2(1 + self.expected_fanout(subtask))
+        return confidence * math.log1p(len(shingles(subtask))) * parts * levels_left / MAX_RECURSION_DEPTH
+
+    @staticmethod
+    def expected_fanout(subtask: str) -> int:
+        """Children MetaAgent is likely to split `subtask` into: one per part it lists."""
+        return sum(1 for part in _CLAUSE_RE.split(subtask) if part.strip()) or 1
+
+    def cost(self, subtask: str) -> float:
+        explore = mean_latency("ExplorerAgent")
+        node = sum(mean_latency(agent) for agent in _NODE_AGENTS)
+        # the subtree's node calls plus its explorers, minus the one explorer call it replaces
+        return max(node + (self.expected_fanout(subtask) - 1) * explore, 1e-6)
+
+    def scores(self, subtasks: List[str], meta: MetaResult, lvl: int) -> List[float]:
+        return [self.benefit(sub, meta, lvl) / self.cost(sub) for sub in subtasks]
+
+    def select(self, subtasks: List[str], meta: MetaResult, lvl: int) -> Set[int]:
+        scores = self.scores(subtasks, meta, lvl)
+        remaining = current_run().budget.remaining_sec()
+        ranked = sorted(range(len(subtasks)), key=lambda i: (-scores[i], i))
+        return {
+            i for i in ranked[: self.width]
+            if scores[i] >= self.min_score and (remaining is None or self.cost(subtasks[i]) <= remaining)
+        }
+
+
+POLICIES: Dict[str, Type[ExpansionPolicy]] = {
+    "all": ExpandAllPolicy,
+    "beam": BeamPolicy,
+}
+
+
+def get_policy(name: Optional[str] = None) -> ExpansionPolicy:
+    """Instantiate the policy registered under `name` (default EXPANSION_POLICY)."""
+    name = name or EXPANSION_POLICY
+    if name not in POLICIES:
+        raise ValueError(f"Unknown expansion policy: {name!r}")
+    return POLICIES[name]()
@@ -0,0 +1,66 @@
+# utils/ledger.py
+
+import hashlib
+import time
+from collections import Counter
+from typing import List, NamedTuple, Optional, Tuple
+
+# How a send() was answered
+BACKEND = "backend"        # a request was issued to a model server
+CACHE = "cache"            # served from the response cache
+COALESCED = "coalesced"    # joined an identical in-flight request
+SUPPRESSED = "suppressed"  # repeated within one agent invocation; earlier reply reused
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class LedgerEntry(NamedTuple):
+    agent: str
+    path: Tuple[int, ...]
+    prompt_hash: str
+    source: str
+    ts: float
+
+
+class CallLedger:
+    """
+    Every OllamaClient.send() of one run, in order: which agent sent which
+    prompt (by hash) from which node, and how it was answered. Tests use it
+    to assert exact call counts; log_stats reports repeated backend calls.
+    """
+
+    def __init__(self):
+        self.entries: List[LedgerEntry] = []
+
+    def record(self, agent: str, path: Tuple[int, ...], prompt: str, source: str) -> LedgerEntry:
+        entry = LedgerEntry(agent, tuple(path), prompt_hash(prompt), source, time.time())
+        self.entries.append(entry)
+        return entry
+
+    def count(self, agent: Optional[str] = None, source: Optional[str] = BACKEND) -> int:
+        """Entries for `agent` (any when None) answered by `source` (any when None)."""
+        return sum(
+            1 for e in self.entries
+            if (agent is None or e.agent == agent) and (source is None or e.source == source)
+        )
+
+    def by_agent(self, source: Optional[str] = BACKEND) -> Counter:
+        return Counter(e.agent for e in self.entries if source is None or e.source == source)
+
+    def duplicates(self) -> List[LedgerEntry]:
+        """Backend calls repeating an earlier one's agent, node path and prompt."""
+        seen = set()
+        repeated = []
+        for e in self.entries:
+            if e.source != BACKEND:
+                continue
+            key = (e.agent, e.path, e.prompt_hash)
+            if key in seen:
+                repeated.append(e)
+            seen.add(key)
+        return repeated
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -1,47 +1,501 @@
 # utils/llm_client.py
 
-import subprocess
+import asyncio
+import codecs
+import json
+import os
 import time
-from typing import Optional
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Type, TypeVar
 
-from config import LLM_MODEL, MAX_RETRIES, TIMEOUT_SEC
-from utils.logging import log_info, log_error
+import httpx
+from pydantic import BaseModel
+
+from config import (
+    MODEL_TEMPERATURE,
+    MAX_RETRIES,
+    RETRY_BACKOFF_SEC,
+    TIMEOUT_SEC,
+    LLM_BACKEND,
+    STREAM_RESPONSES,
+    STRUCTURED_OUTPUT,
+    PARSE_RETRIES,
+    CACHE_ENABLED,
+    CACHE_DISABLED_AGENTS,
+)
+from schemas.response_models import JSONObjectScanner, match_schema
+from utils.backends import Backend, BackendPool, close_http_pool, get_default_pool, get_http_client
+from utils.cache import ResponseCache, get_default_cache
+from utils.logging import log_body, log_debug, log_info, log_error
+from utils.routing import Route, resolve_route
+from utils.run_context import current_run, current_node_path, current_depth
+from utils.tokens import estimate_tokens
+from utils.budget import BudgetExhausted
+from utils.concurrency import OwnerCancelled
+from utils.ledger import BACKEND, CACHE, COALESCED, SUPPRESSED
+from utils.tracing import current_span, span
+
+
+T = TypeVar("T")
+
+
+class LLMCallError(Exception):
+    """
+    A single LLM attempt failed in a way that is worth retrying.
+    `kind` is "timeout", "exit" (non-zero CLI exit) or "http".
+    """
+
+    def __init__(self, message: str, kind: str = "http"):
+        super().__init__(message)
+        self.kind = kind
+
+
+# Calls currently awaiting the backend, per loop, keyed like the response cache.
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _inflight_calls() -> Dict[str, asyncio.Future]:
+    return _inflight.setdefault(asyncio.get_running_loop(), {})
+
+
+def _consume_exception(fut: asyncio.Future) -> None:
+    # Followers may all be gone; don't warn about an unretrieved exception
+    if not fut.cancelled():
+        fut.exception()
 
 
 class OllamaClient:
     def __init__(
         self,
-        model_name: str = LLM_MODEL,
+        model_name: Optional[str] = None,
+        backend: str = LLM_BACKEND,
+        host: Optional[str] = None,
+        agent_name: str = "",
+        cache: Optional[ResponseCache] = None,
+        use_cache: Optional[bool] = None,
+        pool: Optional[BackendPool] = None,
+        schema: Optional[Type[BaseModel]] = None,
     ):
+        """
+        model_name: pin every call to this model; by default the model,
+            token limit and timeout come from the agent's AGENT_ROUTES entry.
+        host: talk to this single Ollama server instead of the backend pool.
+        pool: explicit backend pool; defaults to the shared OLLAMA_BACKENDS pool.
+        agent_name: calling agent's class name, used for per-agent cache opt-out.
+        cache: explicit response cache; defaults to the shared on-disk cache.
+        use_cache: force the cache on/off; defaults to CACHE_ENABLED minus
+            CACHE_DISABLED_AGENTS.
+        schema: pydantic model the agent expects; when streaming, generation
+            stops as soon as a JSON object valid for it is complete.
+        """
+        if backend not in ("http", "subprocess"):
+            raise ValueError(f"Unknown LLM backend: {backend!r}")
         self.model_name = model_name
+        self.backend = backend
+        if host is not None:
+            pool = BackendPool([Backend(host)])
+        self.pool = pool or get_default_pool()
+        self.agent_name = agent_name
+        self.schema = schema
+
+        if use_cache is None:
+            use_cache = CACHE_ENABLED and agent_name not in CACHE_DISABLED_AGENTS
+        if cache is None and use_cache:
+            cache = get_default_cache()
+        self.cache = cache if use_cache else None
+        # replies already received in the current agent invocation, by key
+        self._sent: Optional[Dict[str, str]] = None
+
+    def _route(self) -> Route:
+        route = resolve_route(self.agent_name, current_depth())
+        if self.model_name is not None:
+            route = route._replace(model=self.model_name)
+        return route
 
-    def send(self, prompt: str) -> str:
+    @contextmanager
+    def invocation(self):
         """
-        Call `ollama run <model> <prompt>` under the hood, with retries.
+        Scope of one agent invocation: within it, sending the same prompt
+        again reuses the first reply instead of calling the model twice.
         """
-        # Pass the prompt as a positional argument, no --prompt flag
-        cmd = ["ollama", "run", self.model_name, prompt]
+        self._sent = {}
+        try:
+            yield self
+        finally:
+            self._sent = None
+
+    async def send_parsed(self, prompt: str, parse: Callable[[str], T]) -> T:
+        """
+        send() the prompt and parse the response. Parsers repair near-JSON
+        in process; only if that still fails is the model asked again (up
+        to PARSE_RETRIES times), after dropping the unusable cached reply.
+        """
+        retries = 0
+        while True:
+            raw_output = await self.send(prompt)
+            try:
+                return parse(raw_output)
+            except ValueError as e:
+                if retries >= PARSE_RETRIES:
+                    raise
+                retries += 1
+                current_run().stats["llm_parse_retries"] += 1
+                log_error(f"OllamaClient: unparseable {self.agent_name or 'client'} response, re-calling: {e}")
+                key = ResponseCache.make_key(self._route().model, MODEL_TEMPERATURE, prompt)
+                if self.cache is not None:
+                    self.cache.delete(key)
+                if self._sent is not None:
+                    # this re-call is deliberate, not a duplicate
+                    self._sent.pop(key, None)
+
+    async def send(self, prompt: str) -> str:
+        """
+        Send the prompt to the configured backend and return the raw text.
+        Identical (model, temperature, prompt) calls are served from the
+        response cache when it is enabled for this agent, and concurrent
+        identical calls share a single in-flight backend request.
+        Inside invocation(), a repeat of an earlier prompt is answered with
+        the earlier reply. Every send is recorded in the run's CallLedger.
+        Raises BudgetExhausted once the run's call/token budget is spent or
+        its deadline passes. Each send is traced as an "llm_call" span.
+        """
+        route = self._route()
+        with span(
+            "llm_call",
+            agent=self.agent_name or "client",
+            model=route.model,
+            depth=route.depth,
+            prompt_chars=len(prompt),
+            retries=0,
+        ) as call_span:
+            output = await self._send(prompt, route, call_span)
+            call_span.set(completion_chars=len(output))
+            return output
+
+    async def _send(self, prompt: str, route: Route, call_span) -> str:
+        key = ResponseCache.make_key(route.model, MODEL_TEMPERATURE, prompt)
+        ledger = current_run().ledger
+        metrics = current_run().metrics
+        calls = metrics.counter("llm_calls_total", "OllamaClient sends by how they were answered")
+        agent = self.agent_name or "client"
+        path = current_node_path()
+        if self._sent is not None and key in self._sent:
+            current_run().stats["llm_duplicate_sends_suppressed"] += 1
+            log_debug("OllamaClient: suppressed repeated send by %s (%s)", agent, key[:12])
+            ledger.record(self.agent_name, path, prompt, SUPPRESSED)
+            calls.inc(agent=agent, model=route.model, source=SUPPRESSED)
+            call_span.set(outcome=SUPPRESSED)
+            return self._sent[key]
+        if self.cache is not None:
+            cached = self.cache.get(key, agent=self.agent_name)
+            lookups = metrics.counter("llm_cache_lookups_total", "Response cache lookups by result")
+            lookups.inc(agent=agent, result="miss" if cached is None else "hit")
+            if cached is not None:
+                ledger.record(self.agent_name, path, prompt, CACHE)
+                calls.inc(agent=agent, model=route.model, source=CACHE)
+                call_span.set(outcome=CACHE)
+                return self._remember(key, cached)
+
+        inflight = _inflight_calls()
+        pending = inflight.get(key)
+        while pending is not None:
+            log_debug("OllamaClient: joined in-flight call for %s (%s)", agent, key[:12])
+            try:
+                # shield: a cancelled follower must not cancel the leader's call
+                output = await asyncio.shield(pending)
+            except OwnerCancelled:
+                # the leader's task was cancelled, not this one: join the
+                # follower that took over, or take the call over ourselves
+                pending = inflight.get(key)
+                if pending is None:
+                    current_run().stats["llm_calls_taken_over"] += 1
+                continue
+            # counted once answered, so a taken-over call is only a backend call
+            current_run().stats["llm_calls_deduplicated"] += 1
+            ledger.record(self.agent_name, path, prompt, COALESCED)
+            calls.inc(agent=agent, model=route.model, source=COALESCED)
+            call_span.set(outcome=COALESCED)
+            return self._remember(key, output)
+
+        # only calls that reach a backend count against the run's budget
+        budget = current_run().budget
+        budget.admit()
+        ledger.record(self.agent_name, path, prompt, BACKEND)
+        calls.inc(agent=agent, model=route.model, source=BACKEND)
+
+        leader = asyncio.get_running_loop().create_future()
+        leader.add_done_callback(_consume_exception)
+        inflight[key] = leader
+        try:
+            # shallower nodes sit on the critical path of more of the tree
+            priority = len(current_node_path())
+
+            async def _call():
+                queued = time.perf_counter()
+                async with current_run().scheduler.slot(self.agent_name, priority):
+                    start = time.perf_counter()
+                    call_span.set(queue_wait_sec=round(start - queued, 6))
+                    metrics.histogram("llm_queue_wait_seconds", "Wait for a scheduler slot").observe(
+                        start - queued, agent=agent
+                    )
+                    output = await self._send_with_retries(prompt, route)
+                return output, time.perf_counter() - start
 
+            try:
+                output, latency = await asyncio.wait_for(_call(), budget.remaining_sec())
+            except asyncio.TimeoutError:
+                raise BudgetExhausted("run deadline passed during LLM call")
+            self._record_route(route, latency, prompt, output)
+            if self.cache is not None:
+                self.cache.put(key, route.model, output, latency=latency)
+        except asyncio.CancelledError:
+            # followers were not cancelled; one of them re-issues the call
+            leader.set_exception(OwnerCancelled())
+            raise
+        except BaseException as e:
+            leader.set_exception(e)
+            raise
+        else:
+            leader.set_result(output)
+            return self._remember(key, output)
+        finally:
+            inflight.pop(key, None)
+
+    def _remember(self, key: str, output: str) -> str:
+        if self._sent is not None:
+            self._sent[key] = output
+        return output
+
+    @staticmethod
+    def _record_route(route: Route, latency: float, prompt: str, output: str) -> None:
+        stats = current_run().stats
+        stats[f"route_calls.{route.name}@d{route.depth}"] += 1
+        stats[f"route_latency_sec.{route.name}@d{route.depth}"] += latency
+        # estimated from the text, so both backends (and early-stopped streams) count alike
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(output)
+        agent = route.agent or "client"
+        current_run().budget.charge(prompt_tokens + completion_tokens)
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats[f"prompt_tokens.{agent}"] += prompt_tokens
+        stats[f"completion_tokens.{agent}"] += completion_tokens
+        current_span().set(
+            latency_sec=round(latency, 6),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+        metrics = current_run().metrics
+        metrics.histogram("llm_call_latency_seconds", "Backend call latency, retries included").observe(
+            latency, agent=agent, model=route.model
+        )
+        tokens = metrics.counter("llm_tokens_total", "Estimated tokens sent to and received from backends")
+        tokens.inc(prompt_tokens, agent=agent, type="prompt")
+        tokens.inc(completion_tokens, agent=agent, type="completion")
+        log_debug(
+            "OllamaClient: routed %s (depth=%s) to %s in %.2fs, ~%d prompt / ~%d completion tokens: %s",
+            agent, route.depth, route.model, latency, prompt_tokens, completion_tokens, log_body(output),
+        )
+
+    async def _send_with_retries(self, prompt: str, route: Route) -> str:
+        """
+        Call the configured backend with async retries and per-attempt timeouts.
+        """
+        scheduler = current_run().scheduler
+        metrics = current_run().metrics
+        agent = route.agent or "client"
+        server = None
         attempt = 0
         while attempt < MAX_RETRIES:
             attempt += 1
+            # retry on a different server when the pool has one
+            server = await self.pool.acquire(exclude=server)
+            current_span().set(retries=attempt - 1, server=server.host)
+            if attempt > 1:
+                metrics.counter("llm_retries_total", "Backend attempts after the first").inc(agent=agent)
+            started = time.perf_counter()
+            # released whatever ends the attempt; a cancelled one (speculative,
+            # fail-fast or deadline cutoff) says nothing about the server
+            ok: Optional[bool] = False
             try:
-                log_info(f"OllamaClient: running {cmd!r} (attempt {attempt})")
-                completed = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=TIMEOUT_SEC
-                )
-                if completed.returncode == 0:
-                    return completed.stdout.strip()
+                if self.backend == "http":
+                    output = await self._send_http(prompt, attempt, server, route)
                 else:
-                    log_error(
-                        f"OllamaClient non-zero exit (code={completed.returncode}): "
-                        f"{completed.stderr.strip()}"
-                    )
-            except subprocess.TimeoutExpired:
-                log_error(f"OllamaClient timeout after {TIMEOUT_SEC}s (attempt {attempt})")
-            time.sleep(1)
+                    output = await self._send_subprocess(prompt, attempt, server, route)
+            except asyncio.CancelledError:
+                ok = None
+                raise
+            except LLMCallError as e:
+                latency = time.perf_counter() - started
+                log_error(f"{e} (attempt {attempt}, {server.host})")
+                scheduler.observe(latency, started, error=e.kind)
+                metrics.counter("llm_errors_total", "Failed backend attempts by kind").inc(agent=agent, kind=e.kind)
+                if e.kind == "timeout":
+                    metrics.counter("llm_timeouts_total", "Backend attempts that timed out").inc(agent=agent)
+            else:
+                ok = True
+                scheduler.observe(time.perf_counter() - started, started)
+                return output
+            finally:
+                self.pool.release(server, time.perf_counter() - started, ok=ok)
+            await asyncio.sleep(RETRY_BACKOFF_SEC)
 
         raise RuntimeError("OllamaClient: all retries exhausted")
+
+    def _early_object(self, scanner: JSONObjectScanner, text: str) -> Optional[str]:
+        """
+        Feed streamed text to the scanner; return the first closed object
+        that validates against this client's schema, if any.
+        """
+        for candidate in scanner.feed(text):
+            if match_schema(candidate, self.schema) is not None:
+                current_run().stats["stream_early_stops"] += 1
+                return candidate
+        return None
+
+    async def _send_subprocess(self, prompt: str, attempt: int, server: Backend, route: Route) -> str:
+        """
+        Call `ollama run <model> <prompt>` without blocking the event loop.
+        The CLI is pointed at the chosen server through OLLAMA_HOST. When
+        streaming with a schema, stdout is scanned as it arrives and the
+        process is killed as soon as a valid object has been printed.
+        """
+        # Pass the prompt as a positional argument, no --prompt flag
+        cmd = ["ollama", "run", server.model or route.model, prompt]
+        if self.schema is not None and STRUCTURED_OUTPUT:
+            # the CLI only supports plain JSON mode, not a full schema
+            cmd[3:3] = ["--format", "json"]
+        # the prompt is logged as hash + preview (see LOG_BODY_SAMPLE_RATE)
+        log_info("OllamaClient: running %r (attempt %d)", cmd[:-1] + [log_body(prompt)], attempt)
+
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, "OLLAMA_HOST": server.host},
+        )
+        early = self.schema is not None and STREAM_RESPONSES
+        scanner = JSONObjectScanner()
+
+        async def read_output():
+            # drain stderr concurrently so the CLI never blocks on a full pipe
+            stderr_task = asyncio.create_task(proc.stderr.read())
+            chunks = []
+            # a multibyte character may straddle two reads
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            try:
+                while True:
+                    chunk = await proc.stdout.read(4096)
+                    text = decoder.decode(chunk, final=not chunk)
+                    if not chunk:
+                        chunks.append(text)
+                        break
+                    chunks.append(text)
+                    if early:
+                        obj = self._early_object(scanner, text)
+                        if obj is not None:
+                            return obj, None
+                stderr = await stderr_task
+            finally:
+                stderr_task.cancel()
+            await proc.wait()
+            return "".join(chunks).strip(), stderr
+
+        try:
+            output, stderr = await asyncio.wait_for(read_output(), route.timeout_sec)
+        except asyncio.TimeoutError:
+            raise LLMCallError(f"OllamaClient timeout after {route.timeout_sec}s", kind="timeout")
+        finally:
+            if proc.returncode is None:
+                # timed out, or stopped early once the object was complete
+                proc.kill()
+                await proc.wait()
+
+        if stderr is not None and proc.returncode != 0:
+            raise LLMCallError(
+                f"OllamaClient non-zero exit (code={proc.returncode}): "
+                f"{stderr.decode(errors='replace').strip()}",
+                kind="exit",
+            )
+        return output
+
+    async def _send_http(self, prompt: str, attempt: int, server: Backend, route: Route) -> str:
+        """
+        POST to the server's `/api/generate` endpoint over the shared connection pool.
+        """
+        url = f"{server.host}/api/generate"
+        model = server.model or route.model
+        # Same shape as the CLI argv so graph_output.py can parse both backends
+        cmd: List[str] = ["POST", url, model, prompt]
+        # the prompt is logged as hash + preview (see LOG_BODY_SAMPLE_RATE)
+        log_info("OllamaClient: running %r (attempt %d)", cmd[:-1] + [log_body(prompt)], attempt)
+
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": STREAM_RESPONSES,
+            "options": {
+                "temperature": MODEL_TEMPERATURE,
+                "num_predict": route.max_tokens,
+            },
+        }
+        if self.schema is not None and STRUCTURED_OUTPUT:
+            # constrain decoding to the agent's result model
+            payload["format"] = self.schema.model_json_schema()
+        try:
+            if STREAM_RESPONSES:
+                # httpx timeouts are per read; bound the whole generation too
+                return await asyncio.wait_for(
+                    self._stream_http(url, payload, route), route.timeout_sec
+                )
+            resp = await get_http_client().post(url, json=payload, timeout=route.timeout_sec)
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            raise LLMCallError(f"OllamaClient timeout after {route.timeout_sec}s", kind="timeout")
+        except httpx.HTTPError as e:
+            raise LLMCallError(f"OllamaClient HTTP error: {e!r}")
+
+        if resp.status_code != 200:
+            raise LLMCallError(
+                f"OllamaClient non-200 status (code={resp.status_code}): {resp.text.strip()}"
+            )
+        try:
+            data = resp.json()
+        except ValueError as e:
+            raise LLMCallError(f"OllamaClient invalid response body: {e}")
+        return (data.get("response") or "").strip()
+
+    async def _stream_http(self, url: str, payload: dict, route: Route) -> str:
+        """
+        Consume Ollama's NDJSON token stream. With a schema, return as soon
+        as a valid object closes; leaving the stream early drops the
+        connection, which makes Ollama stop generating.
+        """
+        scanner = JSONObjectScanner()
+        tokens = []
+        async with get_http_client().stream(
+            "POST", url, json=payload, timeout=route.timeout_sec
+        ) as resp:
+            if resp.status_code != 200:
+                body = (await resp.aread()).decode(errors="replace")
+                raise LLMCallError(
+                    f"OllamaClient non-200 status (code={resp.status_code}): {body.strip()}"
+                )
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except ValueError as e:
+                    raise LLMCallError(f"OllamaClient invalid stream chunk: {e}")
+                token = chunk.get("response") or ""
+                tokens.append(token)
+                if self.schema is not None:
+                    obj = self._early_object(scanner, token)
+                    if obj is not None:
+                        return obj
+                if chunk.get("done"):
+                    break
+        return "".join(tokens).strip()
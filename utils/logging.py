@@ -1,6 +1,19 @@
+import atexit
+import hashlib
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from config import LOG_LEVEL, LOG_FILE
+from config import (
+    LOG_LEVEL,
+    LOG_FILE,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_ROTATE_WHEN,
+    LOG_BODY_PREVIEW_CHARS,
+    LOG_BODY_SAMPLE_RATE,
+)
 
 # Convert log level string to logging module level
 level = getattr(logging, LOG_LEVEL.upper(), logging.INFO)
@@ -19,44 +32,112 @@ formatter = logging.Formatter(
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(level)
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+handlers = [console_handler]
 
-# File handler
+# File handler, rotated by time (LOG_ROTATE_WHEN) or else by size
 try:
-    file_handler = logging.FileHandler(LOG_FILE)
+    os.makedirs(os.path.dirname(os.path.abspath(LOG_FILE)), exist_ok=True)
+    if LOG_ROTATE_WHEN:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES or 0, backupCount=LOG_BACKUP_COUNT
+        )
     file_handler.setLevel(level)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    handlers.append(file_handler)
 except Exception as e:
     logger.warning(f"Could not set up file handler at {LOG_FILE}: {e}")
 
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records as they are. The stock prepare() renders the message
+    in the logging thread (hashing any log_body() there, on the event
+    loop); here that is left to the listener's handlers.
+    """
 
-def log_debug(message: str, **kwargs):
-    """Log a debug-level message with optional structured metadata."""
-    if kwargs:
-        message = f"{message} | {kwargs}"
-    logger.debug(message)
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the queue never leaves the process, so nothing needs pickling
+        return record
 
 
-def log_info(message: str, **kwargs):
-    """Log an info-level message with optional structured metadata."""
-    if kwargs:
-        message = f"{message} | {kwargs}"
-    logger.info(message)
+# Callers only enqueue records; a listener thread does the formatting and I/O
+log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+logger.addHandler(_DeferredQueueHandler(log_queue))
+listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+listener.start()
 
 
-def log_warning(message: str, **kwargs):
-    """Log a warning-level message with optional structured metadata."""
-    if kwargs:
-        message = f"{message} | {kwargs}"
-    logger.warning(message)
+@atexit.register
+def _stop_listener():
+    # flush what is still queued; stop() is not idempotent before 3.12
+    if listener._thread is not None:
+        listener.stop()
+
+
+class _Body:
+    """
+    A prompt or response body that is only summarized if a log record
+    using it is actually emitted.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __str__(self) -> str:
+        digest = hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+        # sampled by content, so a given prompt is always logged the same way
+        if int(digest[:8], 16) < LOG_BODY_SAMPLE_RATE * 0x100000000:
+            return self.text
+        preview = self.text[:LOG_BODY_PREVIEW_CHARS]
+        more = "..." if len(self.text) > LOG_BODY_PREVIEW_CHARS else ""
+        return f"<sha256:{digest[:12]} {len(self.text)} chars> {preview}{more}"
 
+    def __repr__(self) -> str:
+        return repr(str(self))
 
-def log_error(message: str, **kwargs):
-    """Log an error-level message with optional structured metadata."""
+
+def log_body(text: str) -> _Body:
+    """
+    Wrap a prompt/response for logging as %s/%r: a LOG_BODY_SAMPLE_RATE
+    share of bodies is logged in full, the rest as hash, length and the
+    first LOG_BODY_PREVIEW_CHARS characters.
+    """
+    return _Body(text)
+
+
+def _log(lvl: int, message: str, args, kwargs):
+    # skip all formatting when the level is disabled
+    if not logger.isEnabledFor(lvl):
+        return
     if kwargs:
-        message = f"{message} | {kwargs}"
-    logger.error(message)
+        suffix = f" | {kwargs}"
+        message += suffix.replace("%", "%%") if args else suffix
+    logger.log(lvl, message, *args, stacklevel=3)
+
+
+def log_debug(message: str, *args, **kwargs):
+    """Log a debug-level message (%-style `args` are formatted lazily) with optional structured metadata."""
+    _log(logging.DEBUG, message, args, kwargs)
+
+
+def log_info(message: str, *args, **kwargs):
+    """Log an info-level message (%-style `args` are formatted lazily) with optional structured metadata."""
+    _log(logging.INFO, message, args, kwargs)
+
+
+def log_warning(message: str, *args, **kwargs):
+    """Log a warning-level message (%-style `args` are formatted lazily) with optional structured metadata."""
+    _log(logging.WARNING, message, args, kwargs)
+
+
+def log_error(message: str, *args, **kwargs):
+    """Log an error-level message (%-style `args` are formatted lazily) with optional structured metadata."""
+    _log(logging.ERROR, message, args, kwargs)
 
 
 def log_metrics(metric_name: str, value, **tags):
@@ -66,5 +147,7 @@ def log_metrics(metric_name: str, value, **tags):
     Example:
         log_metrics('explore_latency', 1.23, branch='auth_module')
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
     tag_str = ','.join(f"{k}={v}" for k, v in tags.items()) if tags else ''
-    logger.info(f"METRIC {metric_name}={value} {tag_str}")
+    logger.info("METRIC %s=%s %s", metric_name, value, tag_str, stacklevel=2)
@@ -0,0 +1,204 @@
+# utils/memo.py
+
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import (
+    PROMPT_DIR,
+    MAX_RECURSION_DEPTH,
+    MEMO_PATH,
+    MEMO_TTL_SEC,
+    MEMO_INVALIDATE_ON_PROMPT_CHANGE,
+)
+from schemas.task_models import MetaResult, ExploreResult, EvalResult, SynthResult
+from utils.logging import log_info, log_warning
+
+
+def normalize_subtask(text: str) -> str:
+    """Case-, whitespace- and outer-punctuation-insensitive form of a subtask."""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.strip(" \"'.,;:!?-")
+
+
+def prompt_fingerprint(prompt_dir: str = PROMPT_DIR) -> str:
+    """
+    Digest of every prompt template (and the recursion limit, which also
+    shapes a subtree). Changes whenever any template is edited.
+    """
+    h = hashlib.sha256(f"max_depth={MAX_RECURSION_DEPTH}".encode())
+    for path in sorted(glob.glob(os.path.join(prompt_dir, "*.txt"))):
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def dump_node_result(
+    result: Dict[str, Any],
+    ref: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+) -> Dict[str, Any]:
+    """
+    Convert an orchestration result dict into plain JSON-able data. A child
+    subtree for which `ref(child)` returns a key is written as {"ref": key}
+    instead of being copied in.
+    """
+    explore = []
+    for item in result["explore"]:
+        key = ref(item) if ref is not None and isinstance(item, dict) else None
+        if key is not None:
+            explore.append({"ref": key})
+        elif isinstance(item, dict):
+            explore.append({"node": dump_node_result(item, ref)})
+        else:
+            explore.append({"branch": item.model_dump()})
+    return {
+        "meta": result["meta"].model_dump(),
+        "explore": explore,
+        "eval": result["eval"].model_dump(),
+        "synth": result["synth"].model_dump(),
+        "design": result["design"],
+    }
+
+
+def load_node_result(
+    data: Dict[str, Any],
+    resolve: Optional[Callable[[str], Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Inverse of dump_node_result; `resolve(key)` returns the data a {"ref": key} stands for."""
+    explore = []
+    for item in data["explore"]:
+        if "ref" in item:
+            explore.append(load_node_result(resolve(item["ref"]), resolve))
+        elif "node" in item:
+            explore.append(load_node_result(item["node"], resolve))
+        else:
+            explore.append(ExploreResult(**item["branch"]))
+    return {
+        "meta": MetaResult(**data["meta"]),
+        "explore": explore,
+        "eval": EvalResult(**data["eval"]),
+        "synth": SynthResult(**data["synth"]),
+        "design": data["design"],
+    }
+
+
+class SubtreeMemo:
+    """
+    Persistent store of complete orchestration results, keyed by the
+    normalized subtask, a digest of the context it was planned under, and
+    its depth. A hit lets the orchestrator graft the stored subtree in
+    without any LLM calls.
+
+    Each row records the prompt fingerprint it was produced with; when
+    `invalidate_on_prompt_change` is set, rows from other template
+    versions are purged on open and never served.
+    """
+
+    def __init__(
+        self,
+        path: str = MEMO_PATH,
+        ttl_sec: Optional[float] = MEMO_TTL_SEC,
+        invalidate_on_prompt_change: bool = MEMO_INVALIDATE_ON_PROMPT_CHANGE,
+        prompt_dir: str = PROMPT_DIR,
+    ):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.invalidate_on_prompt_change = invalidate_on_prompt_change
+        self.fingerprint = prompt_fingerprint(prompt_dir)
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS subtrees (
+                key          TEXT PRIMARY KEY,
+                subtask      TEXT NOT NULL,
+                depth        INTEGER NOT NULL,
+                fingerprint  TEXT NOT NULL,
+                result       TEXT NOT NULL,
+                created_at   REAL NOT NULL
+            )
+            """
+        )
+        if invalidate_on_prompt_change:
+            purged = self._conn.execute(
+                "DELETE FROM subtrees WHERE fingerprint != ?", (self.fingerprint,)
+            ).rowcount
+            if purged:
+                log_info(f"SubtreeMemo: prompt templates changed, dropped {purged} subtrees")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(subtask: str, context: str, depth: int) -> str:
+        h = hashlib.sha256()
+        for part in (normalize_subtask(subtask), context.strip(), str(depth)):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, subtask: str, context: str, depth: int) -> Optional[Dict[str, Any]]:
+        key = self.make_key(subtask, context, depth)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, fingerprint, created_at FROM subtrees WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        result, fingerprint, created_at = row
+        if self.invalidate_on_prompt_change and fingerprint != self.fingerprint:
+            return None
+        if self.ttl_sec is not None and time.time() - created_at > self.ttl_sec:
+            return None
+        return load_node_result(json.loads(result))
+
+    def put(self, subtask: str, context: str, depth: int, result: Dict[str, Any]) -> None:
+        key = self.make_key(subtask, context, depth)
+        payload = json.dumps(dump_node_result(result), separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO subtrees "
+                "(key, subtask, depth, fingerprint, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, subtask, depth, self.fingerprint, payload, time.time()),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM subtrees").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM subtrees")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_memo: Optional[SubtreeMemo] = None
+
+
+def get_default_memo() -> Optional[SubtreeMemo]:
+    """
+    Lazily open the process-wide memo at MEMO_PATH.
+    Returns None (and logs) if the store cannot be opened.
+    """
+    global _default_memo
+    if _default_memo is None:
+        try:
+            _default_memo = SubtreeMemo()
+        except sqlite3.Error as e:
+            log_warning(f"Could not open subtree memo at {MEMO_PATH}: {e}")
+            return None
+    return _default_memo
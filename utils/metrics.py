@@ -0,0 +1,227 @@
+# utils/metrics.py
+
+import asyncio
+import bisect
+import functools
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import METRICS_ENABLED, METRICS_DIR, METRICS_LATENCY_BUCKETS
+from utils.logging import log_info, log_warning
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.values: Dict[LabelKey, Any] = {}
+
+
+class Counter(Metric):
+    """Monotonic total per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Last value (or running maximum, via set_max) per label set."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self.values[_key(labels)] = value
+
+    def set_max(self, value: float, **labels) -> None:
+        key = _key(labels)
+        if value > self.values.get(key, -math.inf):
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    """Fixed-bucket distribution per label set: bucket counts, sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: Optional[Sequence[float]] = None):
+        super().__init__(name, help)
+        self.buckets: List[float] = sorted(buckets or METRICS_LATENCY_BUCKETS)
+
+    def observe(self, value: float, **labels) -> None:
+        key = _key(labels)
+        series = self.values.get(key)
+        if series is None:
+            # per-bucket counts (the last one is +Inf), then sum
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def quantile(self, key: LabelKey, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile."""
+        counts, _ = self.values[key]
+        target = q * sum(counts)
+        seen = 0
+        for bound, count in zip(self.buckets + [math.inf], counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return math.inf
+
+
+class MetricsRegistry:
+    """
+    One run's counters, gauges and histograms. Metrics are created on first
+    use; recording is a dict update, cheap enough for every LLM call.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def _get(self, cls, name: str, help: str, **kwargs) -> Any:
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, help, **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (for the node_exporter textfile collector)."""
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(metric.values.items()):
+                if isinstance(metric, Histogram):
+                    counts, total = value
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + [math.inf], counts):
+                        cumulative += count
+                        le = 'le="%s"' % _fmt(bound)
+                        lines.append(f"{name}_bucket{_label_str(key, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_label_str(key)} {_fmt(total)}")
+                    lines.append(f"{name}_count{_label_str(key)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_label_str(key)} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-able summary: every series with its labels; histograms with count, mean, p50, p95."""
+        out: Dict[str, Any] = {}
+        for name, metric in sorted(self.metrics.items()):
+            series = []
+            for key, value in sorted(metric.values.items()):
+                entry: Dict[str, Any] = {"labels": dict(key)}
+                if isinstance(metric, Histogram):
+                    counts, total = value
+                    count = sum(counts)
+                    entry.update(
+                        count=count,
+                        sum=round(total, 6),
+                        mean=round(total / count, 6) if count else 0.0,
+                        p50=_fmt(metric.quantile(key, 0.5)) if count else None,
+                        p95=_fmt(metric.quantile(key, 0.95)) if count else None,
+                    )
+                else:
+                    entry["value"] = value
+                series.append(entry)
+            out[name] = {"type": metric.kind, "series": series}
+        return out
+
+    def write(self, run_id: str, directory: Optional[str] = None) -> None:
+        """
+        Write `orchestrator.prom` (replaced atomically, so a collector never
+        reads half a file) and `<run_id>.json` under `directory`.
+        """
+        directory = directory or METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        prom = os.path.join(directory, "orchestrator.prom")
+        with open(prom + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(prom + ".tmp", prom)
+        with open(os.path.join(directory, f"{run_id}.json"), "w", encoding="utf-8") as f:
+            json.dump({"run_id": run_id, "metrics": self.summary()}, f, indent=2)
+        log_info(f"Metrics for run {run_id} written to {directory}")
+
+
+def dump_run_metrics(run) -> None:
+    """Write a finished run's metrics, when METRICS_ENABLED."""
+    if not METRICS_ENABLED or not run.metrics.metrics:
+        return
+    # the scheduler already tracks its deepest queue in the run's stats
+    run.metrics.gauge("llm_queue_depth_max", "Most sends waiting for a scheduler slot at once").set(
+        run.stats["scheduler_max_queue_depth"]
+    )
+    try:
+        run.metrics.write(run.run_id)
+    except OSError as e:
+        log_warning(f"Could not write metrics for run {run.run_id}: {e}")
+
+
+def track_agent_run(run):
+    """Decorate an agent's async run() to record its latency and outcome."""
+
+    @functools.wraps(run)
+    async def wrapper(self, *args, **kwargs):
+        # imported here: run_context itself depends on this module
+        from utils.run_context import current_run
+
+        metrics = current_run().metrics
+        agent = self.__class__.__name__
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await run(self, *args, **kwargs)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            metrics.histogram("agent_run_seconds", "Agent run() latency").observe(
+                time.perf_counter() - started, agent=agent
+            )
+            metrics.counter("agent_runs_total", "Agent run() calls by outcome").inc(
+                agent=agent, outcome=outcome
+            )
+
+    return wrapper
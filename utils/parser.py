@@ -1,28 +1,160 @@
 # utils/parser.py
 
 import json
-from typing import Optional, Any, Dict
+import re
+from typing import Optional, Any, Dict, List
 
-from schemas.task_models import MetaResult, ExploreResult, EvalResult
+from schemas.response_models import JSONObjectScanner
+from schemas.task_models import MetaResult, ExploreResult, EvalResult, SynthResult
+from utils.logging import log_debug
+from utils.run_context import current_run
 
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_STRING_RE = re.compile(r'"(?:\\.|[^"\\])*"', re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PY_LITERAL_RE = re.compile(r"\b(True|False|None)\b")
+_SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
 
-def parse_meta(raw: str) -> MetaResult:
+
+def _fix_outside_strings(text: str) -> str:
     """
-    Parse a raw JSON string from the meta-agent into a MetaResult.
+    Fix common near-JSON mistakes, leaving string literals untouched:
+    trailing commas, Python literals, and brackets left open by a
+    truncated generation.
+    """
+    pieces: List[str] = []
+    stack: List[str] = []
+    pos = 0
+
+    def fix(segment: str) -> str:
+        segment = _TRAILING_COMMA_RE.sub(r"\1", segment)
+        segment = _PY_LITERAL_RE.sub(lambda m: _PY_LITERALS[m.group(1)], segment)
+        for ch in segment:
+            if ch in "{[":
+                stack.append("}" if ch == "{" else "]")
+            elif ch in "}]" and stack:
+                stack.pop()
+        return segment
+
+    for m in _STRING_RE.finditer(text):
+        pieces.append(fix(text[pos:m.start()]))
+        pieces.append(m.group(0))
+        pos = m.end()
+    tail = text[pos:]
+    if tail.count('"') % 2:
+        # generation stopped inside a string
+        quote = tail.index('"')
+        pieces.append(fix(tail[:quote]))
+        pieces.append(tail[quote:] + '"')
+    else:
+        pieces.append(fix(tail))
+
+    repaired = "".join(pieces).rstrip().rstrip(",")
+    return repaired + "".join(reversed(stack))
+
+
+def _normalize_quotes(text: str) -> str:
+    """
+    Turn smart quotes into ASCII ones where they act as delimiters, i.e.
+    outside well-formed string literals; quotes inside a value are kept.
+    """
+    pieces: List[str] = []
+    pos = 0
+    for m in _STRING_RE.finditer(text):
+        pieces.append(text[pos:m.start()].translate(_SMART_QUOTES))
+        pieces.append(m.group(0))
+        pos = m.end()
+    tail = text[pos:]
+    if tail.count('"') % 2:
+        # generation stopped inside a string
+        quote = tail.index('"')
+        pieces.append(tail[:quote].translate(_SMART_QUOTES) + tail[quote:])
+    else:
+        pieces.append(tail.translate(_SMART_QUOTES))
+    return "".join(pieces)
+
+
+def repair_json(raw: str) -> str:
+    """
+    Extract and repair the JSON object in a near-JSON LLM response
+    (prose around it, code fences, smart quotes, trailing commas,
+    truncation). Returns text that json.loads accepts.
+    Raises ValueError if nothing salvageable is found.
+    """
+    text = _normalize_quotes(raw)
+    fence = _FENCE_RE.search(text)
+    if fence:
+        text = fence.group(1)
+
+    candidates = JSONObjectScanner().feed(text)
+    start = text.find("{")
+    if start != -1:
+        # also try everything from the first brace, in case it never closed
+        candidates.append(text[start:])
+
+    for candidate in candidates:
+        fixed = _fix_outside_strings(candidate)
+        try:
+            json.loads(fixed)
+        except json.JSONDecodeError:
+            continue
+        return fixed
+    raise ValueError("No repairable JSON object in LLM response")
+
+
+def _load_json(raw: str, kind: str) -> Dict[str, Any]:
+    """
+    json.loads the response, falling back to repair_json. Repairs are
+    counted in the run stats as llm_json_repaired.
     """
     try:
         data = json.loads(raw)
     except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON in meta response: {e}")
+        try:
+            data = json.loads(repair_json(raw))
+        except ValueError:
+            raise ValueError(f"Invalid JSON in {kind} response: {e}")
+        current_run().stats["llm_json_repaired"] += 1
+        log_debug(f"Repaired malformed JSON in {kind} response")
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object in {kind} response, got {type(data).__name__}")
+    return data
+
+
+def parse_meta(raw: str) -> MetaResult:
+    """
+    Parse a raw JSON string from the meta-agent into a MetaResult.
+    """
+    data = _load_json(raw, "meta")
 
     # Required boolean
     is_multi = data.get("is_multi_step")
     # Lists default to empty if missing or null
     subtasks = data.get("subtasks") or []
+    # Optional {subtask: [prerequisite subtasks]}; anything else is ignored
+    dependencies = data.get("dependencies")
+    if isinstance(dependencies, dict):
+        dependencies = {
+            str(name): [deps] if isinstance(deps, str) else [str(d) for d in deps]
+            for name, deps in dependencies.items()
+            if isinstance(deps, (str, list))
+        }
+    else:
+        dependencies = None
+
+    # Optional 0..1 confidence that the decomposition is worth expanding
+    confidence = data.get("confidence")
+    if isinstance(confidence, (int, float)) and not isinstance(confidence, bool):
+        confidence = min(1.0, max(0.0, float(confidence)))
+    else:
+        confidence = None
 
     return MetaResult(
         is_multi_step=is_multi,
         subtasks=subtasks,
+        dependencies=dependencies,
+        confidence=confidence,
     )
 
 
@@ -31,10 +163,7 @@ def parse_explore(raw: str) -> ExploreResult:
     Parse a raw JSON string from the explorer-agent into an ExploreResult.
     If 'dependencies' is missing, it will be None.
     """
-    try:
-        data = json.loads(raw)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON in explore response: {e}")
+    data = _load_json(raw, "explore")
 
     subtask = data.get("subtask")
     steps = data.get("steps") or []
@@ -58,10 +187,7 @@ def parse_eval(raw: str) -> EvalResult:
     """
     Parse a raw JSON string from the evaluator-agent into an EvalResult.
     """
-    try:
-        data = json.loads(raw)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON in eval response: {e}")
+    data = _load_json(raw, "eval")
 
     issues = data.get("issues") or []
     suggestions = data.get("suggestions") or []
@@ -71,3 +197,11 @@ def parse_eval(raw: str) -> EvalResult:
         issues=issues,
         suggestions=suggestions
     )
+
+
+def parse_synth(raw: str) -> SynthResult:
+    """
+    Parse a raw JSON string from the synthesizer-agent into a SynthResult.
+    """
+    data = _load_json(raw, "synth")
+    return SynthResult(**data)
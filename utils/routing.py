@@ -0,0 +1,40 @@
+# utils/routing.py
+
+from typing import Any, Dict, NamedTuple, Optional
+
+from config import LLM_MODEL, MAX_TOKENS, TIMEOUT_SEC, AGENT_ROUTES
+
+
+class Route(NamedTuple):
+    """Model and limits chosen for one agent call."""
+    agent: str
+    depth: int
+    model: str
+    max_tokens: int
+    timeout_sec: float
+
+    @property
+    def name(self) -> str:
+        return f"{self.agent or 'client'}:{self.model}"
+
+
+def resolve_route(
+    agent: str,
+    depth: int,
+    routes: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Route:
+    """
+    Look up the route for `agent` at tree `depth` in AGENT_ROUTES
+    (or `routes`). Depth-specific settings win over the agent's
+    defaults, which win over the global LLM_MODEL/MAX_TOKENS/TIMEOUT_SEC.
+    """
+    entry = (AGENT_ROUTES if routes is None else routes).get(agent, {})
+    settings = {k: v for k, v in entry.items() if k != "depths"}
+    settings.update(entry.get("depths", {}).get(depth, {}))
+    return Route(
+        agent=agent,
+        depth=depth,
+        model=settings.get("model", LLM_MODEL),
+        max_tokens=settings.get("max_tokens", MAX_TOKENS),
+        timeout_sec=settings.get("timeout_sec", TIMEOUT_SEC),
+    )
@@ -0,0 +1,98 @@
+# utils/run_context.py
+
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+from utils.budget import RunBudget
+from utils.concurrency import Scheduler
+from utils.ledger import CallLedger
+from utils.metrics import MetricsRegistry, dump_run_metrics
+from utils.logging import log_metrics
+
+
+class RunContext:
+    """
+    State shared by every agent call within one orchestrate() run.
+
+    The active run is tracked in a ContextVar, so tasks spawned inside
+    asyncio.run() inherit it without threading it through each agent.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, budget: Optional[RunBudget] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.stats: Counter = Counter()
+        # one gate for every LLM call in the tree, whatever its depth
+        self.scheduler = Scheduler(stats=self.stats)
+        self.budget = budget or RunBudget()
+        # counters, gauges and histograms exported when the run ends
+        self.metrics = MetricsRegistry()
+        # every LLM send of the run, by agent, node path and prompt hash
+        self.ledger = CallLedger()
+        # CheckpointJournal of completed work, when checkpointing is on
+        self.journal = None
+
+    def log_stats(self) -> None:
+        """Emit every run counter through log_metrics, tagged with the run id."""
+        for name, value in sorted(self.stats.items()):
+            log_metrics(name, value, run_id=self.run_id)
+        speculated = self.stats["speculative_hits"] + self.stats["speculative_misses"]
+        if speculated:
+            hit_rate = round(self.stats["speculative_hits"] / speculated, 3)
+            log_metrics("speculative_hit_rate", hit_rate, run_id=self.run_id)
+        if self.ledger.entries:
+            log_metrics("ledger_backend_calls", self.ledger.count(), run_id=self.run_id)
+            log_metrics("ledger_repeated_calls", len(self.ledger.duplicates()), run_id=self.run_id)
+        self.scheduler.log_window()
+
+
+# Used when agents are driven outside orchestrate() (tests, ad-hoc scripts)
+_default_run = RunContext(run_id="default")
+_current_run: ContextVar[RunContext] = ContextVar("current_run", default=_default_run)
+
+
+# Position of the orchestration node currently executing, e.g. (0, 2) is the
+# third child of the first child of the root. None outside any node.
+_node_path: ContextVar[Optional[Tuple[int, ...]]] = ContextVar("node_path", default=None)
+
+
+def current_run() -> RunContext:
+    return _current_run.get()
+
+
+def current_node_path() -> Tuple[int, ...]:
+    return _node_path.get() or ()
+
+
+def current_depth() -> int:
+    """
+    Orchestration depth of the current node: 1 for the root goal, 2 for its
+    subtasks, ...; 0 outside any node (e.g. the prompt filter).
+    """
+    path = _node_path.get()
+    return 0 if path is None else len(path) + 1
+
+
+def enter_node(path: Tuple[int, ...]) -> None:
+    """
+    Mark the current task as working on the node at `path`. Tasks created
+    afterwards (child branches, agent calls) inherit it.
+    """
+    _node_path.set(path)
+
+
+def start_run(run_id: Optional[str] = None, budget: Optional[RunBudget] = None) -> RunContext:
+    """
+    Make a fresh RunContext the active run for the current context.
+    """
+    run = RunContext(run_id, budget)
+    run._token = _current_run.set(run)
+    return run
+
+
+def end_run(run: RunContext) -> None:
+    """Log the run's counters, write its metrics and restore whichever run was active before it."""
+    run.log_stats()
+    dump_run_metrics(run)
+    _current_run.reset(run._token)
@@ -0,0 +1,64 @@
+# utils/sharding.py
+
+import asyncio
+import json
+from typing import Awaitable, Callable, List, Optional, Sequence, TypeVar
+
+from config import SHARD_TOKEN_BUDGET, SHARD_MAX_BRANCHES, REDUCE_FAN_IN
+from schemas.task_models import ExploreResult
+from utils.tokens import estimate_tokens
+
+T = TypeVar("T")
+
+
+def shard_branches(
+    branches: Sequence[ExploreResult],
+    token_budget: Optional[int] = None,
+    max_branches: Optional[int] = None,
+) -> List[List[ExploreResult]]:
+    """
+    Split branches, in order, into consecutive shards whose serialized size
+    stays within `token_budget` and that hold at most `max_branches` each.
+    A single branch larger than the budget gets a shard of its own.
+    Limits default to SHARD_TOKEN_BUDGET / SHARD_MAX_BRANCHES.
+    """
+    token_budget = token_budget or SHARD_TOKEN_BUDGET
+    max_branches = max_branches or SHARD_MAX_BRANCHES
+    shards: List[List[ExploreResult]] = []
+    current: List[ExploreResult] = []
+    used = 0
+    for br in branches:
+        cost = estimate_tokens(json.dumps(br.model_dump(), separators=(",", ":")))
+        if current and (used + cost > token_budget or len(current) >= max_branches):
+            shards.append(current)
+            current, used = [], 0
+        current.append(br)
+        used += cost
+    if current or not shards:
+        shards.append(current)
+    return shards
+
+
+async def reduce_tree(
+    items: List[T],
+    combine: Callable[[List[T], bool], Awaitable[T]],
+    fan_in: Optional[int] = None,
+) -> T:
+    """
+    Fold `items` into one by repeatedly combining groups of up to `fan_in`
+    in parallel. `combine(group, final)` is told whether it is the last,
+    root-level combine. A single item is returned as is, and a lone
+    leftover item is carried up to the next level rather than combined.
+    """
+    fan_in = max(2, fan_in or REDUCE_FAN_IN)
+
+    async def _step(group: List[T], final: bool) -> T:
+        if len(group) == 1 and not final:
+            return group[0]
+        return await combine(group, final)
+
+    while len(items) > 1:
+        groups = [items[i:i + fan_in] for i in range(0, len(items), fan_in)]
+        final = len(groups) == 1
+        items = list(await asyncio.gather(*(_step(g, final) for g in groups)))
+    return items[0]
@@ -0,0 +1,99 @@
+# utils/tokens.py
+
+import json
+import re
+from typing import Any, List, Optional
+
+from config import CONTEXT_TOKEN_BUDGET
+from utils.run_context import current_run
+
+# Rough characters-per-token ratio for English text and JSON with llama-family tokenizers
+CHARS_PER_TOKEN = 4
+
+# Stands in for ancestor context lines dropped to fit the budget
+ELIDED_MARKER = "[... earlier context omitted ...]"
+
+_GOAL_LINE_RE = re.compile(r"^User goal(?: at depth \d+)?:\s*(.*)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, tokenizer-free token estimate (rounded up)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _record_saved(before: int, after: int) -> None:
+    if before > after:
+        current_run().stats["prompt_bytes_saved"] += before - after
+
+
+def compact_json(obj: Any) -> str:
+    """Serialize for a prompt without indentation or padding."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _goal_key(line: str) -> Optional[str]:
+    match = _GOAL_LINE_RE.match(line.strip())
+    if match is None:
+        return None
+    return re.sub(r"\s+", " ", match.group(1).strip().lower()).strip(" \"'.,;:!?-")
+
+
+def dedupe_goal_lines(lines: List[str]) -> List[str]:
+    """Drop blank lines and goal lines repeating a goal already stated above."""
+    seen = set()
+    kept = []
+    for line in lines:
+        if not line.strip():
+            continue
+        key = _goal_key(line)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return kept
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut text to roughly `budget` tokens, marking the cut with an ellipsis."""
+    limit = max(0, budget) * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[: max(0, limit - 3)].rstrip() + "..."
+
+
+def fit_context(context: str, budget: Optional[int] = None) -> str:
+    """
+    Compact ancestor context for a prompt: repeated goal lines are
+    dropped, and if it is still over `budget` (default
+    CONTEXT_TOKEN_BUDGET) the first line (the root goal) and the most
+    recent lines are kept, with the middle elided. The nearest ancestors
+    matter most to a subtask, the root goal anchors it.
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    lines = dedupe_goal_lines(context.splitlines())
+    fitted = "\n".join(lines)
+    if estimate_tokens(fitted) > budget and len(lines) > 1:
+        head = truncate_to_tokens(lines[0], budget // 4)
+        used = estimate_tokens(head) + estimate_tokens(ELIDED_MARKER) + 2
+        tail: List[str] = []
+        for line in reversed(lines[1:]):
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                if not tail:
+                    tail.append(truncate_to_tokens(line, budget - used))
+                break
+            tail.insert(0, line)
+            used += cost
+        if len(tail) < len(lines) - 1:
+            tail.insert(0, ELIDED_MARKER)
+        fitted = "\n".join([head] + tail)
+    elif estimate_tokens(fitted) > budget:
+        fitted = truncate_to_tokens(fitted, budget)
+    _record_saved(len(context), len(fitted))
+    return fitted
+
+
+def extend_context(context: str, line: str, budget: Optional[int] = None) -> str:
+    """Append one line (e.g. the current goal) to ancestor context, then fit it."""
+    return fit_context(f"{context}\n{line}" if context else line, budget)
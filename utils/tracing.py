@@ -0,0 +1,213 @@
+# utils/tracing.py
+
+import asyncio
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from config import TRACE_ENABLED, TRACE_PATH
+from utils.budget import BudgetExhausted
+from utils.checkpoint import format_path
+from utils.logging import log_warning
+from utils.run_context import current_node_path, current_run
+
+
+class TraceWriter:
+    """
+    Appends span records to a JSONL file from a background thread, so
+    tracing never blocks the event loop on disk I/O.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._drain, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._queue.put(record)
+
+    def _drain(self) -> None:
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    self._file.flush()
+                    return
+                self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+                # one flush per burst of spans rather than per span
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                log_warning(f"Trace writer could not write {self.path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every span written so far is on disk."""
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._file.close()
+
+
+_default_writer: Optional[TraceWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_default_writer() -> TraceWriter:
+    """The process-wide writer for TRACE_PATH, reopened if the path changes."""
+    global _default_writer
+    with _writer_lock:
+        if _default_writer is None or _default_writer.path != TRACE_PATH:
+            if _default_writer is not None:
+                _default_writer.close()
+            _default_writer = TraceWriter(TRACE_PATH)
+        return _default_writer
+
+
+@atexit.register
+def close_default_writer() -> None:
+    global _default_writer
+    with _writer_lock:
+        if _default_writer is not None:
+            _default_writer.close()
+            _default_writer = None
+
+
+class Span:
+    """
+    One timed unit of work: an orchestration node ("node"), one LLM send
+    ("llm_call") or a whole run ("run"). Attributes set while it is open
+    are written with it when it ends.
+    """
+
+    def __init__(self, kind: str, parent_id: Optional[str], **attrs):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.parent_id = parent_id
+        self.attrs: Dict[str, Any] = attrs
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def record(self) -> Dict[str, Any]:
+        record = {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start": round(self.start, 6),
+            "end": round(self.start + (time.perf_counter() - self._started), 6),
+        }
+        record["duration_sec"] = round(record["end"] - record["start"], 6)
+        record.update(self.attrs)
+        record.setdefault("outcome", "ok")
+        return record
+
+
+class _NullSpan:
+    """Stands in for a span while tracing is off."""
+
+    span_id = None
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span():
+    """The innermost open span of the current task (a no-op one if none)."""
+    return _current_span.get() or _NULL_SPAN
+
+
+@contextmanager
+def span(kind: str, **attrs):
+    """
+    Open a span, child of the current one, tagged with the run id and tree
+    path. Exceptions leaving it set its outcome ("error", "cancelled" or
+    "budget_exhausted"); otherwise it is "ok" unless set explicitly.
+    """
+    if not TRACE_ENABLED:
+        yield _NULL_SPAN
+        return
+    parent = _current_span.get()
+    attrs.setdefault("path", format_path(current_node_path()))
+    s = Span(kind, parent.span_id if parent else None, run_id=current_run().run_id, **attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except asyncio.CancelledError:
+        s.set(outcome="cancelled")
+        raise
+    except BudgetExhausted:
+        s.set(outcome="budget_exhausted")
+        raise
+    except BaseException as e:
+        s.set(outcome="error", error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        get_default_writer().write(s.record())
+
+
+def read_spans(path: str, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Span records from a trace file, optionally only those of one run."""
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn final line
+            if run_id is None or record.get("run_id") == run_id:
+                spans.append(record)
+    return spans
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The chain of spans that bounded the run's wall-clock time: from each
+    root span, repeatedly the child that finished last.
+    """
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+    roots = children.get(None, [])
+    if not roots:
+        return []
+    path = [max(roots, key=lambda s: s["end"])]
+    while children.get(path[-1]["span_id"]):
+        path.append(max(children[path[-1]["span_id"]], key=lambda s: s["end"]))
+    return path
+
+
+def latency_by_agent(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per-agent count, total duration and total queue wait of LLM calls that hit a backend."""
+    totals: Dict[str, Dict[str, float]] = {}
+    for s in spans:
+        if s["kind"] != "llm_call" or s["outcome"] != "ok":
+            continue
+        agent = totals.setdefault(s["agent"], {"calls": 0, "duration_sec": 0.0, "queue_wait_sec": 0.0})
+        agent["calls"] += 1
+        agent["duration_sec"] += s["duration_sec"]
+        agent["queue_wait_sec"] += s.get("queue_wait_sec", 0.0)
+    return totals